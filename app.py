@@ -4,29 +4,38 @@ import logging
 import uuid
 from datetime import datetime, timedelta
 import atexit
-from flask import Flask, jsonify, request, render_template, redirect, url_for, flash, make_response, has_request_context, g, send_from_directory, session
+from flask import Flask, jsonify, request, render_template, redirect, url_for, flash, make_response, has_request_context, g, send_from_directory, session, Response
 from flask_wtf.csrf import CSRFProtect, CSRFError, generate_csrf
 from flask_login import LoginManager, current_user
 from flask_compress import Compress
 from dotenv import load_dotenv
-import certifi
-from pymongo import MongoClient
 from extensions import mongo, login_manager, flask_session
 from blueprints.auth import auth_bp
 from translations import trans
+from translations.missing import missing_translations
 from scheduler_setup import init_scheduler
+from commands import init_commands
+from tool_usage_buffer import init_tool_usage_buffer
+from email_outbox import init_email_dispatcher
+from db_indexes import ensure_indexes, index_registry_for_app
+from mongo_manager import init_mongo_manager
 from models import create_user, get_user_by_email
 import json
 from functools import wraps
 from werkzeug.security import generate_password_hash
 from mailersend_email import init_email_config
+from template_filters import init_template_filters
 from pymongo.errors import ConnectionFailure, ConfigurationError, InvalidOperation
 from google_auth_oauthlib.flow import Flow
 from google.auth.transport import requests as google_requests
 from itsdangerous import URLSafeTimedSerializer
 import smtplib
 from email.mime.text import MIMEText
-from session_utils import create_anonymous_session
+from session_utils import create_anonymous_session, custom_login_required
+from log_pipeline import init_log_pipeline
+from request_timing import init_request_timing
+from query_monitor import init_query_monitor
+from metrics import init_metrics
 
 # Load environment variables
 load_dotenv()
@@ -43,18 +52,8 @@ class SessionFormatter(logging.Formatter):
 formatter = SessionFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s [session: %(session_id)s]')
 
 class SessionAdapter(logging.LoggerAdapter):
+    # The session id is stamped by log_pipeline.RequestContextFilter, resolved once per request
     def process(self, msg, kwargs):
-        kwargs['extra'] = kwargs.get('extra', {})
-        session_id = 'no-session-id'
-        try:
-            if has_request_context():
-                session_id = session.get('sid', 'no-session-id')
-            else:
-                session_id = 'no-request-context'
-        except Exception as e:
-            session_id = 'session-error'
-            kwargs['extra']['session_error'] = str(e)
-        kwargs['extra']['session_id'] = session_id
         return msg, kwargs
 
 logger = SessionAdapter(root_logger, {})
@@ -74,32 +73,27 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Custom login_required decorator to allow anonymous access
-def custom_login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if current_user.is_authenticated or session.get('is_anonymous', False):
-            return f(*args, **kwargs)
-        return redirect(url_for('auth.signin', next=request.url))
-    return decorated_function
-
 def setup_logging(app):
     handler = logging.StreamHandler(sys.stderr)
     handler.setLevel(logging.INFO)
     handler.setFormatter(formatter)
-    root_logger.handlers = []
-    root_logger.addHandler(handler)
     
     flask_logger = logging.getLogger('flask')
     werkzeug_logger = logging.getLogger('werkzeug')
-    flask_logger.handlers = []
-    werkzeug_logger.handlers = []
-    flask_logger.addHandler(handler)
-    werkzeug_logger.addHandler(handler)
     flask_logger.setLevel(logging.INFO)
     werkzeug_logger.setLevel(logging.INFO)
+    app.logger.setLevel(logging.INFO)
+    # Request threads only enqueue records; formatting and stderr writes happen on the listener thread
+    listener, stats = init_log_pipeline(
+        [root_logger, flask_logger, werkzeug_logger, app.logger],
+        [handler],
+        sample_rate=app.config['LOG_SAMPLE_RATE'],
+        request_budget=app.config['LOG_REQUEST_BUDGET']
+    )
+    app.config['LOG_LISTENER'] = listener
+    app.config['LOG_PIPELINE_STATS'] = stats
     
-    logger.info("Logging setup complete with StreamHandler for ficore_app, flask, and werkzeug")
+    logger.info("Logging setup complete with QueueListener for ficore_app, flask, werkzeug and %s", app.logger.name)
 
 def check_mongodb_connection(mongo_client, app):
     try:
@@ -113,21 +107,11 @@ def check_mongodb_connection(mongo_client, app):
         except InvalidOperation as e:
             logger.error(f"MongoDB client is closed: {str(e)}")
             try:
-                new_client = MongoClient(
-                    app.config['MONGO_URI'],
-                    connect=False,
-                    tlsCAFile=certifi.where(),
-                    maxPoolSize=20,
-                    socketTimeoutMS=60000,
-                    connectTimeoutMS=30000,
-                    serverSelectionTimeoutMS=30000,
-                    retryWrites=True
-                )
-                new_client.admin.command('ping')
+                # Reconnect through the manager so the replacement client is shared instead of adding a pool
+                manager = app.extensions['mongo_manager']
+                manager.reconnect()
+                manager.ping()
                 logger.info("New MongoDB client reinitialized successfully")
-                app.config['MONGO_CLIENT'] = new_client
-                app.config['SESSION_MONGODB'] = new_client
-                mongo.init_app(app, connect=False, uri=app.config['MONGO_URI'])
                 return True
             except Exception as reinit_e:
                 logger.error(f"Failed to reinitialize MongoDB client: {str(reinit_e)}")
@@ -140,24 +124,12 @@ def setup_session(app):
     try:
         mongo_client = app.config.get('MONGO_CLIENT')
         if not check_mongodb_connection(mongo_client, app):
-            logger.error("MongoDB client is not open, attempting to reinitialize")
-            mongo_client = MongoClient(
-                app.config['MONGO_URI'],
-                connect=False,
-                tlsCAFile=certifi.where(),
-                maxPoolSize=20,
-                socketTimeoutMS=60000,
-                connectTimeoutMS=30000,
-                serverSelectionTimeoutMS=30000,
-                retryWrites=True
-            )
-            app.config['MONGO_CLIENT'] = mongo_client
-            if not check_mongodb_connection(mongo_client, app):
-                logger.error("MongoDB client could not be reinitialized, falling back to filesystem session")
-                app.config['SESSION_TYPE'] = 'filesystem'
-                flask_session.init_app(app)
-                logger.info("Session configured with filesystem fallback")
-                return
+            logger.error("MongoDB client could not be reinitialized, falling back to filesystem session")
+            app.config['SESSION_TYPE'] = 'filesystem'
+            flask_session.init_app(app)
+            logger.info("Session configured with filesystem fallback")
+            return
+        mongo_client = app.config['MONGO_CLIENT']
         app.config['SESSION_TYPE'] = 'mongodb'
         app.config['SESSION_MONGODB'] = mongo_client
         app.config['SESSION_MONGODB_DB'] = 'ficodb'
@@ -197,52 +169,7 @@ def initialize_database(app):
             logger.error(f"MongoDB client is closed before database operations: {str(e)}")
             raise RuntimeError("MongoDB client is closed")
         logger.info(f"MongoDB database: {db.name}")
-        existing_indexes = db.users.index_information()
-        if 'email_1' not in existing_indexes:
-            db.users.create_index('email', unique=True)
-        if 'referral_code_1' not in existing_indexes:
-            db.users.create_index('referral_code', unique=True)
-        existing_indexes = db.courses.index_information()
-        if 'id_1' not in existing_indexes:
-            db.courses.create_index('id', unique=True)
-        existing_indexes = db.content_metadata.index_information()
-        if 'course_id_1_lesson_id_1' not in existing_indexes:
-            db.content_metadata.create_index([('course_id', 1), ('lesson_id', 1)], unique=True)
-        for collection in ['financial_health', 'budgets', 'bills', 'net_worth', 'emergency_funds']:
-            existing_indexes = db[collection].index_information()
-            if 'session_id_1' not in existing_indexes:
-                db[collection].create_index('session_id')
-            if 'user_id_1' not in existing_indexes:
-                db[collection].create_index('user_id')
-        existing_indexes = db.learning_progress.index_information()
-        if 'user_id_1_course_id_1' not in existing_indexes:
-            db.learning_progress.create_index([('user_id', 1), ('course_id', 1)], unique=True)
-        if 'session_id_1_course_id_1' not in existing_indexes:
-            db.learning_progress.create_index([('session_id', 1), ('course_id', 1)], unique=True)
-        if 'session_id_1' not in existing_indexes:
-            db.learning_progress.create_index('session_id')
-        if 'user_id_1' not in existing_indexes:
-            db.learning_progress.create_index('user_id')
-        for collection in ['quiz_results', 'feedback', 'tool_usage']:
-            existing_indexes = db[collection].index_information()
-            if 'session_id_1' not in existing_indexes:
-                db[collection].create_index('session_id')
-            if 'user_id_1' not in existing_indexes:
-                db[collection].create_index('user_id')
-        existing_indexes = db.tool_usage.index_information()
-        if 'tool_name_1' not in existing_indexes:
-            db.tool_usage.create_index('tool_name')
-        existing_indexes = db.bills.index_information()
-        if 'user_email_1' not in existing_indexes:
-            db.bills.create_index('user_email')
-        if 'status_1' not in existing_indexes:
-            db.bills.create_index('status')
-        if 'due_date_1' not in existing_indexes:
-            db.bills.create_index('due_date')
-        existing_indexes = db.reset_tokens.index_information()
-        if 'token_1' not in existing_indexes:
-            db.reset_tokens.create_index('token', unique=True)
-        logger.info("MongoDB indexes created or verified")
+        ensure_indexes(db, index_registry_for_app(app), logger)
         courses_collection = db.courses
         if courses_collection.count_documents({}) == 0:
             for course in SAMPLE_COURSES:
@@ -305,10 +232,28 @@ def create_app():
     if not app.config['SMTP_USERNAME'] or not app.config['SMTP_PASSWORD']:
         logger.warning("SMTP credentials (SMTP_USERNAME or SMTP_PASSWORD) not set in environment variables")
     logger.info("Starting app creation")
+    app.config['LOG_SAMPLE_RATE'] = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+    app.config['LOG_REQUEST_BUDGET'] = int(os.environ.get('LOG_REQUEST_BUDGET', 100))
     setup_logging(app)
+    app.config['REQUEST_TIMING_ENABLED'] = os.environ.get('REQUEST_TIMING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    mongo_timing_listener = init_request_timing(app, logger)
+    app.config['QUERY_MONITOR_ENABLED'] = os.environ.get('QUERY_MONITOR_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    app.config['QUERY_SLOW_MS'] = float(os.environ.get('QUERY_SLOW_MS', 100))
+    app.config['QUERY_REPEAT_THRESHOLD'] = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 5))
+    app.config['QUERY_EXPLAIN_SAMPLE_RATE'] = float(os.environ.get('QUERY_EXPLAIN_SAMPLE_RATE', 0.0))
+    query_monitor = init_query_monitor(app, logger)
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    mongo_metrics_listener = init_metrics(app)
     compress = Compress()
     compress.init_app(app)
     logger.info("Flask-Compress initialized successfully")
+    app.config['ANONYMOUS_DATA_RETENTION_DAYS'] = int(os.environ.get('ANONYMOUS_DATA_RETENTION_DAYS', 90))
+    app.config['MISSING_TRANSLATION_LOG_INTERVAL'] = float(os.environ.get('MISSING_TRANSLATION_LOG_INTERVAL', 300))
+    missing_translations.log_interval = app.config['MISSING_TRANSLATION_LOG_INTERVAL']
+    app.config['BILL_REMINDER_SEND_BUDGET'] = int(os.environ.get('BILL_REMINDER_SEND_BUDGET', 500))
+    app.config['BILL_REMINDER_BATCH_SIZE'] = int(os.environ.get('BILL_REMINDER_BATCH_SIZE', 1000))
+    app.config['MONGO_MAX_POOL_SIZE'] = int(os.environ.get('MONGO_MAX_POOL_SIZE', 20))
+    app.config['MONGO_MAX_IDLE_TIME_MS'] = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60000))
     app.config['MONGO_URI'] = os.environ.get('MONGODB_URI')
     if not app.config['MONGO_URI']:
         logger.error("MONGODB_URI environment variable not set")
@@ -317,27 +262,9 @@ def create_app():
     obfuscated_uri = f"{uri[:10]}...{uri[-10:]}" if len(uri) > 20 else "too_short"
     logger.info(f"MongoDB URI configured: {obfuscated_uri}")
     try:
-        mongo_client = MongoClient(
-            app.config['MONGO_URI'],
-            connect=False,
-            tlsCAFile=certifi.where(),
-            maxPoolSize=20,
-            socketTimeoutMS=60000,
-            connectTimeoutMS=30000,
-            serverSelectionTimeoutMS=30000,
-            retryWrites=True
-        )
-        app.config['MONGO_CLIENT'] = mongo_client
-        logger.info("MongoDB client created")
-        @atexit.register
-        def close_mongo_client():
-            try:
-                if mongo_client is not None:
-                    mongo_client.close()
-                    logger.info("MongoDB client closed on app shutdown")
-            except Exception as e:
-                logger.error(f"Error closing MongoDB client on app shutdown: {str(e)}", exc_info=True)
-        mongo.init_app(app, connect=False, uri=app.config['MONGO_URI'])
+        mongo_manager = init_mongo_manager(app, mongo, logger, event_listeners=[mongo_timing_listener, query_monitor, mongo_metrics_listener])
+        mongo_client = mongo_manager.client
+        atexit.register(mongo_manager.close)
         logger.info("MongoDB configured with Flask-PyMongo")
         if not check_mongodb_connection(mongo_client, app):
             logger.error("MongoDB initial connection failed")
@@ -367,36 +294,7 @@ def create_app():
         except Exception as e:
             logger.error(f"Error loading user {user_id}: {str(e)}", exc_info=True)
             return None
-    @app.template_filter('safe_nav')
-    def safe_nav(value):
-        try:
-            return value
-        except Exception as e:
-            logger.error(f"Navigation rendering error: {str(e)}", exc_info=True)
-            return ''
-    @app.template_filter('format_number')
-    def format_number(value):
-        try:
-            if isinstance(value, (int, float)):
-                return f"{float(value):,.2f}"
-            return str(value)
-        except (ValueError, TypeError) as e:
-            logger.warning(f"Error converting number {value}: {str(e)}")
-            return str(value)
-    @app.template_filter('format_datetime')
-    def format_datetime(value):
-        if isinstance(value, datetime):
-            return value.strftime('%B %d, %Y, %I:%M %p')
-        return str(value)
-    @app.template_filter('format_currency')
-    def format_currency(value):
-        try:
-            value = float(value)
-            if value.is_integer():
-                return f"₦{int(value):,}"
-            return f"₦{value:,.2f}"
-        except (TypeError, ValueError):
-            return str(value)
+    init_template_filters(app, logger)
     init_email_config(app, logger)
     setup_session(app)
     app.config['BASE_URL'] = os.environ.get('BASE_URL', 'http://localhost:5000')
@@ -438,6 +336,15 @@ def create_app():
         atexit.register(shutdown_scheduler)
     except Exception as e:
         logger.error(f"Failed to initialize scheduler: {str(e)}", exc_info=True)
+    try:
+        init_tool_usage_buffer(app, mongo)
+    except Exception as e:
+        logger.error(f"Failed to start tool usage buffer, falling back to direct inserts: {str(e)}", exc_info=True)
+    try:
+        init_email_dispatcher(app, mongo)
+    except Exception as e:
+        logger.error(f"Failed to start email dispatcher, queued emails will wait in email_outbox: {str(e)}", exc_info=True)
+    init_commands(app)
     @app.teardown_appcontext
     def teardown_appcontext(exception=None):
         logger.info("Teardown completed without closing MongoDB connection")
@@ -460,14 +367,11 @@ def create_app():
     app.register_blueprint(auth_bp, template_folder='templates/auth')
     app.register_blueprint(admin_bp, template_folder='templates/admin')
     def translate(key, lang='en', logger=logger, **kwargs):
-        translation = trans(key, lang=lang, **kwargs)
-        if translation == key:
-            logger.warning(f"Missing translation for key='{key}' in lang='{lang}'")
-            return key
-        return translation
+        # Missing keys are counted and rate-limited by translations.missing_translations
+        return trans(key, lang=lang, **kwargs)
     app.jinja_env.filters['trans'] = lambda key, **kwargs: translate(
         key,
-        lang=kwargs.get('lang', session.get('lang', 'en')),
+        lang=kwargs.get('lang', session.get('lang', 'en') if has_request_context() else 'en'),
         logger=g.get('logger', logger),
         **{k: v for k, v in kwargs.items() if k != 'lang'}
     )
@@ -477,25 +381,26 @@ def create_app():
     @app.before_request
     def setup_session_and_language():
         if request.path.startswith('/static/'):
-            logger.info(f"Skipping session setup for static file request: {request.path}")
+            logger.info("Skipping session setup for static file request: %s", request.path)
             return
-        logger.info(f"Starting before_request for path: {request.path}")
+        logger.info("Starting before_request for path: %s", request.path)
         try:
             if 'sid' not in session:
                 session['sid'] = session.sid  # Reuse flask_session ID
                 session['is_anonymous'] = not current_user.is_authenticated
-                logger.info(f"Session ID set: {session['sid']}, is_anonymous: {session['is_anonymous']}")
+                logger.info("Session ID set: %s, is_anonymous: %s", session['sid'], session['is_anonymous'])
             if 'lang' not in session:
                 session['lang'] = request.accept_languages.best_match(['en', 'ha'], 'en')
-                logger.info(f"Set default language to {session['lang']}")
+                logger.info("Set default language to %s", session['lang'])
             g.logger = logger
-            logger.info(f"Request processed for path: {request.path}")
+            logger.info("Request processed for path: %s", request.path)
         except Exception as e:
-            logger.error(f"Before request error for path {request.path}: {str(e)}", exc_info=True)
+            logger.error("Before request error for path %s: %s", request.path, e, exc_info=True)
             raise
     @app.context_processor
     def inject_translations():
-        lang = session.get('lang', 'en')
+        # Scheduler jobs render emails with only an app context
+        lang = session.get('lang', 'en') if has_request_context() else 'en'
         def context_trans(key, **kwargs):
             used_lang = kwargs.pop('lang', lang)
             return translate(
@@ -590,45 +495,17 @@ def create_app():
         logger.info(f"Serving general_dashboard for {'anonymous' if session.get('is_anonymous') else 'authenticated' if current_user.is_authenticated else 'no_session'} user")
         data = {}
         try:
-            from models import get_financial_health, get_budgets, get_bills, get_net_worth, get_emergency_funds, get_learning_progress, get_quiz_results, to_dict_financial_health, to_dict_budget, to_dict_bill, to_dict_net_worth, to_dict_emergency_fund, to_dict_learning_progress, to_dict_quiz_result
+            from models import get_dashboard_data, get_user_summary, dashboard_data_from_summary
             filter_kwargs = {'user_id': current_user.id} if current_user.is_authenticated else {'session_id': session.get('sid', 'no-session-id')}
-            fh_records = get_financial_health(mongo, filter_kwargs)
-            fh_records = [to_dict_financial_health(fh) for fh in fh_records]
-            data['financial_health'] = fh_records[0] if fh_records else {'score': None, 'status': None}
-            budget_records = get_budgets(mongo, filter_kwargs)
-            budget_records = [to_dict_budget(b) for b in budget_records]
-            data['budget'] = budget_records[0] if budget_records else {'surplus_deficit': None, 'savings_goal': None}
-            bills = get_bills(mongo, filter_kwargs)
-            bills = [to_dict_bill(b) for b in bills]
-            total_amount = sum(bill['amount'] for bill in bills if bill['amount'] is not None) if bills else 0
-            unpaid_amount = sum(bill['amount'] for bill in bills if bill['amount'] is not None and bill['status'].lower() != 'paid') if bills else 0
-            data['bills'] = {'bills': bills, 'total_amount': total_amount, 'unpaid_amount': unpaid_amount}
-            nw_records = get_net_worth(mongo, filter_kwargs)
-            nw_records = [to_dict_net_worth(nw) for nw in nw_records]
-            data['net_worth'] = nw_records[0] if nw_records else {'net_worth': None, 'total_assets': None}
-            ef_records = get_emergency_funds(mongo, filter_kwargs)
-            ef_records = [to_dict_emergency_fund(ef) for ef in ef_records]
-            data['emergency_fund'] = ef_records[0] if ef_records else {'target_amount': None, 'savings_gap': None}
-            lp_records = get_learning_progress(mongo, filter_kwargs)
-            data['learning_progress'] = {lp['course_id']: to_dict_learning_progress(lp) for lp in lp_records} if lp_records else {}
-            quiz_records = get_quiz_results(mongo, filter_kwargs)
-            quiz_records = [to_dict_quiz_result(qr) for qr in quiz_records]
-            data['quiz'] = quiz_records[0] if quiz_records else {'personality': None, 'score': None}
+            summary = get_user_summary(mongo, filter_kwargs)
+            data = dashboard_data_from_summary(summary) if summary else get_dashboard_data(mongo, filter_kwargs)
             logger.info(f"Retrieved data for session {session.get('sid', 'no-session-id')}")
             return render_template('general_dashboard.html', data=data, t=translate, lang=lang)
         except Exception as e:
             logger.error(f"Error in general_dashboard: {str(e)}", exc_info=True)
             flash(translate('global_error_message', default='An error occurred', lang=lang), 'danger')
-            default_data = {
-                'financial_health': {'score': None, 'status': None},
-                'budget': {'surplus_deficit': None, 'savings_goal': None},
-                'bills': {'bills': [], 'total_amount': 0, 'unpaid_amount': 0},
-                'net_worth': {'net_worth': None, 'total_assets': None},
-                'emergency_fund': {'target_amount': None, 'savings_gap': None},
-                'learning_progress': {},
-                'quiz': {'personality': None, 'score': None}
-            }
-            return render_template('general_dashboard.html', data=default_data, t=translate, lang=lang), 500
+            from models import DASHBOARD_DEFAULTS
+            return render_template('general_dashboard.html', data=DASHBOARD_DEFAULTS, t=translate, lang=lang), 500
     @app.route('/logout')
     def logout():
         lang = session.get('lang', 'en') if session is not None else 'en'
@@ -656,13 +533,20 @@ def create_app():
             mongo_client = app.config.get('MONGO_CLIENT')
             if not check_mongodb_connection(mongo_client, app):
                 raise RuntimeError("MongoDB connection unavailable")
-            mongo_client['ficodb'].command('ping')
+            app.config['MONGO_CLIENT']['ficodb'].command('ping')
             return jsonify(status), 200
         except Exception as e:
             logger.error(f"Health check failed: {str(e)}", exc_info=True)
             status["status"] = "unhealthy"
             status["details"] = str(e)
             return jsonify(status), 500
+    @app.route('/metrics')
+    @custom_login_required
+    @admin_required
+    def metrics_endpoint():
+        if 'metrics' not in app.extensions:
+            return jsonify({'error': 'Metrics are disabled'}), 404
+        return Response(app.extensions['metrics'].render(), mimetype='text/plain; version=0.0.4')
     @app.errorhandler(500)
     def handle_internal_error(error):
         lang = session.get('lang', 'en') if session is not None else 'en'
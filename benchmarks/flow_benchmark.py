@@ -0,0 +1,217 @@
+"""
+End-to-end benchmark of the wizard flows, dashboards and admin pages.
+
+Drives the real application through Flask's test client against a throwaway database filled by
+data_generator with N documents, and reports p50/p95 latency, MongoDB round trips per request (read from the
+Server-Timing header) and peak Python allocations per request (a separate tracemalloc pass so
+tracing does not skew latency). Results can be saved as a JSON baseline and compared in CI.
+
+The database named in MONGODB_URI is dropped and reseeded for every size, so it must contain
+"bench" in its name (e.g. mongodb://localhost:27017/ficore_bench) unless --allow-any-db is given.
+
+Usage:
+    python benchmarks/flow_benchmark.py [--sizes 1000,100000,1000000] [--iterations N]
+        [--save baseline.json] [--compare baseline.json --tolerance 0.25] [--skip-seed]
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_generator import USER_ID_BASE, generate
+
+# The generator skews ownership towards low user numbers, so its first user is the heaviest account
+BENCH_USER_ID = USER_ID_BASE
+BENCH_ADMIN_ID = 900000002
+
+def seed(uri, db, total, rng_seed=42):
+    """Drop and regenerate the synthetic dataset, then add an admin account for the admin pages."""
+    generate(uri, total, seed=rng_seed, drop=True)
+    db.users.insert_one({
+        'id': BENCH_ADMIN_ID, 'username': 'benchadmin', 'email': 'benchadmin@loadtest.ficore.invalid', 'password_hash': 'x',
+        'created_at': datetime.utcnow(), 'lang': 'en', 'referral_code': 'benchadmin', 'is_admin': True, 'role': 'admin',
+        'referred_by_id': None, 'google_id': None
+    })
+
+def wizard_scenarios():
+    """Return (name, requests) pairs; each request is (method, path, form data)."""
+    return [
+        ('budget_wizard', [
+            ('GET', '/BUDGET/step1', None), ('POST', '/BUDGET/step1', {'first_name': 'Bench', 'email': 'bench@example.com'}),
+            ('GET', '/BUDGET/step2', None), ('POST', '/BUDGET/step2', {'income': '250000'}),
+            ('GET', '/BUDGET/step3', None), ('POST', '/BUDGET/step3', {'housing': '80000', 'food': '50000', 'transport': '20000', 'dependents': '10000', 'miscellaneous': '5000', 'others': '5000'}),
+            ('GET', '/BUDGET/step4', None), ('POST', '/BUDGET/step4', {'savings_goal': '30000'})
+        ]),
+        ('financial_health_wizard', [
+            ('GET', '/HEALTHSCORE/step1', None), ('POST', '/HEALTHSCORE/step1', {'first_name': 'Bench', 'email': 'bench@example.com', 'user_type': 'individual'}),
+            ('GET', '/HEALTHSCORE/step2', None), ('POST', '/HEALTHSCORE/step2', {'income': '250000', 'expenses': '150000'}),
+            ('GET', '/HEALTHSCORE/step3', None), ('POST', '/HEALTHSCORE/step3', {'debt': '100000', 'interest_rate': '12'})
+        ]),
+        ('net_worth_wizard', [
+            ('GET', '/NETWORTH/step1', None), ('POST', '/NETWORTH/step1', {'first_name': 'Bench', 'email': 'bench@example.com'}),
+            ('GET', '/NETWORTH/step2', None), ('POST', '/NETWORTH/step2', {'cash_savings': '100000', 'investments': '50000', 'property': '0'}),
+            ('GET', '/NETWORTH/step3', None), ('POST', '/NETWORTH/step3', {'loans': '20000'})
+        ]),
+        ('emergency_fund_wizard', [
+            ('GET', '/EMERGENCYFUND/step1', None), ('POST', '/EMERGENCYFUND/step1', {'first_name': 'Bench', 'email': 'bench@example.com'}),
+            ('GET', '/EMERGENCYFUND/step2', None), ('POST', '/EMERGENCYFUND/step2', {'monthly_expenses': '150000', 'monthly_income': '250000'}),
+            ('GET', '/EMERGENCYFUND/step3', None), ('POST', '/EMERGENCYFUND/step3', {'current_savings': '50000', 'risk_tolerance_level': 'medium', 'dependents': '2'}),
+            ('GET', '/EMERGENCYFUND/step4', None), ('POST', '/EMERGENCYFUND/step4', {'timeline': '12'})
+        ]),
+        ('quiz_wizard', [
+            ('GET', '/QUIZ/step1', None), ('POST', '/QUIZ/step1', {'first_name': 'Bench', 'email': 'bench@example.com', 'lang': 'en'}),
+            ('GET', '/QUIZ/step2a', None), ('POST', '/QUIZ/step2a', {f"question_{index}": 'Yes' for index in range(1, 6)}),
+            ('GET', '/QUIZ/step2b', None), ('POST', '/QUIZ/step2b', {f"question_{index}": 'No' for index in range(6, 11)}),
+            ('GET', '/QUIZ/results', None)
+        ])
+    ]
+
+def page_scenarios():
+    return [
+        ('dashboards', [
+            ('GET', '/general_dashboard', None), ('GET', '/BUDGET/dashboard', None), ('GET', '/HEALTHSCORE/dashboard', None),
+            ('GET', '/NETWORTH/dashboard', None), ('GET', '/EMERGENCYFUND/dashboard', None), ('GET', '/BILL/dashboard', None)
+        ]),
+        ('admin', [('GET', '/admin/', None), ('GET', '/admin/tool_usage', None)])
+    ]
+
+MONGO_TIMING = re.compile(r'mongo;dur=[\d.]+;desc="(\d+) cmds"')
+
+def _client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+        sess['lang'] = 'en'
+    return client
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+def run_scenarios(app, iterations, allocations=True):
+    """Time every request of every scenario; returns {"scenario request": stats}."""
+    samples = {}
+    scenarios = [(name, steps, BENCH_USER_ID) for name, steps in wizard_scenarios()]
+    scenarios += [(name, steps, BENCH_ADMIN_ID if name == 'admin' else BENCH_USER_ID) for name, steps in page_scenarios()]
+    for name, steps, user_id in scenarios:
+        for _ in range(iterations):
+            client = _client(app, user_id)
+            for method, path, data in steps:
+                started = time.perf_counter()
+                response = client.open(path, method=method, data=data)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                match = MONGO_TIMING.search(response.headers.get('Server-Timing', ''))
+                entry = samples.setdefault(f"{name} {method} {path}", {'latency_ms': [], 'round_trips': [], 'status': set(), 'alloc_kb': []})
+                entry['latency_ms'].append(elapsed_ms)
+                entry['round_trips'].append(int(match.group(1)) if match else 0)
+                entry['status'].add(response.status_code)
+        if allocations:
+            # Separate pass: tracing slows every allocation, so it must not share a run with the timings
+            client = _client(app, user_id)
+            tracemalloc.start()
+            for method, path, data in steps:
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                client.open(path, method=method, data=data)
+                _, peak = tracemalloc.get_traced_memory()
+                samples[f"{name} {method} {path}"]['alloc_kb'].append((peak - baseline) / 1024)
+            tracemalloc.stop()
+    return {
+        key: {
+            'p50_ms': round(_percentile(entry['latency_ms'], 0.50), 2),
+            'p95_ms': round(_percentile(entry['latency_ms'], 0.95), 2),
+            'round_trips': round(sum(entry['round_trips']) / len(entry['round_trips']), 1),
+            'peak_alloc_kb': round(max(entry['alloc_kb']), 1) if entry['alloc_kb'] else None,
+            'status': sorted(entry['status'])
+        }
+        for key, entry in samples.items()
+    }
+
+def compare(baseline, current, tolerance):
+    """Return regressions: p95 slower than tolerance, or more round trips, against the baseline."""
+    regressions = []
+    for size, results in current.items():
+        for key, stats in results.items():
+            previous = baseline.get(size, {}).get(key)
+            if previous is None:
+                continue
+            if stats['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(f"[{size}] {key}: p95 {previous['p95_ms']}ms -> {stats['p95_ms']}ms")
+            if stats['round_trips'] > previous['round_trips']:
+                regressions.append(f"[{size}] {key}: round trips {previous['round_trips']} -> {stats['round_trips']}")
+    return regressions
+
+def print_results(size, results):
+    print(f"\n== {size} documents")
+    print(f"{'request':62} {'p50 ms':>8} {'p95 ms':>8} {'mongo':>6} {'alloc kb':>9} status")
+    for key, stats in results.items():
+        alloc = f"{stats['peak_alloc_kb']:9.1f}" if stats['peak_alloc_kb'] is not None else f"{'-':>9}"
+        print(f"{key:62} {stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} {stats['round_trips']:6.1f} {alloc} {','.join(map(str, stats['status']))}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='Comma-separated seeded document counts.')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-seed', action='store_true', help='Reuse the data already in the database (single size only).')
+    parser.add_argument('--no-allocations', action='store_true', help='Skip the tracemalloc pass.')
+    parser.add_argument('--save', help='Write results to this JSON baseline file.')
+    parser.add_argument('--compare', help='Compare against this JSON baseline and exit 1 on regressions.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 slowdown as a fraction of the baseline.')
+    parser.add_argument('--allow-any-db', action='store_true', help='Allow a database name without "bench" in it.')
+    args = parser.parse_args(argv)
+
+    from pymongo import uri_parser
+    database = uri_parser.parse_uri(os.environ.get('MONGODB_URI', ''))['database'] or ''
+    if 'bench' not in database and not args.allow_any_db:
+        parser.error(f"refusing to drop and reseed database '{database}'; point MONGODB_URI at a *bench* database")
+
+    os.environ.setdefault('REQUEST_TIMING_ENABLED', 'true')
+    from app import application
+    from extensions import mongo
+    from db_indexes import ensure_indexes, index_registry_for_app
+    from models import rebuild_user_summaries, rebuild_score_histograms, backfill_tool_usage_rollups
+    application.config['WTF_CSRF_ENABLED'] = False
+    logging.disable(logging.WARNING)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = {}
+    for size in sizes:
+        with application.app_context():
+            if not args.skip_seed:
+                started = time.perf_counter()
+                seed(os.environ['MONGODB_URI'], mongo.db, size, args.seed)
+                ensure_indexes(mongo.db, index_registry_for_app(application), application.logger, force=True)
+                rebuild_user_summaries(mongo)
+                rebuild_score_histograms(mongo)
+                backfill_tool_usage_rollups(mongo)
+                print(f"Seeded {size} documents in {time.perf_counter() - started:.1f}s")
+        results[str(size)] = run_scenarios(application, args.iterations, allocations=not args.no_allocations)
+        print_results(size, results[str(size)])
+
+    document = {'created_at': datetime.utcnow().isoformat(), 'iterations': args.iterations, 'seed': args.seed, 'results': results}
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump(document, handle, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        regressions = compare(baseline['results'], results, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"\nNo regressions against {args.compare}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Benchmark of wizard form construction cost per step.
+
+Builds each step form with a cold translation cache (what every request paid before the
+per-language cache) and with a warm cache, inside a request context with a session language.
+Imports the application, so MONGODB_URI must point at a reachable database.
+
+Usage: python benchmarks/form_benchmark.py [--iterations N] [--lang en|ha]
+"""
+import argparse
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import session
+from translated_form import clear_form_translation_cache
+
+def step_forms(lang):
+    """Return (name, factory) pairs for every translated wizard form."""
+    from blueprints import auth, bill, budget, emergency_fund, financial_health, net_worth, quiz
+    return [
+        ('budget.Step1Form', budget.Step1Form),
+        ('budget.Step2Form', budget.Step2Form),
+        ('budget.Step3Form', budget.Step3Form),
+        ('budget.Step4Form', budget.Step4Form),
+        ('financial_health.Step1Form', financial_health.Step1Form),
+        ('financial_health.Step2Form', financial_health.Step2Form),
+        ('financial_health.Step3Form', financial_health.Step3Form),
+        ('net_worth.Step1Form', net_worth.Step1Form),
+        ('net_worth.Step2Form', net_worth.Step2Form),
+        ('net_worth.Step3Form', net_worth.Step3Form),
+        ('emergency_fund.Step1Form', emergency_fund.Step1Form),
+        ('emergency_fund.Step2Form', emergency_fund.Step2Form),
+        ('emergency_fund.Step3Form', emergency_fund.Step3Form),
+        ('emergency_fund.Step4Form', lambda: emergency_fund.Step4Form(lang=lang)),
+        ('quiz.QuizStep1Form', lambda: quiz.QuizStep1Form(lang=lang)),
+        ('quiz.QuizStep2aForm', lambda: quiz.QuizStep2aForm(lang=lang)),
+        ('quiz.QuizStep2bForm', lambda: quiz.QuizStep2bForm(lang=lang)),
+        ('bill.BillFormStep1', bill.BillFormStep1),
+        ('bill.BillFormStep2', bill.BillFormStep2),
+        ('auth.SignupForm', lambda: auth.SignupForm(lang=lang)),
+        ('auth.SigninForm', lambda: auth.SigninForm(lang=lang))
+    ]
+
+def run(app, iterations, lang='en'):
+    """Print per-form construction time with a cold and a warm translation cache."""
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.test_request_context('/'):
+        session['lang'] = lang
+        session['sid'] = 'benchmark'
+        print(f"{'form':32} {'cold us':>10} {'warm us':>10} {'speedup':>8}")
+        for name, factory in step_forms(lang):
+            def cold():
+                clear_form_translation_cache()
+                factory()
+            factory()
+            cold_us = timeit.timeit(cold, number=iterations) / iterations * 1e6
+            warm_us = timeit.timeit(factory, number=iterations) / iterations * 1e6
+            print(f"{name:32} {cold_us:10.1f} {warm_us:10.1f} {cold_us / warm_us:7.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--lang', default='en', choices=['en', 'ha'])
+    args = parser.parse_args()
+    from app import application
+    logging.disable(logging.WARNING)
+    run(application, args.iterations, args.lang)
@@ -0,0 +1,74 @@
+"""
+Micro-benchmark for translations.trans.
+
+Compares the precompiled lookup with the previous prefix-scan implementation, both run
+inside a request context the way templates and forms call them.
+
+Usage: python benchmarks/trans_benchmark.py [--iterations N]
+"""
+import argparse
+import logging
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, session, has_request_context, g, request
+import translations
+from translations import trans, translation_modules, KEY_PREFIX_TO_MODULE, QUIZ_SPECIFIC_KEYS, logger
+
+def legacy_trans(key, lang=None, **kwargs):
+    """The per-call prefix scan trans() used before the tables were precompiled."""
+    current_logger = g.get('logger', logger) if has_request_context() else logger
+    session_id = session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id'
+    if lang is None:
+        lang = session.get('lang', 'en') if has_request_context() else 'en'
+    if lang not in ['en', 'ha']:
+        lang = 'en'
+    module_name = 'core'
+    for prefix, mod in KEY_PREFIX_TO_MODULE.items():
+        if key.startswith(prefix):
+            module_name = mod
+            break
+    if key in QUIZ_SPECIFIC_KEYS and has_request_context() and '/quiz/' in request.path:
+        module_name = 'quiz'
+    module = translation_modules.get(module_name, translation_modules['core'])
+    translation = module.get(lang, {}).get(key)
+    if translation is None:
+        translation = module.get('en', {}).get(key, key)
+        if translation == key:
+            current_logger.warning(f"Missing translation for key='{key}'", extra={'session_id': session_id})
+    try:
+        return translation.format(**kwargs) if kwargs else translation
+    except (KeyError, ValueError):
+        return translation
+
+def sample_keys():
+    """A mix of keys from late-matching prefixes, core keys and formatted strings."""
+    keys = ['core_submit', 'learning_hub_courses', 'net_worth_assets', 'financial_health_score', 'Yes']
+    keys += list(translations.get_translation_table('ha'))[::200]
+    return keys
+
+def run(iterations):
+    app = Flask(__name__)
+    app.secret_key = 'benchmark'
+    keys = sample_keys()
+    results = {}
+    with app.test_request_context('/dashboard'):
+        session['sid'] = 'benchmark'
+        session['lang'] = 'ha'
+        for name, func in (('legacy', legacy_trans), ('compiled', trans)):
+            for label, lang in (('explicit lang', 'ha'), ('session lang', None)):
+                total = timeit.timeit(lambda: [func(key, lang=lang) for key in keys], number=iterations)
+                results[(name, label)] = total / (iterations * len(keys)) * 1e9
+    for label in ('explicit lang', 'session lang'):
+        legacy, compiled = results[('legacy', label)], results[('compiled', label)]
+        print(f"{label:14} legacy={legacy:8.1f} ns/call  compiled={compiled:8.1f} ns/call  speedup={legacy / compiled:5.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    run(args.iterations)
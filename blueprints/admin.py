@@ -1,12 +1,19 @@
-from flask import Blueprint, render_template, request, session, redirect, url_for, flash, jsonify, Response
+from flask import Blueprint, render_template, request, session, redirect, url_for, flash, jsonify, Response, stream_with_context, current_app
 from flask_login import current_user
 from datetime import datetime, timedelta
 from app import admin_required, trans, logger as app_logger, custom_login_required
-from models import get_user, get_tool_usage, get_feedback, to_dict_tool_usage, to_dict_feedback
+from models import get_user, get_tool_usage, get_feedback, to_dict_tool_usage, to_dict_feedback, get_tool_usage_totals, get_tool_usage_actions
+from bson import ObjectId
+from bson.errors import InvalidId
 import logging
 import csv
+import zlib
+import base64
+import uuid
 from io import StringIO
 from extensions import mongo  # Import mongo from extensions
+from translations.missing import missing_translations
+from memory_profiler import memory_profiler, process_memory, GROUP_BY
 
 # Configure logging with SessionAdapter
 logger = logging.getLogger('ficore_app.admin')  # Namespaced logger
@@ -21,6 +28,83 @@ VALID_TOOLS = [
     'emergency_fund', 'learning_hub', 'quiz'
 ]
 
+# Tool usage browser page size
+TOOL_USAGE_PAGE_SIZE = 100
+
+def encode_page_cursor(log):
+    """Encode a log's (created_at, _id) position as an opaque page cursor."""
+    raw = f"{log['created_at'].isoformat()}|{log['_id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_page_cursor(cursor):
+    """Decode a page cursor back into (created_at, _id); returns None if invalid."""
+    try:
+        created_at, doc_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+        return datetime.fromisoformat(created_at), ObjectId(doc_id)
+    except (ValueError, InvalidId, UnicodeDecodeError):
+        return None
+
+def keyset_page(collection, filters, projection, after=None, before=None, page_size=TOOL_USAGE_PAGE_SIZE):
+    """Fetch one page ordered by (created_at, _id) descending, positioned after or before a cursor.
+
+    Returns (docs, has_newer, has_older).
+    """
+    position = decode_page_cursor(before or after) if (before or after) else None
+    query = dict(filters)
+    if position and before:
+        created_at, doc_id = position
+        query['$or'] = [{'created_at': {'$gt': created_at}}, {'created_at': created_at, '_id': {'$gt': doc_id}}]
+        docs = list(collection.find(query, projection).sort([('created_at', 1), ('_id', 1)]).limit(page_size + 1))
+        has_newer = len(docs) > page_size
+        return list(reversed(docs[:page_size])), has_newer, True
+    if position:
+        created_at, doc_id = position
+        query['$or'] = [{'created_at': {'$lt': created_at}}, {'created_at': created_at, '_id': {'$lt': doc_id}}]
+    docs = list(collection.find(query, projection).sort([('created_at', -1), ('_id', -1)]).limit(page_size + 1))
+    return docs[:page_size], position is not None, len(docs) > page_size
+
+# Export tuning: documents fetched per cursor batch and bytes buffered per streamed chunk
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_PROJECTION = {'_id': 0, 'id': 1, 'user_id': 1, 'session_id': 1, 'tool_name': 1, 'action': 1, 'created_at': 1}
+
+def generate_tool_usage_csv(cursor, compress=False):
+    """Yield CSV (optionally gzipped) chunks for tool usage documents from a cursor."""
+    si = StringIO()
+    cw = csv.writer(si)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def take_chunk():
+        data = si.getvalue().encode('utf-8')
+        si.seek(0)
+        si.truncate(0)
+        return compressor.compress(data) if compressor else data
+
+    cw.writerow(['ID', 'User ID', 'Session ID', 'Tool Name', 'Action', 'Created At'])
+    try:
+        for doc in cursor:
+            log = to_dict_tool_usage(doc)
+            cw.writerow([
+                log['id'],
+                log['user_id'] or 'anonymous',
+                log['session_id'],
+                log['tool_name'],
+                log['action'] or 'N/A',
+                log['created_at'] or 'N/A'
+            ])
+            if si.tell() >= EXPORT_CHUNK_SIZE:
+                chunk = take_chunk()
+                if chunk:
+                    yield chunk
+        chunk = take_chunk()
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
+    finally:
+        cursor.close()
+        si.close()
+
 @admin_bp.route('/')
 @custom_login_required
 @admin_required
@@ -49,25 +133,24 @@ def overview():
         })
         referral_conversion_rate = (total_referrals / total_users * 100) if total_users else 0.0
 
-        # Tool Usage Stats
-        tool_usage_total = db.tool_usage.count_documents({})
-        usage_by_tool = list(db.tool_usage.aggregate([
-            {'$group': {'_id': '$tool_name', 'count': {'$sum': 1}}},
-            {'$project': {'tool_name': '$_id', 'count': 1, '_id': 0}}
-        ]))
-        top_tools = sorted(usage_by_tool, key=lambda x: x['count'], reverse=True)[:3]
+        # Tool Usage Stats (from the all-time rollups maintained by log_tool_usage)
+        rollups = get_tool_usage_totals(mongo)
+        tool_usage_total = sum(r['count'] for r in rollups)
+        usage_by_tool = {}
+        actions_by_tool = {}
+        for r in rollups:
+            usage_by_tool[r['tool_name']] = usage_by_tool.get(r['tool_name'], 0) + r['count']
+            actions_by_tool.setdefault(r['tool_name'], []).append((r['action'], r['count']))
+        top_tools = sorted(
+            [{'tool_name': tool, 'count': count} for tool, count in usage_by_tool.items()],
+            key=lambda x: x['count'], reverse=True
+        )[:3]
 
         # Action Breakdown for Top Tools
         action_breakdown = {}
         for tool in [t['tool_name'] for t in top_tools]:
-            actions = list(db.tool_usage.aggregate([
-                {'$match': {'tool_name': tool}},
-                {'$group': {'_id': '$action', 'count': {'$sum': 1}}},
-                {'$project': {'action': '$_id', 'count': 1, '_id': 0}},
-                {'$sort': {'count': -1}},
-                {'$limit': 5}
-            ]))
-            action_breakdown[tool] = [(a['action'], a['count']) for a in actions] if actions else []
+            actions = sorted(actions_by_tool.get(tool, []), key=lambda a: a[1], reverse=True)[:5]
+            action_breakdown[tool] = actions
 
         # Feedback
         avg_feedback = list(db.feedback.aggregate([
@@ -142,12 +225,22 @@ def tool_usage():
         else:
             end_date = datetime.utcnow()
 
-        usage_logs = list(db.tool_usage.find(filters, {'_id': False}).sort('created_at', -1).limit(100))
-        usage_logs = [to_dict_tool_usage(log) for log in usage_logs]
+        docs, has_newer, has_older = keyset_page(
+            db.tool_usage,
+            filters,
+            {**EXPORT_PROJECTION, '_id': 1},
+            after=request.args.get('after'),
+            before=request.args.get('before')
+        )
+        usage_logs = [to_dict_tool_usage(log) for log in docs]
+        page_filters = {'tool_name': tool_name or '', 'action': action or '', 'start_date': start_date_str or '', 'end_date': end_date_str or ''}
+        pagination = {
+            'newer_url': url_for('admin.tool_usage', before=encode_page_cursor(docs[0]), **page_filters) if docs and has_newer else None,
+            'older_url': url_for('admin.tool_usage', after=encode_page_cursor(docs[-1]), **page_filters) if docs and has_older else None
+        }
 
-        # Available actions for the selected tool
-        available_actions = db.tool_usage.distinct('action', {'tool_name': tool_name} if tool_name else {})
-        available_actions = [a for a in available_actions if a]
+        # Available actions for the selected tool (cached, read from the usage rollups)
+        available_actions = get_tool_usage_actions(mongo, tool_name)
 
         logger.info(f"Tool usage analytics accessed by {current_user.username if current_user.is_authenticated else 'anonymous'}, tool={tool_name}, action={action}, start={start_date_str}, end={end_date_str}", extra={'session_id': session_id})
         return render_template(
@@ -159,7 +252,8 @@ def tool_usage():
             start_date=start_date_str,
             end_date=end_date_str,
             action=action,
-            available_actions=available_actions
+            available_actions=available_actions,
+            pagination=pagination
         )
     except Exception as e:
         logger.error(f"Error in tool usage analytics: {str(e)}", extra={'session_id': session_id})
@@ -198,32 +292,121 @@ def export_csv():
             filters['created_at'] = filters.get('created_at', {})
             filters['created_at']['$lt'] = end_date
 
-        usage_logs = list(db.tool_usage.find(filters, {'_id': False}))
-        usage_logs = [to_dict_tool_usage(log) for log in usage_logs]
-
-        si = StringIO()
-        cw = csv.writer(si)
-        cw.writerow(['ID', 'User ID', 'Session ID', 'Tool Name', 'Action', 'Created At'])
-        for log in usage_logs:
-            cw.writerow([
-                log['id'],
-                log['user_id'] or 'anonymous',
-                log['session_id'],
-                log['tool_name'],
-                log['action'] or 'N/A',
-                log['created_at'] or 'N/A'
-            ])
+        compress = request.args.get('gzip') in ('1', 'true', 'yes')
+        cursor = db.tool_usage.find(filters, EXPORT_PROJECTION, batch_size=EXPORT_BATCH_SIZE)
 
-        output = si.getvalue()
-        si.close()
-
-        logger.info(f"CSV export generated by {current_user.username if current_user.is_authenticated else 'anonymous'}, tool={tool_name}, action={action}, start={start_date_str}, end={end_date_str}", extra={'session_id': session_id})
+        logger.info(f"CSV export started by {current_user.username if current_user.is_authenticated else 'anonymous'}, tool={tool_name}, action={action}, start={start_date_str}, end={end_date_str}, gzip={compress}", extra={'session_id': session_id})
+        # No Content-Length is set, so the WSGI server sends the streamed body with chunked transfer encoding
         return Response(
-            output,
-            mimetype='text/csv',
-            headers={'Content-Disposition': 'attachment; filename=tool_usage_export.csv'}
+            stream_with_context(generate_tool_usage_csv(cursor, compress=compress)),
+            mimetype='application/gzip' if compress else 'text/csv',
+            headers={'Content-Disposition': f"attachment; filename=tool_usage_export.csv{'.gz' if compress else ''}"}
         )
     except Exception as e:
         logger.error(f"Error in CSV export: {str(e)}", extra={'session_id': session_id})
         flash(trans('admin_export_error', default='Error exporting CSV.', lang=lang), 'error')
         return redirect(url_for('index'))
+
+@admin_bp.route('/db_pool', methods=['GET'])
+@custom_login_required
+@admin_required
+def db_pool():
+    """Return connection pool metrics for the shared MongoDB client."""
+    try:
+        manager = current_app.extensions['mongo_manager']
+        return jsonify(manager.stats()), 200
+    except Exception as e:
+        logger.error(f"Error reading MongoDB pool metrics: {str(e)}")
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@admin_bp.route('/query_monitor', methods=['GET', 'POST'])
+@custom_login_required
+@admin_required
+def query_monitor_report():
+    """Return flagged query scopes (slow commands, N+1 shapes, collection scans); POST resets them."""
+    monitor = current_app.extensions.get('query_monitor')
+    if monitor is None:
+        return jsonify({'error': 'Query monitor is disabled'}), 404
+    if request.method == 'POST':
+        monitor.reset()
+        logger.info(f"Query monitor reports reset by {current_user.username}")
+    return jsonify(monitor.snapshot()), 200
+
+@admin_bp.route('/missing_translations', methods=['GET', 'POST'])
+@custom_login_required
+@admin_required
+def missing_translations_report():
+    """Return missing translation counters; POST resets them."""
+    if request.method == 'POST':
+        missing_translations.reset()
+        logger.info(f"Missing translation counters reset by {current_user.username}")
+    return jsonify(missing_translations.snapshot()), 200
+
+def _profile_args():
+    limit = min(request.args.get('limit', 25, type=int), 200)
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+    return limit, group_by
+
+@admin_bp.route('/memory', methods=['GET'])
+@custom_login_required
+@admin_required
+def memory_status():
+    """Return RSS, VMS, GC counts and tracemalloc state plus the stored snapshots."""
+    return jsonify({'process': process_memory(), 'snapshots': memory_profiler.list_snapshots()}), 200
+
+@admin_bp.route('/memory/tracemalloc/<action>', methods=['POST'])
+@custom_login_required
+@admin_required
+def memory_tracemalloc(action):
+    """Start or stop tracemalloc; stopping discards stored snapshots."""
+    if action == 'start':
+        frames = max(1, min(request.args.get('frames', 1, type=int), 25))
+        changed = memory_profiler.start(frames)
+    elif action == 'stop':
+        changed = memory_profiler.stop()
+    else:
+        return jsonify({'error': f"Unknown action '{action}'"}), 400
+    logger.info(f"tracemalloc {action} requested by {current_user.username} (changed={changed})")
+    return jsonify({'changed': changed, 'process': process_memory()}), 200
+
+@admin_bp.route('/memory/snapshots', methods=['POST'])
+@custom_login_required
+@admin_required
+def memory_take_snapshot():
+    """Take a tracemalloc snapshot; tracemalloc must be started first."""
+    try:
+        return jsonify(memory_profiler.take_snapshot(request.args.get('label'))), 201
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+@admin_bp.route('/memory/snapshots/<int:snapshot_id>', methods=['GET'])
+@custom_login_required
+@admin_required
+def memory_snapshot_top(snapshot_id):
+    """Return the top allocation sites of a stored snapshot."""
+    try:
+        limit, group_by = _profile_args()
+        return jsonify({'snapshot': memory_profiler.describe(snapshot_id), 'top': memory_profiler.top(snapshot_id, limit, group_by)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
+
+@admin_bp.route('/memory/diff', methods=['GET'])
+@custom_login_required
+@admin_required
+def memory_snapshot_diff():
+    """Return the allocation sites that grew the most between snapshots ?from= and ?to=."""
+    old_id = request.args.get('from', type=int)
+    new_id = request.args.get('to', type=int)
+    if old_id is None or new_id is None:
+        return jsonify({'error': 'from and to snapshot ids are required'}), 400
+    try:
+        limit, group_by = _profile_args()
+        return jsonify({'from': old_id, 'to': new_id, 'diff': memory_profiler.diff(old_id, new_id, limit, group_by)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
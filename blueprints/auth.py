@@ -1,5 +1,5 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, jsonify
-from flask_wtf import FlaskForm
+from translated_form import TranslatedForm
 from wtforms import StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -11,12 +11,11 @@ import uuid
 from datetime import datetime, timedelta
 import os
 from extensions import mongo
+from email_outbox import enqueue_email
 from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
 from google_auth_oauthlib.flow import Flow
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
-import smtplib
-from email.mime.text import MIMEText
 from session_utils import create_anonymous_session
 
 # Configure logging
@@ -30,7 +29,7 @@ logger.addHandler(handler)
 auth_bp = Blueprint('auth', __name__, template_folder='templates/auth', url_prefix='/auth')
 
 # Forms
-class SignupForm(FlaskForm):
+class SignupForm(TranslatedForm):
     username = StringField(validators=[DataRequired(), Length(min=3, max=80)], render_kw={
         'placeholder': trans('auth_username_placeholder', default='e.g., chukwuma123'),
         'title': trans('auth_username_tooltip', default='Choose a unique username')
@@ -51,11 +50,17 @@ class SignupForm(FlaskForm):
 
     def __init__(self, lang='en', *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.username.label.text = trans('auth_username', default='Username', lang=lang)
-        self.email.label.text = trans('core_email', default='Email', lang=lang)
-        self.password.label.text = trans('auth_password', default='Password', lang=lang)
-        self.confirm_password.label.text = trans('auth_confirm_password', default='Confirm Password', lang=lang)
-        self.submit.label.text = trans('auth_signup', default='Sign Up', lang=lang)
+        self.apply_translations(lang)
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'username': {'label': trans('auth_username', default='Username', lang=lang)},
+            'email': {'label': trans('core_email', default='Email', lang=lang)},
+            'password': {'label': trans('auth_password', default='Password', lang=lang)},
+            'confirm_password': {'label': trans('auth_confirm_password', default='Confirm Password', lang=lang)},
+            'submit': {'label': trans('auth_signup', default='Sign Up', lang=lang)}
+        }
 
     def validate_username(self, username):
         if mongo.db.users.find_one({'username': username.data}):
@@ -65,7 +70,7 @@ class SignupForm(FlaskForm):
         if get_user_by_email(mongo, email.data):
             raise ValidationError(trans('auth_email_taken', default='Email is already registered.'))
 
-class SigninForm(FlaskForm):
+class SigninForm(TranslatedForm):
     email = StringField(validators=[DataRequired(), Email()], render_kw={
         'placeholder': trans('core_email_placeholder', default='e.g., user@example.com'),
         'title': trans('core_email_tooltip', default='Enter your email address')
@@ -78,11 +83,17 @@ class SigninForm(FlaskForm):
 
     def __init__(self, lang='en', *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.email.label.text = trans('core_email', default='Email', lang=lang)
-        self.password.label.text = trans('auth_password', default='Password', lang=lang)
-        self.submit.label.text = trans('auth_signin', default='Sign In', lang=lang)
+        self.apply_translations(lang)
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'email': {'label': trans('core_email', default='Email', lang=lang)},
+            'password': {'label': trans('auth_password', default='Password', lang=lang)},
+            'submit': {'label': trans('auth_signin', default='Sign In', lang=lang)}
+        }
 
-class ChangePasswordForm(FlaskForm):
+class ChangePasswordForm(TranslatedForm):
     current_password = PasswordField(validators=[DataRequired()], render_kw={
         'placeholder': trans('auth_current_password_placeholder', default='Enter your current password'),
         'title': trans('auth_current_password', default='Enter your current password')
@@ -99,16 +110,22 @@ class ChangePasswordForm(FlaskForm):
 
     def __init__(self, lang='en', *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.current_password.label.text = trans('auth_current_password', default='Current Password', lang=lang)
-        self.new_password.label.text = trans('auth_new_password', default='New Password', lang=lang)
-        self.confirm_new_password.label.text = trans('auth_confirm_new_password', default='Confirm New Password', lang=lang)
-        self.submit.label.text = trans('auth_change_password', default='Change Password', lang=lang)
+        self.apply_translations(lang)
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'current_password': {'label': trans('auth_current_password', default='Current Password', lang=lang)},
+            'new_password': {'label': trans('auth_new_password', default='New Password', lang=lang)},
+            'confirm_new_password': {'label': trans('auth_confirm_new_password', default='Confirm New Password', lang=lang)},
+            'submit': {'label': trans('auth_change_password', default='Change Password', lang=lang)}
+        }
 
     def validate_current_password(self, current_password):
         if not check_password_hash(current_user.password_hash, current_password.data):
             raise ValidationError(trans('auth_invalid_current_password', default='Current password is incorrect.'))
 
-class ForgotPasswordForm(FlaskForm):
+class ForgotPasswordForm(TranslatedForm):
     email = StringField(validators=[DataRequired(), Email()], render_kw={
         'placeholder': trans('core_email_placeholder', default='e.g., user@example.com'),
         'title': trans('core_email_tooltip', default='Enter your email address')
@@ -117,10 +134,16 @@ class ForgotPasswordForm(FlaskForm):
 
     def __init__(self, lang='en', *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.email.label.text = trans('core_email', default='Email', lang=lang)
-        self.submit.label.text = trans('core_submit', default='Submit', lang=lang)
+        self.apply_translations(lang)
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'email': {'label': trans('core_email', default='Email', lang=lang)},
+            'submit': {'label': trans('core_submit', default='Submit', lang=lang)}
+        }
 
-class ResetPasswordForm(FlaskForm):
+class ResetPasswordForm(TranslatedForm):
     new_password = PasswordField(validators=[DataRequired(), Length(min=8)], render_kw={
         'placeholder': trans('auth_new_password_placeholder', default='Enter a new secure password'),
         'title': trans('auth_new_password', default='At least 8 characters')
@@ -133,9 +156,15 @@ class ResetPasswordForm(FlaskForm):
 
     def __init__(self, lang='en', *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.new_password.label.text = trans('auth_new_password', default='New Password', lang=lang)
-        self.confirm_new_password.label.text = trans('auth_confirm_new_password', default='Confirm New Password', lang=lang)
-        self.submit.label.text = trans('core_submit', default='Submit', lang=lang)
+        self.apply_translations(lang)
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'new_password': {'label': trans('auth_new_password', default='New Password', lang=lang)},
+            'confirm_new_password': {'label': trans('auth_confirm_new_password', default='Confirm New Password', lang=lang)},
+            'submit': {'label': trans('core_submit', default='Submit', lang=lang)}
+        }
 
 # Routes
 @auth_bp.route('/signup', methods=['GET', 'POST'])
@@ -376,7 +405,7 @@ def forgot_password():
                     'expires_at': datetime.utcnow() + timedelta(hours=1)
                 })
                 send_reset_email(form.email.data, token)
-                logger.info(f"Password reset email sent to: {form.email.data}", extra={'session_id': session_id})
+                logger.info(f"Password reset email queued for: {form.email.data}", extra={'session_id': session_id})
                 log_tool_usage(mongo, 'forgot_password', user_id=user.id, session_id=session_id, action='submit_success')
                 flash(trans('core_reset_email_sent', default='A password reset link has been sent to your email.', lang=lang), 'success')
                 return redirect(url_for('auth.signin'))
@@ -578,16 +607,18 @@ def google_callback():
         logger.info("Teardown completed for google_callback route", extra={'session_id': session_id})
 
 def send_reset_email(email, token):
+    lang = session.get('lang', 'en')
     reset_url = url_for('auth.reset_password', token=token, _external=True)
-    msg = MIMEText(f"Click this link to reset your password: {reset_url}\nThis link will expire in 1 hour.")
-    msg['Subject'] = trans('core_reset_email_subject', default='Password Reset Request')
-    msg['From'] = current_app.config['SMTP_USERNAME']
-    msg['To'] = email
     try:
-        with smtplib.SMTP(current_app.config['SMTP_SERVER'], current_app.config['SMTP_PORT']) as server:
-            server.starttls()
-            server.login(current_app.config['SMTP_USERNAME'], current_app.config['SMTP_PASSWORD'])
-            server.send_message(msg)
+        enqueue_email(
+            mongo,
+            to_email=email,
+            subject=trans('core_reset_email_subject', default='Password Reset Request', lang=lang),
+            template_key='password_reset',
+            data={'reset_url': reset_url},
+            lang=lang,
+            idempotency_key=f"password_reset:{token}"
+        )
     except Exception as e:
-        logger.error(f"Failed to send reset email to {email}: {str(e)}", extra={'session_id': session.get('sid', 'no-session-id')})
+        logger.error(f"Failed to queue reset email to {email}: {str(e)}", extra={'session_id': session.get('sid', 'no-session-id')})
         raise
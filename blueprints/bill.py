@@ -1,18 +1,19 @@
 from flask import Blueprint, request, session, redirect, url_for, render_template, flash, current_app
-from flask_wtf import FlaskForm
+from translated_form import TranslatedForm
 from wtforms import StringField, FloatField, SelectField, BooleanField, IntegerField, HiddenField
 from wtforms.validators import DataRequired, NumberRange, Email, Optional
 from flask_login import current_user
-from mailersend_email import send_email, EMAIL_CONFIG
+from mailersend_email import EMAIL_CONFIG
+from email_outbox import enqueue_email
 from datetime import datetime, date, timedelta
 import uuid
 from translations import trans
 from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
 from extensions import mongo
-from models import log_tool_usage
+from models import log_tool_usage, update_user_summary, get_user_summary, bill_summary_change, bill_due_datetime, parse_bill_due_date, compute_next_reminder_at
 from session_utils import create_anonymous_session
-from app import custom_login_required
+from session_utils import custom_login_required
 
 
 bill_bp = Blueprint(
@@ -22,8 +23,6 @@ bill_bp = Blueprint(
     url_prefix='/BILL'
 )
 
-bills_collection = mongo.db.bills
-
 def strip_commas(value):
     """Remove commas from string values for numerical fields."""
     if isinstance(value, str):
@@ -41,7 +40,7 @@ def calculate_next_due_date(due_date, frequency):
     else:
         return due_date
 
-class BillFormStep1(FlaskForm):
+class BillFormStep1(TranslatedForm):
     first_name = StringField('First Name')
     email = StringField('Email')
     bill_name = StringField('Bill Name')
@@ -51,14 +50,19 @@ class BillFormStep1(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.first_name.validators = [DataRequired(message=trans('core_first_name_required', lang))]
-        self.email.validators = [DataRequired(message=trans('core_email_required', lang)), Email()]
-        self.bill_name.validators = [DataRequired(message=trans('bill_bill_name_required', lang))]
-        self.amount.validators = [DataRequired(message=trans('bill_amount_required', lang)), NumberRange(min=0, max=10000000000)]
-        self.due_date.validators = [DataRequired(message=trans('bill_due_date_required', lang))]
-
-class BillFormStep2(FlaskForm):
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'first_name': {'validators': [DataRequired(message=trans('core_first_name_required', lang))]},
+            'email': {'validators': [DataRequired(message=trans('core_email_required', lang)), Email()]},
+            'bill_name': {'validators': [DataRequired(message=trans('bill_bill_name_required', lang))]},
+            'amount': {'validators': [DataRequired(message=trans('bill_amount_required', lang)), NumberRange(min=0, max=10000000000)]},
+            'due_date': {'validators': [DataRequired(message=trans('bill_due_date_required', lang))]}
+        }
+
+class BillFormStep2(TranslatedForm):
     frequency = SelectField('Frequency', coerce=str)
     category = SelectField('Category', coerce=str)
     status = SelectField('Status', coerce=str)
@@ -68,50 +72,62 @@ class BillFormStep2(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.frequency.validators = [DataRequired(message=trans('bill_frequency_required', lang))]
-        self.category.validators = [DataRequired(message=trans('bill_category_required', lang))]
-        self.status.validators = [DataRequired(message=trans('bill_status_required', lang))]
-        self.reminder_days.validators = [Optional(), NumberRange(min=1, max=30, message=trans('bill_reminder_days_required', lang))]
-
-        self.frequency.choices = [
-            ('one-time', trans('bill_frequency_one_time', lang)),
-            ('weekly', trans('bill_frequency_weekly', lang)),
-            ('monthly', trans('bill_frequency_monthly', lang)),
-            ('quarterly', trans('bill_frequency_quarterly', lang))
-        ]
-        self.category.choices = [
-            ('utilities', trans('bill_category_utilities', lang)),
-            ('rent', trans('bill_category_rent', lang)),
-            ('data_internet', trans('bill_category_data_internet', lang)),
-            ('ajo_esusu_adashe', trans('bill_category_ajo_esusu_adashe', lang)),
-            ('food', trans('bill_category_food', lang)),
-            ('transport', trans('bill_category_transport', lang)),
-            ('clothing', trans('bill_category_clothing', lang)),
-            ('education', trans('bill_category_education', lang)),
-            ('healthcare', trans('bill_category_healthcare', lang)),
-            ('entertainment', trans('bill_category_entertainment', lang)),
-            ('airtime', trans('bill_category_airtime', lang)),
-            ('school_fees', trans('bill_category_school_fees', lang)),
-            ('savings_investments', trans('bill_category_savings_investments', lang)),
-            ('other', trans('bill_category_other', lang))
-        ]
-        self.status.choices = [
-            ('unpaid', trans('bill_status_unpaid', lang)),
-            ('paid', trans('bill_status_paid', lang)),
-            ('pending', trans('bill_status_pending', lang)),
-            ('overdue', trans('bill_status_overdue', lang))
-        ]
-        self.send_email.label.text = trans('bill_send_email', lang)
-        self.reminder_days.label.text = trans('bill_reminder_days', lang)
-
+        self.apply_translations(session.get('lang', 'en'))
         self.frequency.default = self.frequency.choices[0][0]
         self.category.default = self.category.choices[0][0]
         self.status.default = self.status.choices[0][0]
-        self.process()
+        # Reprocess so the translated defaults apply, keeping the submitted values and the session data
+        self.process(formdata=request.form if self.is_submitted() else None, data=kwargs.get('data'))
 
         current_app.logger.info(f"BillFormStep2 initialized - frequency choices: {self.frequency.choices}, category choices: {self.category.choices}, status choices: {self.status.choices}")
 
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'frequency': {
+                'validators': [DataRequired(message=trans('bill_frequency_required', lang))],
+                'choices': [
+                    ('one-time', trans('bill_frequency_one_time', lang)),
+                    ('weekly', trans('bill_frequency_weekly', lang)),
+                    ('monthly', trans('bill_frequency_monthly', lang)),
+                    ('quarterly', trans('bill_frequency_quarterly', lang))
+                ]
+            },
+            'category': {
+                'validators': [DataRequired(message=trans('bill_category_required', lang))],
+                'choices': [
+                    ('utilities', trans('bill_category_utilities', lang)),
+                    ('rent', trans('bill_category_rent', lang)),
+                    ('data_internet', trans('bill_category_data_internet', lang)),
+                    ('ajo_esusu_adashe', trans('bill_category_ajo_esusu_adashe', lang)),
+                    ('food', trans('bill_category_food', lang)),
+                    ('transport', trans('bill_category_transport', lang)),
+                    ('clothing', trans('bill_category_clothing', lang)),
+                    ('education', trans('bill_category_education', lang)),
+                    ('healthcare', trans('bill_category_healthcare', lang)),
+                    ('entertainment', trans('bill_category_entertainment', lang)),
+                    ('airtime', trans('bill_category_airtime', lang)),
+                    ('school_fees', trans('bill_category_school_fees', lang)),
+                    ('savings_investments', trans('bill_category_savings_investments', lang)),
+                    ('other', trans('bill_category_other', lang))
+                ]
+            },
+            'status': {
+                'validators': [DataRequired(message=trans('bill_status_required', lang))],
+                'choices': [
+                    ('unpaid', trans('bill_status_unpaid', lang)),
+                    ('paid', trans('bill_status_paid', lang)),
+                    ('pending', trans('bill_status_pending', lang)),
+                    ('overdue', trans('bill_status_overdue', lang))
+                ]
+            },
+            'send_email': {'label': trans('bill_send_email', lang)},
+            'reminder_days': {
+                'label': trans('bill_reminder_days', lang),
+                'validators': [Optional(), NumberRange(min=1, max=30, message=trans('bill_reminder_days_required', lang))]
+            }
+        }
+
 @bill_bp.route('/form/step1', methods=['GET', 'POST'])
 def form_step1():
     if 'sid' not in session:
@@ -235,22 +251,25 @@ def form_step2():
                     'first_name': bill_step1_data['first_name'],
                     'bill_name': bill_step1_data['bill_name'],
                     'amount': float(bill_step1_data['amount']),
-                    'due_date': due_date.isoformat(),  # Convert datetime.date to ISO string
+                    'due_date': bill_due_datetime(due_date),
                     'frequency': form.frequency.data,
                     'category': form.category.data,
                     'status': status,
                     'send_email': form.send_email.data,
                     'reminder_days': form.reminder_days.data if form.send_email.data else None
                 }
+                bill_data['next_reminder_at'] = compute_next_reminder_at(bill_data)
+                saved_at = datetime.utcnow()
 
                 if bill_id:
                     # Update existing bill
-                    bill = bills_collection.find_one({'_id': ObjectId(bill_id), **filter_kwargs})
+                    bill = mongo.db.bills.find_one({'_id': ObjectId(bill_id), **filter_kwargs})
                     if bill:
-                        bills_collection.update_one(
+                        mongo.db.bills.update_one(
                             {'_id': ObjectId(bill_id), **filter_kwargs},
                             {'$set': bill_data}
                         )
+                        update_user_summary(mongo, filter_kwargs, inc_fields=bill_summary_change(bill, {**bill, **bill_data}))
                         current_app.logger.info(f"Bill updated successfully: {bill_id}, category={bill_data['category']}, frequency={bill_data['frequency']}")
                         flash(trans('bill_updated_success', lang) or 'Bill updated successfully', 'success')
                     else:
@@ -259,7 +278,9 @@ def form_step2():
                 else:
                     # Create new bill
                     bill_data['_id'] = ObjectId()
-                    bills_collection.insert_one(bill_data)
+                    bill_data['created_at'] = saved_at
+                    mongo.db.bills.insert_one(bill_data)
+                    update_user_summary(mongo, filter_kwargs, inc_fields=bill_summary_change(new_bill=bill_data))
                     current_app.logger.info(f"Bill saved successfully for {bill_step1_data['email']}: {bill_data['bill_name']}, category={bill_data['category']}, frequency={bill_data['frequency']}")
                     flash(trans('bill_added_success', lang) or 'Bill added successfully', 'success')
 
@@ -267,13 +288,11 @@ def form_step2():
                     try:
                         config = EMAIL_CONFIG['bill_reminder']
                         subject = trans(config['subject_key'], lang=lang)
-                        template = config['template']
-                        send_email(
-                            app=current_app,
-                            logger=current_app.logger,
+                        enqueue_email(
+                            mongo,
                             to_email=bill_step1_data['email'],
                             subject=subject,
-                            template_name=template,
+                            template_key='bill_reminder',
                             data={
                                 'first_name': bill_step1_data['first_name'],
                                 'bills': [{
@@ -286,9 +305,11 @@ def form_step2():
                                 'cta_url': url_for('bill.dashboard', _external=True),
                                 'unsubscribe_url': url_for('bill.unsubscribe', email=bill_step1_data['email'], _external=True)
                             },
-                            lang=lang
+                            lang=lang,
+                            # Each save is its own email; re-saving identical bill details must not be deduplicated away
+                            idempotency_key=f"bill_reminder:{bill_id or bill_data['_id']}:{saved_at.isoformat()}"
                         )
-                        current_app.logger.info(f"Email sent to {bill_step1_data['email']}")
+                        current_app.logger.info(f"Email queued for {bill_step1_data['email']}")
                     except Exception as e:
                         current_app.logger.error(f"Failed to send email: {str(e)}")
                         flash(trans('email_send_failed', lang) or 'Failed to send email reminder', 'warning')
@@ -347,8 +368,10 @@ def dashboard():
 
     try:
         filter_kwargs = {'user_id': current_user.id} if current_user.is_authenticated else {'session_id': session['sid']}
-        bills = bills_collection.find(filter_kwargs)
+        bills = mongo.db.bills.find(filter_kwargs)
         bills_data = [(str(bill['_id']), bill) for bill in bills]
+        summary = get_user_summary(mongo, filter_kwargs)
+        bill_totals = summary.get('bills') if summary else None
 
         paid_count = 0
         unpaid_count = 0
@@ -372,24 +395,26 @@ def dashboard():
                 current_app.logger.warning(f"Skipping invalid bill record {b_id}: invalid amount {bill.get('amount')}")
                 continue
 
-            total_bills += bill_amount
-            cat = bill['category']
-            categories[cat] = categories.get(cat, 0) + bill_amount
-
-            if bill['status'] == 'paid':
-                paid_count += 1
-                total_paid += bill_amount
-            elif bill['status'] == 'unpaid':
-                unpaid_count += 1
-                total_unpaid += bill_amount
-            elif bill['status'] == 'overdue':
-                overdue_count += 1
-                total_overdue += bill_amount
-            elif bill['status'] == 'pending':
-                pending_count += 1
+            if bill_totals is None:
+                total_bills += bill_amount
+                cat = bill['category']
+                categories[cat] = categories.get(cat, 0) + bill_amount
+
+                if bill['status'] == 'paid':
+                    paid_count += 1
+                    total_paid += bill_amount
+                elif bill['status'] == 'unpaid':
+                    unpaid_count += 1
+                    total_unpaid += bill_amount
+                elif bill['status'] == 'overdue':
+                    overdue_count += 1
+                    total_overdue += bill_amount
+                elif bill['status'] == 'pending':
+                    pending_count += 1
 
             try:
-                bill_due_date = datetime.strptime(bill['due_date'], '%Y-%m-%d').date()  # Parse string to datetime.date
+                bill_due_date = parse_bill_due_date(bill['due_date'])
+                bill['due_date'] = bill_due_date
                 if bill_due_date == today:
                     due_today.append((b_id, bill))
                 if today <= bill_due_date <= (today + timedelta(days=7)):
@@ -398,10 +423,21 @@ def dashboard():
                     due_month.append((b_id, bill))
                 if today < bill_due_date:
                     upcoming_bills.append((b_id, bill))
-            except ValueError:
+            except (ValueError, TypeError):
                 current_app.logger.warning(f"Skipping invalid bill record {b_id}: invalid due_date {bill.get('due_date')}")
                 continue
 
+        if bill_totals is not None:
+            paid_count = bill_totals.get('paid_count', 0)
+            unpaid_count = bill_totals.get('unpaid_count', 0)
+            overdue_count = bill_totals.get('overdue_count', 0)
+            pending_count = bill_totals.get('pending_count', 0)
+            total_paid = bill_totals.get('total_paid', 0.0)
+            total_unpaid = bill_totals.get('total_unpaid', 0.0)
+            total_overdue = bill_totals.get('total_overdue', 0.0)
+            total_bills = bill_totals.get('total_amount', 0.0)
+            categories = {cat: amount for cat, amount in bill_totals.get('categories', {}).items() if amount}
+
         return render_template(
             'BILL/bill_dashboard.html',
             bills=bills_data,
@@ -463,16 +499,13 @@ def view_edit():
     )
 
     try:
-        bills = bills_collection.find(filter_kwargs)
+        bills = mongo.db.bills.find(filter_kwargs)
         bills_data = []
         for bill in bills:
             try:
-                due_date = bill['due_date']
-                if isinstance(due_date, str):
-                    due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
-            except ValueError:
-                current_app.logger.warning(f"Invalid due_date format for bill {bill['_id']}: {due_date}")
-                due_date = None
+                bill['due_date'] = parse_bill_due_date(bill['due_date'])
+            except (ValueError, TypeError):
+                current_app.logger.warning(f"Invalid due_date format for bill {bill['_id']}: {bill.get('due_date')}")
             form = BillFormStep2(
                 data={
                     'frequency': bill['frequency'],
@@ -488,7 +521,7 @@ def view_edit():
         if request.method == 'POST':
             action = request.form.get('action')
             bill_id = request.form.get('bill_id')
-            bill = bills_collection.find_one({'_id': ObjectId(bill_id), **filter_kwargs})
+            bill = mongo.db.bills.find_one({'_id': ObjectId(bill_id), **filter_kwargs})
             if not bill:
                 flash(trans('bill_bill_not_found', lang) or 'Bill not found', 'danger')
                 return redirect(url_for('bill.view_edit'))
@@ -504,16 +537,19 @@ def view_edit():
                 form = BillFormStep2()
                 if form.validate_on_submit():
                     try:
-                        bills_collection.update_one(
+                        updates = {
+                            'frequency': form.frequency.data,
+                            'category': form.category.data,
+                            'status': form.status.data,
+                            'send_email': form.send_email.data,
+                            'reminder_days': form.reminder_days.data if form.send_email.data else None
+                        }
+                        updates['next_reminder_at'] = compute_next_reminder_at({**bill, **updates})
+                        mongo.db.bills.update_one(
                             {'_id': ObjectId(bill_id), **filter_kwargs},
-                            {'$set': {
-                                'frequency': form.frequency.data,
-                                'category': form.category.data,
-                                'status': form.status.data,
-                                'send_email': form.send_email.data,
-                                'reminder_days': form.reminder_days.data if form.send_email.data else None
-                            }}
+                            {'$set': updates}
                         )
+                        update_user_summary(mongo, filter_kwargs, inc_fields=bill_summary_change(bill, {**bill, **updates}))
                         current_app.logger.info(f"Bill updated successfully: {bill_id}, category={form.category.data}, frequency={form.frequency.data}")
                         flash(trans('bill_updated_success', lang) or 'Bill updated successfully', 'success')
                     except Exception as e:
@@ -535,10 +571,8 @@ def view_edit():
                     action='edit_bill'
                 )
                 try:
-                    due_date = bill['due_date']
-                    if isinstance(due_date, str):
-                        due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
-                except ValueError:
+                    due_date = parse_bill_due_date(bill['due_date'])
+                except (ValueError, TypeError):
                     current_app.logger.error(f"Invalid due_date format for bill {bill_id}: {bill['due_date']}")
                     flash(trans('bill_due_date_format_invalid', lang) or 'Invalid due date format', 'danger')
                     return redirect(url_for('bill.view_edit'))
@@ -569,7 +603,9 @@ def view_edit():
                     action='delete_bill'
                 )
                 try:
-                    bills_collection.delete_one({'_id': ObjectId(bill_id), **filter_kwargs})
+                    result = mongo.db.bills.delete_one({'_id': ObjectId(bill_id), **filter_kwargs})
+                    if result.deleted_count:
+                        update_user_summary(mongo, filter_kwargs, inc_fields=bill_summary_change(old_bill=bill))
                     current_app.logger.info(f"Bill deleted successfully: {bill_id}")
                     flash(trans('bill_bill_deleted_success', lang) or 'Bill deleted successfully', 'success')
                 except Exception as e:
@@ -588,18 +624,17 @@ def view_edit():
                 try:
                     current_status = bill['status']
                     new_status = 'paid' if current_status == 'unpaid' else 'unpaid'
-                    bills_collection.update_one(
+                    mongo.db.bills.update_one(
                         {'_id': ObjectId(bill_id), **filter_kwargs},
-                        {'$set': {'status': new_status}}
+                        {'$set': {'status': new_status, 'next_reminder_at': compute_next_reminder_at({**bill, 'status': new_status})}}
                     )
+                    update_user_summary(mongo, filter_kwargs, inc_fields=bill_summary_change(bill, {**bill, 'status': new_status}))
                     current_app.logger.info(f"Bill status toggled: {bill_id}, new_status={new_status}")
                     flash(trans('bill_bill_status_toggled_success', lang) or 'Bill status updated', 'success')
                     if new_status == 'paid' and bill['frequency'] != 'one-time':
                         try:
-                            due_date = bill['due_date']
-                            if isinstance(due_date, str):
-                                due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
-                        except ValueError:
+                            due_date = parse_bill_due_date(bill['due_date'])
+                        except (ValueError, TypeError):
                             current_app.logger.error(f"Invalid due_date format for bill {bill_id}: {bill['due_date']}")
                             flash(trans('bill_due_date_format_invalid', lang) or 'Invalid due date format', 'danger')
                             return redirect(url_for('bill.view_edit'))
@@ -612,14 +647,17 @@ def view_edit():
                             'first_name': bill['first_name'],
                             'bill_name': bill['bill_name'],
                             'amount': bill['amount'],
-                            'due_date': new_due_date.isoformat(),  # Convert to ISO string
+                            'due_date': bill_due_datetime(new_due_date),
                             'frequency': bill['frequency'],
                             'category': bill['category'],
                             'status': 'unpaid',
                             'send_email': bill['send_email'],
-                            'reminder_days': bill['reminder_days']
+                            'reminder_days': bill['reminder_days'],
+                            'created_at': datetime.utcnow()
                         }
-                        bills_collection.insert_one(new_bill)
+                        new_bill['next_reminder_at'] = compute_next_reminder_at(new_bill)
+                        mongo.db.bills.insert_one(new_bill)
+                        update_user_summary(mongo, filter_kwargs, inc_fields=bill_summary_change(new_bill=new_bill))
                         current_app.logger.info(f"New recurring bill created: {new_bill['_id']}")
                         flash(trans('bill_new_recurring_bill_success', lang).format(bill_name=bill['bill_name']), 'success')
                 except Exception as e:
@@ -644,9 +682,9 @@ def unsubscribe():
     )
     try:
         lang = session.get('lang', 'en')
-        bills_collection.update_many(
+        mongo.db.bills.update_many(
             {'user_email': email},
-            {'$set': {'send_email': False}}
+            {'$set': {'send_email': False, 'next_reminder_at': None}}
         )
         current_app.logger.info(f"Unsubscribed email: {email}")
         flash(trans('bill_unsubscribe_success', lang) or 'Unsubscribed successfully', 'success')
@@ -1,18 +1,19 @@
 from flask import Blueprint, request, session, redirect, url_for, render_template, flash, current_app
-from flask_wtf import FlaskForm
+from translated_form import TranslatedForm
 from wtforms import StringField, FloatField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, NumberRange, Optional, Email, ValidationError
 from flask_login import current_user
-from mailersend_email import send_email, EMAIL_CONFIG
+from mailersend_email import EMAIL_CONFIG
+from email_outbox import enqueue_email
 from datetime import datetime
 import uuid
 import re
 from translations import trans
 from extensions import mongo
 from bson import ObjectId
-from models import log_tool_usage
+from models import log_tool_usage, update_user_summary, summary_owner, summary_section
 from session_utils import create_anonymous_session
-from app import custom_login_required
+from session_utils import custom_login_required
 
 budget_bp = Blueprint(
     'budget',
@@ -27,7 +28,7 @@ def strip_commas(value):
         return value.replace(',', '')
     return value
 
-class Step1Form(FlaskForm):
+class Step1Form(TranslatedForm):
     first_name = StringField()
     email = StringField()
     send_email = BooleanField()
@@ -35,13 +36,22 @@ class Step1Form(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.first_name.label.text = trans('budget_first_name', lang) or 'First Name'
-        self.email.label.text = trans('budget_email', lang) or 'Email'
-        self.send_email.label.text = trans('budget_send_email', lang) or 'Send Email Summary'
-        self.submit.label.text = trans('budget_next', lang) or 'Next'
-        self.first_name.validators = [DataRequired(message=trans('budget_first_name_required', lang) or 'First name is required')]
-        self.email.validators = [Optional(), Email(message=trans('budget_email_invalid', lang) or 'Invalid email address')]
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'first_name': {
+                'label': trans('budget_first_name', lang) or 'First Name',
+                'validators': [DataRequired(message=trans('budget_first_name_required', lang) or 'First name is required')]
+            },
+            'email': {
+                'label': trans('budget_email', lang) or 'Email',
+                'validators': [Optional(), Email(message=trans('budget_email_invalid', lang) or 'Invalid email address')]
+            },
+            'send_email': {'label': trans('budget_send_email', lang) or 'Send Email Summary'},
+            'submit': {'label': trans('budget_next', lang) or 'Next'}
+        }
 
     def validate_email(self, field):
         """Custom email validation to handle empty strings."""
@@ -51,19 +61,26 @@ class Step1Form(FlaskForm):
                 current_app.logger.warning(f"Invalid email format for session {session.get('sid', 'no-session-id')}: {field.data}")
                 raise ValidationError(trans('budget_email_invalid', session.get('lang', 'en')) or 'Invalid email address')
 
-class Step2Form(FlaskForm):
+class Step2Form(TranslatedForm):
     income = FloatField()
     submit = SubmitField()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.income.label.text = trans('budget_monthly_income', lang) or 'Monthly Income'
-        self.submit.label.text = trans('budget_next', lang) or 'Next'
-        self.income.validators = [
-            DataRequired(message=trans('budget_income_required', lang) or 'Income is required'),
-            NumberRange(min=0, max=10000000000, message=trans('budget_income_max', lang) or 'Income must be positive and reasonable')
-        ]
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'income': {
+                'label': trans('budget_monthly_income', lang) or 'Monthly Income',
+                'validators': [
+                    DataRequired(message=trans('budget_income_required', lang) or 'Income is required'),
+                    NumberRange(min=0, max=10000000000, message=trans('budget_income_max', lang) or 'Income must be positive and reasonable')
+                ]
+            },
+            'submit': {'label': trans('budget_next', lang) or 'Next'}
+        }
 
     def validate_income(self, field):
         """Custom validator to handle comma-separated numbers."""
@@ -77,7 +94,7 @@ class Step2Form(FlaskForm):
             current_app.logger.warning(f"Invalid income value for session {session.get('sid', 'no-session-id')}: {field.data}")
             raise ValidationError(trans('budget_income_invalid', session.get('lang', 'en')) or 'Invalid income format')
 
-class Step3Form(FlaskForm):
+class Step3Form(TranslatedForm):
     housing = FloatField()
     food = FloatField()
     transport = FloatField()
@@ -88,19 +105,25 @@ class Step3Form(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.housing.label.text = trans('budget_housing_rent', lang) or 'Housing/Rent'
-        self.food.label.text = trans('budget_food', lang) or 'Food'
-        self.transport.label.text = trans('budget_transport', lang) or 'Transport'
-        self.dependents.label.text = trans('budget_dependents_support', lang) or 'Dependents Support'
-        self.miscellaneous.label.text = trans('budget_miscellaneous', lang) or 'Miscellaneous'
-        self.others.label.text = trans('budget_others', lang) or 'Others'
-        self.submit.label.text = trans('budget_next', lang) or 'Next'
-        for field in [self.housing, self.food, self.transport, self.dependents, self.miscellaneous, self.others]:
-            field.validators = [
-                DataRequired(message=trans(f'budget_{field.name}_required', lang) or f'{field.label.text} is required'),
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        fields = {
+            'housing': {'label': trans('budget_housing_rent', lang) or 'Housing/Rent'},
+            'food': {'label': trans('budget_food', lang) or 'Food'},
+            'transport': {'label': trans('budget_transport', lang) or 'Transport'},
+            'dependents': {'label': trans('budget_dependents_support', lang) or 'Dependents Support'},
+            'miscellaneous': {'label': trans('budget_miscellaneous', lang) or 'Miscellaneous'},
+            'others': {'label': trans('budget_others', lang) or 'Others'}
+        }
+        for name, settings in fields.items():
+            settings['validators'] = [
+                DataRequired(message=trans(f'budget_{name}_required', lang) or f"{settings['label']} is required"),
                 NumberRange(min=0, message=trans('budget_amount_positive', lang) or 'Amount must be positive')
             ]
+        fields['submit'] = {'label': trans('budget_next', lang) or 'Next'}
+        return fields
 
     def validate(self, extra_validators=None):
         """Custom validation for all float fields."""
@@ -117,19 +140,26 @@ class Step3Form(FlaskForm):
                 return False
         return True
 
-class Step4Form(FlaskForm):
+class Step4Form(TranslatedForm):
     savings_goal = FloatField()
     submit = SubmitField()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.savings_goal.label.text = trans('budget_savings_goal', lang) or 'Monthly Savings Goal'
-        self.submit.label.text = trans('budget_submit', lang) or 'Calculate Budget'
-        self.savings_goal.validators = [
-            DataRequired(message=trans('budget_savings_goal_required', lang) or 'Savings goal is required'),
-            NumberRange(min=0, message=trans('budget_amount_positive', lang) or 'Amount must be positive')
-        ]
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'savings_goal': {
+                'label': trans('budget_savings_goal', lang) or 'Monthly Savings Goal',
+                'validators': [
+                    DataRequired(message=trans('budget_savings_goal_required', lang) or 'Savings goal is required'),
+                    NumberRange(min=0, message=trans('budget_amount_positive', lang) or 'Amount must be positive')
+                ]
+            },
+            'submit': {'label': trans('budget_submit', lang) or 'Calculate Budget'}
+        }
 
     def validate_savings_goal(self, field):
         """Custom validator to handle comma-separated numbers."""
@@ -165,7 +195,7 @@ def step1():
     form = Step1Form(data=form_data)
     try:
         if request.method == 'POST':
-            current_app.logger.info(f"POST request received for step1, session {session['sid']} {'(anonymous)' if session.get('is_anonymous') else ''}: Raw form data: {dict(request.form)}")
+            current_app.logger.info("POST request received for step1, session %s %s: Raw form data: %s", session['sid'], '(anonymous)' if session.get('is_anonymous') else '', request.form.to_dict())
             if form.validate_on_submit():
                 log_tool_usage(
                     mongo,
@@ -209,7 +239,7 @@ def step2():
             flash(trans("budget_missing_previous_steps") or "Please complete previous steps", "danger")
             return redirect(url_for('budget.step1'))
         if request.method == 'POST':
-            current_app.logger.info(f"POST request received for step2, session {session['sid']} {'(anonymous)' if session.get('is_anonymous') else ''}: Raw form data: {dict(request.form)}")
+            current_app.logger.info("POST request received for step2, session %s %s: Raw form data: %s", session['sid'], '(anonymous)' if session.get('is_anonymous') else '', request.form.to_dict())
             if form.validate_on_submit():
                 log_tool_usage(
                     mongo,
@@ -253,7 +283,7 @@ def step3():
             flash(trans("budget_missing_previous_steps") or "Please complete previous steps", "danger")
             return redirect(url_for('budget.step1'))
         if request.method == 'POST':
-            current_app.logger.info(f"POST request received for step3, session {session['sid']} {'(anonymous)' if session.get('is_anonymous') else ''}: Raw form data: {dict(request.form)}")
+            current_app.logger.info("POST request received for step3, session %s %s: Raw form data: %s", session['sid'], '(anonymous)' if session.get('is_anonymous') else '', request.form.to_dict())
             if form.validate_on_submit():
                 log_tool_usage(
                     mongo,
@@ -303,7 +333,7 @@ def step4():
             return redirect(url_for('budget.step1'))
 
         if request.method == 'POST':
-            current_app.logger.info(f"POST request received for step4, session {session['sid']} {'(anonymous)' if session.get('is_anonymous') else ''}: Raw form data: {dict(request.form)}")
+            current_app.logger.info("POST request received for step4, session %s %s: Raw form data: %s", session['sid'], '(anonymous)' if session.get('is_anonymous') else '', request.form.to_dict())
             if form.validate_on_submit():
                 log_tool_usage(
                     mongo,
@@ -354,6 +384,7 @@ def step4():
                 try:
                     mongo.db.budgets.insert_one(budget_data)
                     current_app.logger.info(f"Budget saved successfully to MongoDB for session {session['sid']}")
+                    update_user_summary(mongo, summary_owner(budget_data), set_fields=summary_section('budget', budget_data))
                 except Exception as e:
                     current_app.logger.error(f"Failed to save budget to MongoDB for session {session['sid']}: {str(e)}")
                     flash(trans("budget_storage_error") or "Failed to save budget data", "danger")
@@ -365,13 +396,11 @@ def step4():
                     try:
                         config = EMAIL_CONFIG["budget"]
                         subject = trans(config["subject_key"], lang=lang)
-                        template = config["template"]
-                        send_email(
-                            app=current_app,
-                            logger=current_app.logger,
+                        enqueue_email(
+                            mongo,
                             to_email=email,
                             subject=subject,
-                            template_name=template,
+                            template_key='budget',
                             data={
                                 "first_name": step1_data.get('first_name', ''),
                                 "income": income,
@@ -387,7 +416,8 @@ def step4():
                                 "created_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                                 "cta_url": url_for('budget.dashboard', _external=True)
                             },
-                            lang=lang
+                            lang=lang,
+                            idempotency_key=f"budget:{budget_data['_id']}"
                         )
                     except Exception as e:
                         current_app.logger.error(f"Failed to send email: {str(e)}")
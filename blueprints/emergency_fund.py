@@ -1,19 +1,20 @@
 from flask import Blueprint, request, session, redirect, url_for, render_template, flash, current_app, jsonify
-from flask_wtf import FlaskForm
+from translated_form import TranslatedForm
 from wtforms import StringField, FloatField, IntegerField, SelectField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, Optional, Email, NumberRange
 from flask_login import current_user
-from mailersend_email import send_email, EMAIL_CONFIG
+from mailersend_email import EMAIL_CONFIG
+from email_outbox import enqueue_email
 from datetime import datetime
 import uuid
 import json
 from translations import trans
 from extensions import mongo
 from bson import ObjectId
-from models import log_tool_usage
+from models import log_tool_usage, update_user_summary, get_user_summary, summary_owner, summary_section
 import os
 from session_utils import create_anonymous_session
-from app import custom_login_required
+from session_utils import custom_login_required
 
 
 emergency_fund_bp = Blueprint(
@@ -41,7 +42,7 @@ class CommaSeparatedIntegerField(IntegerField):
                 self.data = None
                 raise ValueError(self.gettext('Not a number'))
 
-class Step1Form(FlaskForm):
+class Step1Form(TranslatedForm):
     first_name = StringField(validators=[DataRequired()])
     email = StringField(validators=[Optional(), Email()])
     email_opt_in = BooleanField(default=False)
@@ -49,30 +50,52 @@ class Step1Form(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.first_name.label.text = trans('emergency_fund_first_name', lang=lang)
-        self.first_name.validators[0].message = trans('required_first_name', lang=lang, default='Please enter your first name.')
-        self.email.label.text = trans('emergency_fund_email', lang=lang)
-        self.email.validators[1].message = trans('emergency_fund_email_invalid', lang=lang, default='Please enter a valid email address.')
-        self.email_opt_in.label.text = trans('emergency_fund_send_email', lang=lang)
-        self.submit.label.text = trans('core_next', lang=lang)
-
-class Step2Form(FlaskForm):
+        self.apply_translations(session.get('lang', 'en'))
+
+    # Validators are rebuilt per language rather than mutating the shared class-level instances
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'first_name': {
+                'label': trans('emergency_fund_first_name', lang=lang),
+                'validators': [DataRequired(message=trans('required_first_name', lang=lang, default='Please enter your first name.'))]
+            },
+            'email': {
+                'label': trans('emergency_fund_email', lang=lang),
+                'validators': [Optional(), Email(message=trans('emergency_fund_email_invalid', lang=lang, default='Please enter a valid email address.'))]
+            },
+            'email_opt_in': {'label': trans('emergency_fund_send_email', lang=lang)},
+            'submit': {'label': trans('core_next', lang=lang)}
+        }
+
+class Step2Form(TranslatedForm):
     monthly_expenses = CommaSeparatedFloatField(validators=[DataRequired(), NumberRange(min=0, max=10000000000)])
     monthly_income = CommaSeparatedFloatField(validators=[Optional(), NumberRange(min=0, max=10000000000)])
     submit = SubmitField()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.monthly_expenses.label.text = trans('emergency_fund_monthly_expenses', lang=lang)
-        self.monthly_expenses.validators[0].message = trans('required_monthly_expenses', lang=lang, default='Please enter your monthly expenses.')
-        self.monthly_expenses.validators[1].message = trans('emergency_fund_monthly_exceed', lang=lang, default='Amount exceeds maximum limit.')
-        self.monthly_income.label.text = trans('emergency_fund_monthly_income', lang=lang)
-        self.monthly_income.validators[1].message = trans('emergency_fund_monthly_exceed', lang=lang, default='Amount exceeds maximum limit.')
-        self.submit.label.text = trans('core_next', lang=lang)
-
-class Step3Form(FlaskForm):
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        exceed = trans('emergency_fund_monthly_exceed', lang=lang, default='Amount exceeds maximum limit.')
+        return {
+            'monthly_expenses': {
+                'label': trans('emergency_fund_monthly_expenses', lang=lang),
+                'validators': [
+                    DataRequired(message=trans('required_monthly_expenses', lang=lang, default='Please enter your monthly expenses.')),
+                    NumberRange(min=0, max=10000000000, message=exceed)
+                ]
+            },
+            'monthly_income': {
+                'label': trans('emergency_fund_monthly_income', lang=lang),
+                'validators': [Optional(), NumberRange(min=0, max=10000000000, message=exceed)]
+            },
+            'submit': {'label': trans('core_next', lang=lang)}
+        }
+
+class Step3Form(TranslatedForm):
     current_savings = CommaSeparatedFloatField(validators=[Optional(), NumberRange(min=0, max=10000000000)])
     risk_tolerance_level = SelectField(validators=[DataRequired()], choices=[
         ('low', 'Low'), ('medium', 'Medium'), ('high', 'High')
@@ -82,21 +105,32 @@ class Step3Form(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.current_savings.label.text = trans('emergency_fund_current_savings', lang=lang)
-        self.current_savings.validators[1].message = trans('emergency_fund_savings_max', lang=lang, default='Amount exceeds maximum limit.')
-        self.risk_tolerance_level.label.text = trans('emergency_fund_risk_tolerance_level', lang=lang)
-        self.risk_tolerance_level.validators[0].message = trans('required_risk_tolerance', lang=lang, default='Please select your risk tolerance.')
-        self.risk_tolerance_level.choices = [
-            ('low', trans('emergency_fund_risk_tolerance_level_low', lang=lang)),
-            ('medium', trans('emergency_fund_risk_tolerance_level_medium', lang=lang)),
-            ('high', trans('emergency_fund_risk_tolerance_level_high', lang=lang))
-        ]
-        self.dependents.label.text = trans('emergency_fund_dependents', lang=lang)
-        self.dependents.validators[1].message = trans('emergency_fund_dependents_max', lang=lang, default='Number of dependents exceeds maximum.')
-        self.submit.label.text = trans('core_next', lang=lang)
-
-class Step4Form(FlaskForm):
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'current_savings': {
+                'label': trans('emergency_fund_current_savings', lang=lang),
+                'validators': [Optional(), NumberRange(min=0, max=10000000000, message=trans('emergency_fund_savings_max', lang=lang, default='Amount exceeds maximum limit.'))]
+            },
+            'risk_tolerance_level': {
+                'label': trans('emergency_fund_risk_tolerance_level', lang=lang),
+                'validators': [DataRequired(message=trans('required_risk_tolerance', lang=lang, default='Please select your risk tolerance.'))],
+                'choices': [
+                    ('low', trans('emergency_fund_risk_tolerance_level_low', lang=lang)),
+                    ('medium', trans('emergency_fund_risk_tolerance_level_medium', lang=lang)),
+                    ('high', trans('emergency_fund_risk_tolerance_level_high', lang=lang))
+                ]
+            },
+            'dependents': {
+                'label': trans('emergency_fund_dependents', lang=lang),
+                'validators': [Optional(), NumberRange(min=0, max=100, message=trans('emergency_fund_dependents_max', lang=lang, default='Number of dependents exceeds maximum.'))]
+            },
+            'submit': {'label': trans('core_next', lang=lang)}
+        }
+
+class Step4Form(TranslatedForm):
     timeline = SelectField(validators=[DataRequired()], choices=[
         ('6', '6 Months'), ('12', '12 Months'), ('18', '18 Months')
     ])
@@ -105,14 +139,22 @@ class Step4Form(FlaskForm):
     def __init__(self, lang, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.lang = lang
-        self.timeline.label.text = trans('emergency_fund_timeline', lang=lang)
-        self.timeline.validators[0].message = trans('required_timeline', lang=lang, default='Please select a timeline.')
-        self.timeline.choices = [
-            ('6', trans('emergency_fund_6_months', lang=lang)),
-            ('12', trans('emergency_fund_12_months', lang=lang)),
-            ('18', trans('emergency_fund_18_months', default='18 Months', lang=lang))
-        ]
-        self.submit.label.text = trans('emergency_fund_calculate_button', lang=lang)
+        self.apply_translations(lang)
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'timeline': {
+                'label': trans('emergency_fund_timeline', lang=lang),
+                'validators': [DataRequired(message=trans('required_timeline', lang=lang, default='Please select a timeline.'))],
+                'choices': [
+                    ('6', trans('emergency_fund_6_months', lang=lang)),
+                    ('12', trans('emergency_fund_12_months', lang=lang)),
+                    ('18', trans('emergency_fund_18_months', default='18 Months', lang=lang))
+                ]
+            },
+            'submit': {'label': trans('emergency_fund_calculate_button', lang=lang)}
+        }
 
 @emergency_fund_bp.route('/step1', methods=['GET', 'POST'])
 def step1():
@@ -125,9 +167,9 @@ def step1():
     if current_user.is_authenticated:
         form_data['email'] = form_data.get('email', '') or current_user.email
         form_data['first_name'] = form_data.get('first_name', '') or current_user.username
-    current_app.logger.info(f"Form data: {form_data}, User: {current_user.id if current_user.is_authenticated else 'anonymous'}, Lang: {lang}")
+    current_app.logger.info("Form data: %s, User: %s, Lang: %s", form_data, current_user.id if current_user.is_authenticated else 'anonymous', lang)
     form = Step1Form(data=form_data)
-    current_app.logger.info(f"Form errors: {form.errors}, MongoDB: {mongo.db is not None}")
+    current_app.logger.info("Form errors: %s, MongoDB: %s", form.errors, mongo.db is not None)
     template_path = 'EMERGENCYFUND/emergency_fund_step1.html'
     try:
         try:
@@ -151,7 +193,7 @@ def step1():
                 )
             except Exception as e:
                 current_app.logger.error(f"Failed to log tool usage (POST): {str(e)}")
-            current_app.logger.info(f"Step1 POST data: {request.form.to_dict()}")
+            current_app.logger.info("Step1 POST data: %s", request.form)
             if form.validate_on_submit():
                 session['emergency_fund_data'] = {
                     'step1_data': {
@@ -164,7 +206,7 @@ def step1():
                 current_app.logger.info(f"Step1 data saved: {session['emergency_fund_data']}")
                 return redirect(url_for('emergency_fund.step2'))
             else:
-                current_app.logger.warning(f"Step1 form validation failed: {form.errors}")
+                current_app.logger.warning("Step1 form validation failed: %s", form.errors)
                 for field, errors in form.errors.items():
                     for error in errors:
                         flash(f"{field}: {error}", 'danger')
@@ -203,7 +245,7 @@ def step2():
                 session_id=session['sid'],
                 action='step2_submit'
             )
-            current_app.logger.info(f"Step2 POST data: {request.form.to_dict()}")
+            current_app.logger.info("Step2 POST data: %s", request.form)
             if form.validate_on_submit():
                 session['emergency_fund_step2'] = {
                     'monthly_expenses': float(form.monthly_expenses.data),
@@ -213,7 +255,7 @@ def step2():
                 current_app.logger.info(f"Step2 data saved successfully to session: {session['emergency_fund_step2']}")
                 return redirect(url_for('emergency_fund.step3'))
             else:
-                current_app.logger.warning(f"Step2 form validation failed: {form.errors}")
+                current_app.logger.warning("Step2 form validation failed: %s", form.errors)
                 for field, errors in form.errors.items():
                     for error in errors:
                         flash(f"{field}: {error}", 'danger')
@@ -252,7 +294,7 @@ def step3():
                 session_id=session['sid'],
                 action='step3_submit'
             )
-            current_app.logger.info(f"Step3 POST data: {request.form.to_dict()}")
+            current_app.logger.info("Step3 POST data: %s", request.form)
             if form.validate_on_submit():
                 session['emergency_fund_step3'] = {
                     'current_savings': float(form.current_savings.data) if form.current_savings.data else 0,
@@ -263,7 +305,7 @@ def step3():
                 current_app.logger.info(f"Step3 data saved to session: {session['emergency_fund_step3']}")
                 return redirect(url_for('emergency_fund.step4'))
             else:
-                current_app.logger.warning(f"Step3 form errors: {form.errors}")
+                current_app.logger.warning("Step3 form errors: %s", form.errors)
                 for field, errors in form.errors.items():
                     for error in errors:
                         flash(f"{field}: {error}", 'danger')
@@ -302,7 +344,7 @@ def step4():
                 session_id=session['sid'],
                 action='step4_submit'
             )
-            current_app.logger.info(f"Step4 POST data: {request.form.to_dict()}")
+            current_app.logger.info("Step4 POST data: %s", request.form)
             if form.validate_on_submit():
                 step1_data = session['emergency_fund_data']['step1_data']
                 step2_data = session['emergency_fund_step2']
@@ -355,22 +397,20 @@ def step4():
                     'created_at': datetime.utcnow()
                 }
                 mongo.db.emergency_funds.insert_one(emergency_fund)
+                update_user_summary(mongo, summary_owner(emergency_fund), set_fields=summary_section('emergency_fund', emergency_fund))
                 current_app.logger.info(f"Emergency fund record saved to MongoDB with ID {emergency_fund['_id']}")
 
                 if step1_data['email_opt_in'] and step1_data['email']:
                     try:
                         config = EMAIL_CONFIG["emergency_fund"]
                         subject = trans(config["subject_key"], lang=lang)
-                        template = config["template"]
-                        send_email(
-                            app=current_app,
-                            logger=current_app.logger,
+                        enqueue_email(
+                            mongo,
                             to_email=step1_data['email'],
                             subject=subject,
-                            template_name=template,
+                            template_key='emergency_fund',
                             data={
                                 'first_name': step1_data['first_name'],
-                                'lang': lang,
                                 'monthly_expenses': step2_data['monthly_expenses'],
                                 'monthly_income': step2_data['monthly_income'],
                                 'current_savings': step3_data.get('current_savings', 0),
@@ -387,7 +427,8 @@ def step4():
                                 'cta_url': url_for('emergency_fund.dashboard', _external=True),
                                 'unsubscribe_url': url_for('emergency_fund.unsubscribe', email=step1_data['email'], _external=True)
                             },
-                            lang=lang
+                            lang=lang,
+                            idempotency_key=f"emergency_fund:{emergency_fund['_id']}"
                         )
                     except Exception as e:
                         current_app.logger.error(f"Failed to send email: {str(e)}")
@@ -400,7 +441,7 @@ def step4():
                 flash(trans('emergency_fund_completed_successfully', default='Emergency fund calculation completed successfully!'), 'success')
                 return redirect(url_for('emergency_fund.dashboard'))
             else:
-                current_app.logger.warning(f"Step4 form errors: {form.errors}")
+                current_app.logger.warning("Step4 form errors: %s", form.errors)
                 for field, errors in form.errors.items():
                     for error in errors:
                         flash(f"{field}: {error}", 'danger')
@@ -438,7 +479,11 @@ def dashboard():
             current_app.logger.info(f"Retrieved {len(user_data)} records for email {current_user.email}")
 
         records = [(record['_id'], record) for record in user_data]
-        latest_record = records[-1][1] if records else {}
+        summary = get_user_summary(mongo, filter_kwargs)
+        if summary and summary.get('emergency_fund'):
+            latest_record = summary['emergency_fund']
+        else:
+            latest_record = records[-1][1] if records else {}
 
         insights = []
         if latest_record:
@@ -455,11 +500,12 @@ def dashboard():
                         recommended_months=latest_record.get('recommended_months', 0)))
 
         cross_tool_insights = []
-        filter_kwargs_budget = {'user_id': current_user.id} if current_user.is_authenticated else {'session_id': session['sid']}
-        budget_data = mongo.db.budgets.find(filter_kwargs_budget).sort('created_at', -1)
-        budget_data = list(budget_data)
-        if budget_data and latest_record and latest_record.get('savings_gap', 0) > 0:
-            latest_budget = budget_data[0]
+        if summary:
+            latest_budget = summary.get('budget')
+        else:
+            filter_kwargs_budget = {'user_id': current_user.id} if current_user.is_authenticated else {'session_id': session['sid']}
+            latest_budget = mongo.db.budgets.find_one(filter_kwargs_budget, sort=[('created_at', -1)])
+        if latest_budget and latest_record and latest_record.get('savings_gap', 0) > 0:
             if latest_budget.get('income') and latest_budget.get('fixed_expenses'):
                 savings_possible = latest_budget['income'] - latest_budget['fixed_expenses']
                 if savings_possible > 0:
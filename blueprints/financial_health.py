@@ -1,17 +1,18 @@
 from flask import Blueprint, request, session, redirect, url_for, render_template, flash, current_app
-from flask_wtf import FlaskForm
+from translated_form import TranslatedForm
 from wtforms import StringField, FloatField, SelectField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, NumberRange, Optional, Email, ValidationError
 from flask_login import current_user
 from datetime import datetime
 import uuid
 import json
-from mailersend_email import send_email, EMAIL_CONFIG
+from mailersend_email import EMAIL_CONFIG
+from email_outbox import enqueue_email
 from translations import trans
 from extensions import mongo
-from models import log_tool_usage
+from models import log_tool_usage, update_user_summary, summary_owner, summary_section, update_score_histogram, get_score_ranking
 from session_utils import create_anonymous_session
-from app import custom_login_required
+from session_utils import custom_login_required
 
 # Blueprint setup
 financial_health_bp = Blueprint(
@@ -25,7 +26,7 @@ financial_health_bp = Blueprint(
 def get_mongo_collection():
     return mongo.db['financial_health_scores']
 
-class Step1Form(FlaskForm):
+class Step1Form(TranslatedForm):
     first_name = StringField()
     email = StringField()
     user_type = SelectField()
@@ -34,38 +35,58 @@ class Step1Form(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.first_name.label.text = trans('financial_health_first_name', lang=lang)
-        self.email.label.text = trans('financial_health_email', lang=lang)
-        self.user_type.label.text = trans('financial_health_user_type', lang=lang)
-        self.send_email.label.text = trans('financial_health_send_email', lang=lang)
-        self.submit.label.text = trans('financial_health_next', lang=lang)
-        self.first_name.validators = [DataRequired(message=trans('financial_health_first_name_required', lang=lang))]
-        self.email.validators = [Optional(), Email(message=trans('financial_health_email_invalid', lang=lang))]
-        self.user_type.choices = [
-            ('individual', trans('financial_health_user_type_individual', lang=lang)),
-            ('business', trans('financial_health_user_type_business', lang=lang))
-        ]
-
-class Step2Form(FlaskForm):
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'first_name': {
+                'label': trans('financial_health_first_name', lang=lang),
+                'validators': [DataRequired(message=trans('financial_health_first_name_required', lang=lang))]
+            },
+            'email': {
+                'label': trans('financial_health_email', lang=lang),
+                'validators': [Optional(), Email(message=trans('financial_health_email_invalid', lang=lang))]
+            },
+            'user_type': {
+                'label': trans('financial_health_user_type', lang=lang),
+                'choices': [
+                    ('individual', trans('financial_health_user_type_individual', lang=lang)),
+                    ('business', trans('financial_health_user_type_business', lang=lang))
+                ]
+            },
+            'send_email': {'label': trans('financial_health_send_email', lang=lang)},
+            'submit': {'label': trans('financial_health_next', lang=lang)}
+        }
+
+class Step2Form(TranslatedForm):
     income = FloatField()
     expenses = FloatField()
     submit = SubmitField()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.income.label.text = trans('financial_health_monthly_income', lang=lang)
-        self.expenses.label.text = trans('financial_health_monthly_expenses', lang=lang)
-        self.submit.label.text = trans('financial_health_next', lang=lang)
-        self.income.validators = [
-            DataRequired(message=trans('financial_health_income_required', lang=lang)),
-            NumberRange(min=0, max=10000000000, message=trans('financial_health_income_max', lang=lang))
-        ]
-        self.expenses.validators = [
-            DataRequired(message=trans('financial_health_expenses_required', lang=lang)),
-            NumberRange(min=0, max=10000000000, message=trans('financial_health_expenses_max', lang=lang))
-        ]
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'income': {
+                'label': trans('financial_health_monthly_income', lang=lang),
+                'validators': [
+                    DataRequired(message=trans('financial_health_income_required', lang=lang)),
+                    NumberRange(min=0, max=10000000000, message=trans('financial_health_income_max', lang=lang))
+                ]
+            },
+            'expenses': {
+                'label': trans('financial_health_monthly_expenses', lang=lang),
+                'validators': [
+                    DataRequired(message=trans('financial_health_expenses_required', lang=lang)),
+                    NumberRange(min=0, max=10000000000, message=trans('financial_health_expenses_max', lang=lang))
+                ]
+            },
+            'submit': {'label': trans('financial_health_next', lang=lang)}
+        }
 
     def validate_income(self, field):
         if field.data is not None:
@@ -85,25 +106,34 @@ class Step2Form(FlaskForm):
                 current_app.logger.error(f"Invalid expenses input: {field.data}")
                 raise ValidationError(trans('financial_health_expenses_invalid', lang=session.get('lang', 'en')))
 
-class Step3Form(FlaskForm):
+class Step3Form(TranslatedForm):
     debt = FloatField()
     interest_rate = FloatField()
     submit = SubmitField()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.debt.label.text = trans('financial_health_total_debt', lang=lang)
-        self.interest_rate.label.text = trans('financial_health_average_interest_rate', lang=lang)
-        self.submit.label.text = trans('financial_health_submit', lang=lang)
-        self.debt.validators = [
-            Optional(),
-            NumberRange(min=0, max=10000000000, message=trans('financial_health_debt_max', lang=lang))
-        ]
-        self.interest_rate.validators = [
-            Optional(),
-            NumberRange(min=0, message=trans('financial_health_interest_rate_positive', lang=lang))
-        ]
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'debt': {
+                'label': trans('financial_health_total_debt', lang=lang),
+                'validators': [
+                    Optional(),
+                    NumberRange(min=0, max=10000000000, message=trans('financial_health_debt_max', lang=lang))
+                ]
+            },
+            'interest_rate': {
+                'label': trans('financial_health_average_interest_rate', lang=lang),
+                'validators': [
+                    Optional(),
+                    NumberRange(min=0, message=trans('financial_health_interest_rate_positive', lang=lang))
+                ]
+            },
+            'submit': {'label': trans('financial_health_submit', lang=lang)}
+        }
 
     def validate_debt(self, field):
         if field.data is not None:
@@ -388,6 +418,14 @@ def step3():
                 document_id = record_data['_id']
 
             current_app.logger.info(f"Step3 data updated/saved to MongoDB with ID {document_id} for session {session['sid']}")
+            update_user_summary(mongo, summary_owner(record_data), set_fields=summary_section('financial_health', record_data))
+            update_score_histogram(
+                mongo,
+                new_score=score,
+                new_user_type=record_data['user_type'],
+                old_score=record.get('score') if record else None,
+                old_user_type=record.get('user_type') if record else None
+            )
             log_tool_usage(
                 mongo,
                 tool_name='financial_health',
@@ -400,13 +438,11 @@ def step3():
                 try:
                     config = EMAIL_CONFIG["financial_health"]
                     subject = trans(config["subject_key"], lang=lang)
-                    template = config["template"]
-                    send_email(
-                        app=current_app,
-                        logger=current_app.logger,
+                    enqueue_email(
+                        mongo,
                         to_email=step1_data['email'],
                         subject=subject,
-                        template_name=template,
+                        template_key='financial_health',
                         data={
                             "first_name": step1_data['first_name'],
                             "score": score,
@@ -422,7 +458,8 @@ def step3():
                             "created_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                             "cta_url": url_for('financial_health.dashboard', _external=True)
                         },
-                        lang=lang
+                        lang=lang,
+                        idempotency_key=f"financial_health:{document_id}:{record_data['created_at'].isoformat()}"
                     )
                 except Exception as e:
                     current_app.logger.error(f"Failed to send email: {str(e)}")
@@ -467,17 +504,11 @@ def dashboard():
             latest_record = stored_records[0]
             records = [(record['_id'], record) for record in stored_records]
 
-        all_records = list(collection.find({'step': 3}))
-        all_scores_for_comparison = [record['score'] for record in all_records if record.get('score') is not None]
-
-        total_users = len(all_scores_for_comparison)
-        rank = 0
-        average_score = 0
-        if all_scores_for_comparison:
-            all_scores_for_comparison.sort(reverse=True)
-            user_score = latest_record.get("score", 0)
-            rank = sum(1 for s in all_scores_for_comparison if s > user_score) + 1
-            average_score = sum(all_scores_for_comparison) / total_users
+        ranking = get_score_ranking(mongo, latest_record.get('score', 0))
+        total_users = ranking['total_users']
+        rank = ranking['rank']
+        average_score = ranking['average_score']
+        segment_ranking = get_score_ranking(mongo, latest_record.get('score', 0), latest_record.get('user_type')) if latest_record.get('user_type') else None
 
         insights = []
         tips = [
@@ -516,6 +547,7 @@ def dashboard():
             rank=rank,
             total_users=total_users,
             average_score=average_score,
+            segment_ranking=segment_ranking,
             trans=trans,
             lang=lang
         )
@@ -5,19 +5,20 @@ from wtforms.validators import DataRequired, Email, Optional
 from flask_wtf.csrf import CSRFProtect, CSRFError
 from flask_login import current_user
 from datetime import datetime
-from mailersend_email import send_email, EMAIL_CONFIG
+from mailersend_email import EMAIL_CONFIG
+from email_outbox import enqueue_email
 import uuid
 import json
 import os
 from translations import trans as trans_orig
 from extensions import mongo
 from werkzeug.utils import secure_filename
-from models import log_tool_usage
+from models import log_tool_usage, update_user_summary
 import pymongo
 import logging
 from flask import g
 from session_utils import create_anonymous_session
-from app import custom_login_required
+from session_utils import custom_login_required
 
 
 learning_hub_bp = Blueprint(
@@ -274,6 +275,11 @@ def save_course_progress(course_id, course_progress):
             }
         }
         mongo.db.learning_materials.update_one(filter_kwargs, update_data, upsert=True)
+        update_user_summary(
+            mongo,
+            {'user_id': current_user.id} if current_user.is_authenticated else {'session_id': session['sid']},
+            set_fields={f'learning_progress.{course_id}': {'lessons_completed': course_progress.get('lessons_completed', [])}}
+        )
         current_app.logger.info(f"Saved progress for course {course_id}", extra={'session_id': session.get('sid')})
     except Exception as e:
         current_app.logger.error(f"Error saving progress to MongoDB for course {course_id}: {str(e)}", extra={'session_id': session.get('sid', 'no-session-id')})
@@ -520,14 +526,12 @@ def lesson(course_id, lesson_id):
                 if profile.get('send_email') and profile.get('email'):
                     config = EMAIL_CONFIG.get("learning_hub_lesson_completed", {})
                     subject = trans(config.get("subject_key", ""), lang=lang)
-                    template = config.get("template", "")
                     try:
-                        send_email(
-                            app=current_app,
-                            logger=current_app.logger,
+                        enqueue_email(
+                            mongo,
                             to_email=profile['email'],
                             subject=subject,
-                            template_name=template,
+                            template_key='learning_hub_lesson_completed',
                             data={
                                 "first_name": profile.get('first_name', ''),
                                 "course_title": trans(course['title_key'], lang=lang),
@@ -536,9 +540,10 @@ def lesson(course_id, lesson_id):
                                 "cta_url": url_for('learning_hub.course_overview', course_id=course_id, _external=True),
                                 "unsubscribe_url": url_for('learning_hub.unsubscribe', email=profile['email'], _external=True)
                             },
-                            lang=lang
+                            lang=lang,
+                            idempotency_key=f"learning_hub_lesson_completed:{profile['email']}:{course_id}:{lesson_id}"
                         )
-                        current_app.logger.info(f"Sent completion email to {profile['email']} for lesson {lesson_id}", extra={'session_id': session.get('sid', 'no-session-id')})
+                        current_app.logger.info(f"Queued completion email to {profile['email']} for lesson {lesson_id}", extra={'session_id': session.get('sid', 'no-session-id')})
                     except Exception as e:
                         current_app.logger.error(f"Failed to send email for lesson {lesson_id}: {str(e)}", extra={'session_id': session.get('sid', 'no-session-id')})
                         flash(trans("email_send_failed", default="Failed to send email notification", lang=lang), "warning")
@@ -844,6 +849,6 @@ def handle_csrf_error(e):
         session.permanent = True
         session.modified = True
     lang = session.get('lang', 'en')
-    current_app.logger.error(f"CSRF error on {request.path}: {e.description}, Form Data: {request.form}", extra={'session_id': session.get('sid', 'no-session-id')})
+    current_app.logger.error("CSRF error on %s: %s, Form Data: %s", request.path, e.description, request.form, extra={'session_id': session.get('sid', 'no-session-id')})
     flash(trans("learning_hub_csrf_error", default="Form submission failed due to a missing security token. Please refresh and try again.", lang=lang), "danger")
     return render_template('LEARNINGHUB/400.html', message=trans("learning_hub_csrf_error", default="Form submission failed due to a missing security token. Please refresh and try again.", lang=lang)), 400
@@ -1,17 +1,18 @@
 from flask import Blueprint, request, session, redirect, url_for, render_template, flash, current_app, jsonify
-from flask_wtf import FlaskForm
+from translated_form import TranslatedForm
 from wtforms import StringField, FloatField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, NumberRange, Optional, Email, ValidationError
 from flask_login import current_user
 from translations import trans
-from mailersend_email import send_email, EMAIL_CONFIG
+from mailersend_email import EMAIL_CONFIG
+from email_outbox import enqueue_email
 from datetime import datetime
 import uuid
 import json
-from models import log_tool_usage  # Import log_tool_usage
+from models import log_tool_usage, update_user_summary, get_user_summary, summary_owner, summary_section  # Import log_tool_usage
 from extensions import mongo
 from session_utils import create_anonymous_session
-from app import custom_login_required
+from session_utils import custom_login_required
 
 net_worth_bp = Blueprint(
     'net_worth',
@@ -20,7 +21,7 @@ net_worth_bp = Blueprint(
     url_prefix='/NETWORTH'
 )
 
-class Step1Form(FlaskForm):
+class Step1Form(TranslatedForm):
     first_name = StringField()
     email = StringField()
     send_email = BooleanField()
@@ -28,15 +29,24 @@ class Step1Form(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.first_name.label.text = trans('net_worth_first_name', lang=lang)
-        self.email.label.text = trans('net_worth_email', lang=lang)
-        self.send_email.label.text = trans('net_worth_send_email', lang=lang)
-        self.submit.label.text = trans('net_worth_next', lang=lang)
-        self.first_name.validators = [DataRequired(message=trans('net_worth_first_name_required', lang=lang))]
-        self.email.validators = [Optional(), Email(message=trans('net_worth_email_invalid', lang=lang))]
-
-class Step2Form(FlaskForm):
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'first_name': {
+                'label': trans('net_worth_first_name', lang=lang),
+                'validators': [DataRequired(message=trans('net_worth_first_name_required', lang=lang))]
+            },
+            'email': {
+                'label': trans('net_worth_email', lang=lang),
+                'validators': [Optional(), Email(message=trans('net_worth_email_invalid', lang=lang))]
+            },
+            'send_email': {'label': trans('net_worth_send_email', lang=lang)},
+            'submit': {'label': trans('net_worth_next', lang=lang)}
+        }
+
+class Step2Form(TranslatedForm):
     cash_savings = FloatField()
     investments = FloatField()
     property = FloatField()
@@ -44,23 +54,22 @@ class Step2Form(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.cash_savings.label.text = trans('net_worth_cash_savings', lang=lang)
-        self.investments.label.text = trans('net_worth_investments', lang=lang)
-        self.property.label.text = trans('net_worth_property', lang=lang)
-        self.submit.label.text = trans('net_worth_next', lang=lang)
-        self.cash_savings.validators = [
-            DataRequired(message=trans('net_worth_cash_savings_required', lang=lang)),
-            NumberRange(min=0, max=10000000000, message=trans('net_worth_cash_savings_max', lang=lang))
-        ]
-        self.investments.validators = [
-            DataRequired(message=trans('net_worth_investments_required', lang=lang)),
-            NumberRange(min=0, max=10000000000, message=trans('net_worth_investments_max', lang=lang))
-        ]
-        self.property.validators = [
-            DataRequired(message=trans('net_worth_property_required', lang=lang)),
-            NumberRange(min=0, max=10000000000, message=trans('net_worth_property_max', lang=lang))
-        ]
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        fields = {
+            name: {
+                'label': trans(f'net_worth_{name}', lang=lang),
+                'validators': [
+                    DataRequired(message=trans(f'net_worth_{name}_required', lang=lang)),
+                    NumberRange(min=0, max=10000000000, message=trans(f'net_worth_{name}_max', lang=lang))
+                ]
+            }
+            for name in ('cash_savings', 'investments', 'property')
+        }
+        fields['submit'] = {'label': trans('net_worth_next', lang=lang)}
+        return fields
 
     def validate_cash_savings(self, field):
         if field.data is not None:
@@ -89,19 +98,26 @@ class Step2Form(FlaskForm):
                 current_app.logger.error(f"Invalid property input: {field.data}", extra={'session_id': session.get('sid', 'unknown')})
                 raise ValidationError(trans('net_worth_property_invalid', lang=session.get('lang', 'en')))
 
-class Step3Form(FlaskForm):
+class Step3Form(TranslatedForm):
     loans = FloatField()
     submit = SubmitField()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        lang = session.get('lang', 'en')
-        self.loans.label.text = trans('net_worth_loans', lang=lang)
-        self.submit.label.text = trans('net_worth_submit', lang=lang)
-        self.loans.validators = [
-            Optional(),
-            NumberRange(min=0, max=10000000000, message=trans('net_worth_loans_max', lang=lang))
-        ]
+        self.apply_translations(session.get('lang', 'en'))
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'loans': {
+                'label': trans('net_worth_loans', lang=lang),
+                'validators': [
+                    Optional(),
+                    NumberRange(min=0, max=10000000000, message=trans('net_worth_loans_max', lang=lang))
+                ]
+            },
+            'submit': {'label': trans('net_worth_submit', lang=lang)}
+        }
 
     def validate_loans(self, field):
         if field.data is not None:
@@ -271,6 +287,7 @@ def step3():
                     'created_at': datetime.utcnow()
                 }
                 mongo.db.net_worth_data.insert_one(net_worth_record)
+                update_user_summary(mongo, summary_owner(net_worth_record), set_fields=summary_section('net_worth', net_worth_record))
                 session['networth_record_id'] = net_worth_record['_id']
                 session.modified = True
                 current_app.logger.info(f"Successfully saved record {net_worth_record['_id']} for session {session['sid']}")
@@ -281,13 +298,11 @@ def step3():
                     try:
                         config = EMAIL_CONFIG["net_worth"]
                         subject = trans(config["subject_key"], lang=lang)
-                        template = config["template"]
-                        send_email(
-                            app=current_app,
-                            logger=current_app.logger,
+                        enqueue_email(
+                            mongo,
                             to_email=email,
                             subject=subject,
-                            template_name=template,
+                            template_key='net_worth',
                             data={
                                 "first_name": net_worth_record['first_name'],
                                 "cash_savings": net_worth_record['cash_savings'],
@@ -302,7 +317,8 @@ def step3():
                                 "cta_url": url_for('net_worth.dashboard', _external=True),
                                 "unsubscribe_url": url_for('net_worth.unsubscribe', email=email, _external=True)
                             },
-                            lang=lang
+                            lang=lang,
+                            idempotency_key=f"net_worth:{net_worth_record['_id']}"
                         )
                     except Exception as e:
                         current_app.logger.error(f"Failed to send email: {str(e)}")
@@ -405,7 +421,11 @@ def dashboard():
                 }
                 user_data = [(session['sid'], latest_record)]
         else:
-            latest_record = user_data[-1][1] if user_data else {}
+            summary = get_user_summary(mongo, {'user_id': current_user.id} if current_user.is_authenticated else {'session_id': session['sid']})
+            if summary and summary.get('net_worth'):
+                latest_record = summary['net_worth']
+            else:
+                latest_record = user_data[-1][1] if user_data else {}
 
         # Process records for display
         records = user_data
@@ -1,5 +1,5 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
-from flask_wtf import FlaskForm
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from translated_form import TranslatedForm
 from wtforms import StringField, SelectField, BooleanField, SubmitField, RadioField
 from wtforms.validators import DataRequired, Email, Optional
 from flask_login import current_user
@@ -8,11 +8,12 @@ from datetime import datetime
 import json
 import logging
 from translations import trans
-from mailersend_email import send_email, EMAIL_CONFIG
+from mailersend_email import EMAIL_CONFIG
+from email_outbox import enqueue_email
 from extensions import mongo
-from models import log_tool_usage
+from models import log_tool_usage, update_user_summary, summary_owner, summary_section
 from session_utils import create_anonymous_session
-from app import custom_login_required
+from session_utils import custom_login_required
 
 # Configure logging
 logger = logging.getLogger('ficore_app')
@@ -21,7 +22,7 @@ logger = logging.getLogger('ficore_app')
 quiz_bp = Blueprint('quiz', __name__, template_folder='templates/QUIZ', url_prefix='/QUIZ')
 
 # Form for Step 1: Personal Information
-class QuizStep1Form(FlaskForm):
+class QuizStep1Form(TranslatedForm):
     first_name = StringField(validators=[DataRequired()], render_kw={
         'placeholder': trans('core_first_name_placeholder', default='e.g., Muhammad, Bashir, Umar'),
         'title': trans('core_first_name_title', default='Enter your first name to personalize your quiz results')
@@ -38,18 +39,26 @@ class QuizStep1Form(FlaskForm):
 
     def __init__(self, lang='en', *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.first_name.label.text = trans('core_first_name', default='First Name', lang=lang)
-        self.email.label.text = trans('core_email', default='Email', lang=lang)
-        self.lang.label.text = trans('core_language', default='Language', lang=lang)
-        self.send_email.label.text = trans('core_send_email', default='Send Email', lang=lang)
-        self.submit.label.text = trans('quiz_start_quiz', default='Start Quiz', lang=lang)
-        self.lang.choices = [
-            ('en', trans('core_language_en', default='English', lang=lang)),
-            ('ha', trans('core_language_ha', default='Hausa', lang=lang))
-        ]
+        self.apply_translations(lang)
+
+    @classmethod
+    def translated_fields(cls, lang):
+        return {
+            'first_name': {'label': trans('core_first_name', default='First Name', lang=lang)},
+            'email': {'label': trans('core_email', default='Email', lang=lang)},
+            'lang': {
+                'label': trans('core_language', default='Language', lang=lang),
+                'choices': [
+                    ('en', trans('core_language_en', default='English', lang=lang)),
+                    ('ha', trans('core_language_ha', default='Hausa', lang=lang))
+                ]
+            },
+            'send_email': {'label': trans('core_send_email', default='Send Email', lang=lang)},
+            'submit': {'label': trans('quiz_start_quiz', default='Start Quiz', lang=lang)}
+        }
 
 # Form for Step 2a: Questions 1-5
-class QuizStep2aForm(FlaskForm):
+class QuizStep2aForm(TranslatedForm):
     question_1 = RadioField(validators=[DataRequired()], choices=[('Yes', 'Yes'), ('No', 'No')], id='question_1')
     question_2 = RadioField(validators=[DataRequired()], choices=[('Yes', 'Yes'), ('No', 'No')], id='question_2')
     question_3 = RadioField(validators=[DataRequired()], choices=[('Yes', 'Yes'), ('No', 'No')], id='question_3')
@@ -60,6 +69,10 @@ class QuizStep2aForm(FlaskForm):
 
     def __init__(self, lang='en', *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.apply_translations(lang)
+
+    @classmethod
+    def translated_fields(cls, lang):
         questions = [
             {'id': 'question_1', 'text_key': 'quiz_track_expenses_label', 'text': 'Do you track your expenses regularly?', 'tooltip_key': 'quiz_track_expenses_tooltip', 'icon': '💰'},
             {'id': 'question_2', 'text_key': 'quiz_save_regularly_label', 'text': 'Do you save a portion of your income regularly?', 'tooltip_key': 'quiz_save_regularly_tooltip', 'icon': '💰'},
@@ -67,17 +80,20 @@ class QuizStep2aForm(FlaskForm):
             {'id': 'question_4', 'text_key': 'quiz_emergency_fund_label', 'text': 'Do you have an emergency fund?', 'tooltip_key': 'quiz_emergency_fund_tooltip', 'icon': '🚨'},
             {'id': 'question_5', 'text_key': 'quiz_invest_regularly_label', 'text': 'Do you invest your money regularly?', 'tooltip_key': 'quiz_invest_regularly_tooltip', 'icon': '📈'},
         ]
-        for q in questions:
-            field = getattr(self, q['id'])
-            field.label.text = trans(q['text_key'], default=q['text'], lang=lang)
-            field.description = trans(q['tooltip_key'], default='', lang=lang)
-            field.choices = [(opt, trans(opt, default=opt, lang=lang)) for opt in ['Yes', 'No']]
-
-        self.submit.label.text = trans('core_continue', default='Continue', lang=lang)
-        self.back.label.text = trans('core_back', default='Back', lang=lang)
+        fields = {
+            q['id']: {
+                'label': trans(q['text_key'], default=q['text'], lang=lang),
+                'description': trans(q['tooltip_key'], default='', lang=lang),
+                'choices': [(opt, trans(opt, default=opt, lang=lang)) for opt in ['Yes', 'No']]
+            }
+            for q in questions
+        }
+        fields['submit'] = {'label': trans('core_continue', default='Continue', lang=lang)}
+        fields['back'] = {'label': trans('core_back', default='Back', lang=lang)}
+        return fields
 
 # Form for Step 2b: Questions 6-10
-class QuizStep2bForm(FlaskForm):
+class QuizStep2bForm(TranslatedForm):
     question_6 = RadioField(validators=[DataRequired()], choices=[('Yes', 'Yes'), ('No', 'No')], id='question_6')
     question_7 = RadioField(validators=[DataRequired()], choices=[('Yes', 'Yes'), ('No', 'No')], id='question_7')
     question_8 = RadioField(validators=[DataRequired()], choices=[('Yes', 'Yes'), ('No', 'No')], id='question_8')
@@ -88,6 +104,10 @@ class QuizStep2bForm(FlaskForm):
 
     def __init__(self, lang='en', *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.apply_translations(lang)
+
+    @classmethod
+    def translated_fields(cls, lang):
         questions = [
             {'id': 'question_6', 'text_key': 'quiz_spend_impulse_label', 'text': 'Do you often spend money on impulse?', 'tooltip_key': 'quiz_spend_impulse_tooltip', 'icon': '🛒'},
             {'id': 'question_7', 'text_key': 'quiz_financial_goals_label', 'text': 'Do you set financial goals?', 'tooltip_key': 'quiz_financial_goals_tooltip', 'icon': '🎯'},
@@ -95,14 +115,17 @@ class QuizStep2bForm(FlaskForm):
             {'id': 'question_9', 'text_key': 'quiz_multiple_income_label', 'text': 'Do you have multiple sources of income?', 'tooltip_key': 'quiz_multiple_income_tooltip', 'icon': '💼'},
             {'id': 'question_10', 'text_key': 'quiz_retirement_plan_label', 'text': 'Do you have a retirement savings plan?', 'tooltip_key': 'quiz_retirement_plan_tooltip', 'icon': '🏖️'},
         ]
-        for q in questions:
-            field = getattr(self, q['id'])
-            field.label.text = trans(q['text_key'], default=q['text'], lang=lang)
-            field.description = trans(q['tooltip_key'], default='', lang=lang)
-            field.choices = [(opt, trans(opt, default=opt, lang=lang)) for opt in ['Yes', 'No']]
-
-        self.submit.label.text = trans('quiz_see_results', default='See Results', lang=lang)
-        self.back.label.text = trans('core_back', default='Back', lang=lang)
+        fields = {
+            q['id']: {
+                'label': trans(q['text_key'], default=q['text'], lang=lang),
+                'description': trans(q['tooltip_key'], default='', lang=lang),
+                'choices': [(opt, trans(opt, default=opt, lang=lang)) for opt in ['Yes', 'No']]
+            }
+            for q in questions
+        }
+        fields['submit'] = {'label': trans('quiz_see_results', default='See Results', lang=lang)}
+        fields['back'] = {'label': trans('core_back', default='Back', lang=lang)}
+        return fields
 
 # Helper Functions
 def calculate_score(answers):
@@ -386,6 +409,7 @@ def step2b():
                 }
                 logger.debug(f"Saving quiz result with created_at: {created_at}, type: {type(created_at)}", extra={'session_id': session['sid']})
                 mongo.db.quiz_responses.insert_one(quiz_result)
+                update_user_summary(mongo, summary_owner(quiz_result), set_fields=summary_section('quiz', quiz_result))
                 session['quiz_result_id'] = quiz_result['_id']
                 session.modified = True
                 logger.info(f"Successfully saved quiz result {quiz_result['_id']} for session {session['sid']}", extra={'session_id': session['sid']})
@@ -399,13 +423,11 @@ def step2b():
                     try:
                         config = EMAIL_CONFIG["quiz"]
                         subject = trans(config["subject_key"], default='Your Financial Quiz Results', lang=lang)
-                        template = config["template"]
-                        send_email(
-                            app=current_app,
-                            logger=current_app.logger,
+                        enqueue_email(
+                            mongo,
                             to_email=session['quiz_data']['email'],
                             subject=subject,
-                            template_name=template,
+                            template_key='quiz',
                             data={
                                 "first_name": results['first_name'],
                                 "score": results['score'],
@@ -417,7 +439,8 @@ def step2b():
                                 "created_at": results['created_at'],
                                 "cta_url": url_for('quiz.results', course_id=course_id, _external=True)
                             },
-                            lang=lang
+                            lang=lang,
+                            idempotency_key=f"quiz:{quiz_result['_id']}"
                         )
                     except Exception as e:
                         logger.error(f"Failed to send quiz results email: {str(e)}", extra={'session_id': session['sid']})
@@ -0,0 +1,111 @@
+import click
+from flask import current_app
+from extensions import mongo
+from datetime import datetime
+from models import rebuild_user_summaries, backfill_tool_usage_rollups, rebuild_score_histograms, migrate_bill_due_dates, backfill_next_reminder_at
+from db_indexes import ensure_indexes, verify_indexes, index_registry_for_app
+from data_generator import generate, plan
+
+def init_commands(app):
+    """Register maintenance CLI commands on the app."""
+
+    @app.cli.command('rebuild-summaries')
+    @click.option('--batch-size', default=500, show_default=True, help='Number of summary upserts per bulk write.')
+    def rebuild_summaries_command(batch_size):
+        """Regenerate all user_summaries documents from the raw collections."""
+        result = rebuild_user_summaries(mongo, batch_size=batch_size)
+        current_app.logger.info(f"rebuild-summaries finished: {result}")
+        click.echo(f"Rebuilt user summaries: {result['upserts']} upserts, {result['removed']} stale removed")
+
+    @app.cli.command('backfill-tool-usage-rollups')
+    @click.option('--since', default=None, help='Only recompute hours from this date (YYYY-MM-DD); defaults to all history.')
+    @click.option('--batch-size', default=500, show_default=True, help='Number of rollup upserts per bulk write.')
+    def backfill_tool_usage_rollups_command(since, batch_size):
+        """Recompute tool_usage_rollups from the raw tool_usage events."""
+        since_date = datetime.strptime(since, '%Y-%m-%d') if since else None
+        result = backfill_tool_usage_rollups(mongo, since=since_date, batch_size=batch_size)
+        current_app.logger.info(f"backfill-tool-usage-rollups finished: {result}")
+        click.echo(f"Backfilled tool usage rollups: {result['hourly']} hourly, {result['totals']} totals")
+
+    @app.cli.command('rebuild-score-histograms')
+    def rebuild_score_histograms_command():
+        """Regenerate the financial health score histograms from financial_health_scores."""
+        count = rebuild_score_histograms(mongo)
+        click.echo(f"Rebuilt {count} score histograms")
+
+    @app.cli.command('migrate-bill-due-dates')
+    @click.option('--batch-size', default=1000, show_default=True, help='Number of bills converted per bulk write.')
+    def migrate_bill_due_dates_command(batch_size):
+        """Convert string bill due_date values to dates."""
+        result = migrate_bill_due_dates(mongo, batch_size=batch_size)
+        click.echo(f"Converted {result['converted']} bill due dates, {result['invalid']} invalid values left unchanged")
+        if result['invalid']:
+            raise SystemExit(1)
+
+    @app.cli.command('backfill-next-reminder-at')
+    @click.option('--batch-size', default=1000, show_default=True, help='Number of bills updated per bulk write.')
+    def backfill_next_reminder_at_command(batch_size):
+        """Set next_reminder_at on reminder-enabled bills that predate the field."""
+        count = backfill_next_reminder_at(mongo, batch_size=batch_size)
+        click.echo(f"Set next_reminder_at on {count} bills")
+
+    @app.cli.command('indexes-apply')
+    @click.option('--force', is_flag=True, help='Re-check every collection even if the schema marker matches.')
+    def indexes_apply_command(force):
+        """Create missing indexes from the registry and record the schema marker."""
+        result = ensure_indexes(mongo.db, index_registry_for_app(current_app), current_app.logger, force=force)
+        if result['status'] == 'current':
+            click.echo(f"Indexes already current ({result['fingerprint'][:12]})")
+            return
+        click.echo(f"Created {result['created']} indexes, updated {result['ttl_updated']} TTLs")
+        for item in result['drift']:
+            click.echo(f"DRIFT {item['collection']}.{item['index']}: {item.get('options') or item.get('keys')}")
+        if result['drift']:
+            raise SystemExit(1)
+
+    @app.cli.command('indexes-verify')
+    def indexes_verify_command():
+        """Compare live indexes with the registry without changing anything."""
+        report = verify_indexes(mongo.db, index_registry_for_app(current_app))
+        for name in report['missing']:
+            click.echo(f"MISSING {name}")
+        for name in report['ttl_updates']:
+            click.echo(f"TTL CHANGED {name}")
+        for item in report['drift']:
+            click.echo(f"DRIFT {item['collection']}.{item['index']}: {item.get('options') or item.get('keys')}")
+        for name in report['extra']:
+            click.echo(f"UNDECLARED {name}")
+        if report['missing'] or report['ttl_updates'] or report['drift']:
+            raise SystemExit(1)
+        click.echo("Indexes match the registry")
+
+    @app.cli.command('generate-data')
+    @click.option('--documents', default=100000, show_default=True, help='Approximate total number of documents to write.')
+    @click.option('--seed', default=42, show_default=True, help='Random seed; the same seed and total give the same data.')
+    @click.option('--workers', default=None, type=int, help='Worker processes; defaults to the CPU count.')
+    @click.option('--batch-size', default=5000, show_default=True, help='Documents per insert_many call.')
+    @click.option('--drop', is_flag=True, help='Drop the generated collections first.')
+    @click.option('--yes', is_flag=True, help='Do not ask for confirmation.')
+    @click.option('--skip-rebuild', is_flag=True, help='Do not rebuild summaries, score histograms and rollups afterwards.')
+    def generate_data_command(documents, seed, workers, batch_size, drop, yes, skip_rebuild):
+        """Fill the database with deterministic synthetic data for load and scale testing."""
+        counts = plan(documents)
+        click.echo(f"Database {mongo.db.name}: " + ', '.join(f"{name}={count}" for name, count in counts.items()))
+        if not yes:
+            click.confirm(f"{'Drop and regenerate' if drop else 'Append to'} these collections?", abort=True)
+        step = max(documents // 20, batch_size)
+        reported = {'next': step}
+        def progress(collection, written, done, total):
+            if done >= reported['next'] or done == total:
+                click.echo(f"  {done}/{total} documents")
+                reported['next'] = done + step
+        result = generate(current_app.config['MONGO_URI'], documents, seed=seed, workers=workers, batch_size=batch_size, drop=drop, progress=progress)
+        click.echo(f"Inserted {sum(result['counts'].values())} documents in {result['seconds']}s")
+        current_app.logger.info(f"generate-data finished: {result}")
+        if skip_rebuild:
+            return
+        ensure_indexes(mongo.db, index_registry_for_app(current_app), current_app.logger, force=True)
+        rebuild_user_summaries(mongo)
+        rebuild_score_histograms(mongo)
+        backfill_tool_usage_rollups(mongo)
+        click.echo("Rebuilt indexes, user summaries, score histograms and tool usage rollups")
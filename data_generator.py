@@ -0,0 +1,281 @@
+import os
+import pickle
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pymongo import MongoClient, uri_parser
+
+# First generated user id; user k of the run gets USER_ID_BASE + k
+USER_ID_BASE = 5000000000
+
+# Share of the requested total written to each collection
+DEFAULT_MIX = {
+    'users': 0.04,
+    'budgets': 0.08,
+    'bills': 0.15,
+    'financial_health_scores': 0.06,
+    'net_worth_data': 0.05,
+    'emergency_funds': 0.05,
+    'learning_materials': 0.05,
+    'quiz_responses': 0.06,
+    'tool_usage': 0.36,
+    'sessions': 0.10
+}
+
+ANONYMOUS_SHARE = 0.2
+REFERRAL_SHARE = 0.3
+BILL_FREQUENCIES = ['one-time', 'weekly', 'monthly', 'quarterly']
+BILL_CATEGORIES = ['utilities', 'rent', 'data_internet', 'ajo_esusu_adashe', 'food', 'transport', 'clothing', 'education',
+                   'healthcare', 'entertainment', 'airtime', 'school_fees', 'savings_investments', 'other']
+BILL_STATUSES = ['unpaid', 'paid', 'pending']
+TOOL_ACTIONS = {
+    'budget': ['main_view', 'step1_submit', 'step2_submit', 'step3_submit', 'step4_submit', 'dashboard_view'],
+    'financial_health': ['main_view', 'step1_submit', 'step2_submit', 'step3_submit', 'dashboard_view'],
+    'net_worth': ['main_view', 'step1_submit', 'step2_submit', 'step3_submit', 'dashboard_view'],
+    'emergency_fund': ['main_view', 'step1_submit', 'step2_submit', 'step3_submit', 'step4_submit', 'dashboard_view'],
+    'quiz': ['main_view', 'step1_submit', 'step2a_submit', 'step2b_submit', 'results_view'],
+    'bill': ['main_view', 'form_submit', 'dashboard_view', 'toggle_status'],
+    'learning_hub': ['main_view', 'lesson_view', 'quiz_submit']
+}
+COURSES = {'budgeting_101': ['lesson_1', 'lesson_2', 'lesson_3'], 'financial_quiz': ['quiz_1'], 'savings_basics': ['lesson_1', 'lesson_2']}
+FIRST_NAMES = ['Amina', 'Musa', 'Chidi', 'Ngozi', 'Ibrahim', 'Fatima', 'Tunde', 'Aisha', 'Emeka', 'Zainab', 'Yusuf', 'Halima']
+PERSONALITIES = ['Planner', 'Saver', 'Balanced', 'Spender']
+
+class GeneratorContext:
+    """Run-wide values every worker needs to derive the same owners and dates."""
+
+    def __init__(self, seed, user_count, now=None):
+        self.seed = seed
+        self.user_count = max(user_count, 1)
+        self.now = now or datetime.utcnow().replace(microsecond=0)
+        # Well-formed but matches no password, so generated accounts cannot sign in
+        self.password_hash = 'pbkdf2:sha256:600000$loadtest$' + '0' * 64
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def _sid(rng):
+    return f"{rng.getrandbits(128):032x}"
+
+def _owner(rng, context):
+    """Pick an owner with a skewed distribution: low user numbers own many more records."""
+    if rng.random() < ANONYMOUS_SHARE:
+        return None, f"anon{rng.randrange(context.user_count * 4):020x}"
+    index = int(context.user_count * rng.random() ** 2)
+    return str(USER_ID_BASE + index), f"user{index:020x}"
+
+def _created_at(rng, context, days=365):
+    return context.now - timedelta(seconds=rng.randrange(days * 86400))
+
+def _user(rng, context, index):
+    first_name = rng.choice(FIRST_NAMES)
+    referred_by = USER_ID_BASE + rng.randrange(index) if index and rng.random() < REFERRAL_SHARE else None
+    return {
+        'id': USER_ID_BASE + index,
+        'username': f"{first_name.lower()}{index}",
+        'email': f"{first_name.lower()}{index}@loadtest.ficore.invalid",
+        'password_hash': context.password_hash,
+        'created_at': _created_at(rng, context, days=730),
+        'lang': 'ha' if rng.random() < 0.25 else 'en',
+        'referral_code': f"{rng.getrandbits(64):016x}",
+        'is_admin': False,
+        'role': 'user',
+        'referred_by_id': referred_by,
+        'google_id': None
+    }
+
+def _budget(rng, context, user_id, session_id):
+    income = round(rng.uniform(30000, 3000000), 2)
+    parts = {name: round(income * rng.uniform(0.02, 0.3), 2) for name in ('housing', 'food', 'transport', 'dependents', 'miscellaneous', 'others')}
+    expenses = sum(parts.values())
+    return {
+        '_id': _uuid(rng), 'user_id': user_id, 'session_id': session_id, 'user_email': None,
+        'income': income, 'fixed_expenses': expenses, 'variable_expenses': 0, 'savings_goal': round(income * rng.uniform(0, 0.3), 2),
+        'surplus_deficit': income - expenses, **parts, 'created_at': _created_at(rng, context)
+    }
+
+def _bill(rng, context, user_id, session_id):
+    due_date = context.now.date() + timedelta(days=rng.randint(-90, 90))
+    status = rng.choice(BILL_STATUSES)
+    # Same rule as bill.form_step2: unpaid bills already past due are stored as overdue
+    if status not in ['paid', 'pending'] and due_date < context.now.date():
+        status = 'overdue'
+    send_email = rng.random() < 0.4
+    reminder_days = rng.choice([1, 3, 7, 14]) if send_email else None
+    due_at = datetime(due_date.year, due_date.month, due_date.day)
+    # Same rule as models.compute_next_reminder_at, relative to the run's fixed clock
+    next_reminder_at = None
+    if send_email and status != 'paid':
+        today = datetime(context.now.year, context.now.month, context.now.day)
+        next_reminder_at = max(today, due_at - timedelta(days=reminder_days)) if status == 'unpaid' else today
+    return {
+        'user_id': user_id, 'session_id': session_id, 'user_email': f"bill{rng.getrandbits(32)}@loadtest.ficore.invalid",
+        'first_name': rng.choice(FIRST_NAMES), 'bill_name': rng.choice(['Rent', 'NEPA', 'DSTV', 'Water', 'School fees', 'MTN data', 'Ajo']),
+        'amount': round(rng.uniform(500, 500000), 2), 'due_date': due_at,
+        'frequency': rng.choice(BILL_FREQUENCIES), 'category': rng.choice(BILL_CATEGORIES), 'status': status,
+        'send_email': send_email, 'reminder_days': reminder_days, 'next_reminder_at': next_reminder_at,
+        'created_at': _created_at(rng, context)
+    }
+
+def _financial_health(rng, context, user_id, session_id):
+    income = round(rng.uniform(30000, 3000000), 2)
+    expenses = round(income * rng.uniform(0.3, 1.3), 2)
+    debt = round(income * rng.uniform(0, 5), 2)
+    interest_rate = round(rng.uniform(0, 35), 1)
+    debt_to_income = debt / income * 100
+    savings_rate = (income - expenses) / income * 100
+    interest_burden = interest_rate * debt / 100 / 12 / income * 100 if debt else 0
+    score = max(0, min(100, round(100 - debt_to_income * 0.3 + savings_rate * 0.4 - interest_burden * 0.3)))
+    status_key = 'excellent' if score >= 80 else 'good' if score >= 60 else 'needs_improvement'
+    return {
+        '_id': _uuid(rng), 'user_id': user_id, 'session_id': session_id, 'step': 3,
+        'first_name': rng.choice(FIRST_NAMES), 'email': '', 'user_type': 'business' if rng.random() < 0.2 else 'individual',
+        'income': income, 'expenses': expenses, 'debt': debt, 'interest_rate': interest_rate,
+        'debt_to_income': debt_to_income, 'savings_rate': savings_rate, 'interest_burden': interest_burden,
+        'score': score, 'status': status_key.replace('_', ' ').title(), 'status_key': status_key, 'badges': [],
+        'send_email': False, 'created_at': _created_at(rng, context)
+    }
+
+def _net_worth(rng, context, user_id, session_id):
+    cash_savings = round(rng.uniform(0, 2000000), 2)
+    investments = round(rng.uniform(0, 5000000), 2)
+    property_value = round(rng.choice([0, 0, rng.uniform(1000000, 50000000)]), 2)
+    loans = round(rng.uniform(0, 3000000), 2)
+    total_assets = cash_savings + investments + property_value
+    return {
+        '_id': _uuid(rng), 'user_id': user_id, 'session_id': session_id, 'first_name': rng.choice(FIRST_NAMES), 'email': '',
+        'send_email': False, 'cash_savings': cash_savings, 'investments': investments, 'property': property_value, 'loans': loans,
+        'total_assets': total_assets, 'total_liabilities': loans, 'net_worth': total_assets - loans, 'badges': [],
+        'created_at': _created_at(rng, context)
+    }
+
+def _emergency_fund(rng, context, user_id, session_id):
+    monthly_expenses = round(rng.uniform(20000, 1500000), 2)
+    monthly_income = round(monthly_expenses * rng.uniform(0.8, 2.5), 2)
+    current_savings = round(rng.uniform(0, monthly_expenses * 8), 2)
+    recommended_months = rng.choice([3, 6, 12])
+    timeline = rng.choice([6, 12, 18])
+    target_amount = monthly_expenses * recommended_months
+    gap = max(target_amount - current_savings, 0)
+    return {
+        '_id': _uuid(rng), 'user_id': user_id, 'session_id': session_id, 'first_name': rng.choice(FIRST_NAMES), 'email': '',
+        'email_opt_in': False, 'lang': 'en', 'monthly_expenses': monthly_expenses, 'monthly_income': monthly_income,
+        'current_savings': current_savings, 'risk_tolerance_level': rng.choice(['low', 'medium', 'high']), 'dependents': rng.randint(0, 8),
+        'timeline': timeline, 'recommended_months': recommended_months, 'target_amount': target_amount, 'savings_gap': gap,
+        'monthly_savings': gap / timeline, 'percent_of_income': gap / timeline / monthly_income * 100, 'badges': [],
+        'created_at': _created_at(rng, context)
+    }
+
+def _learning_progress(rng, context, user_id, session_id):
+    course_id = rng.choice(list(COURSES))
+    lessons = COURSES[course_id][:rng.randint(0, len(COURSES[course_id]))]
+    return {
+        'user_id': user_id, 'session_id': session_id, 'course_id': course_id, 'lessons_completed': lessons,
+        'quiz_scores': {'quiz_1': rng.randint(0, 3)} if course_id == 'financial_quiz' and lessons else {},
+        'current_lesson': lessons[-1] if lessons else None
+    }
+
+def _quiz_response(rng, context, user_id, session_id):
+    score = rng.randint(0, 30)
+    return {
+        '_id': _uuid(rng), 'user_id': user_id, 'session_id': session_id,
+        # quiz.step2b stores created_at as an ISO string
+        'created_at': _created_at(rng, context).isoformat(),
+        'first_name': rng.choice(FIRST_NAMES), 'email': '', 'send_email': False,
+        'personality': PERSONALITIES[min(score // 8, 3)], 'score': score, 'badges': [], 'insights': [], 'tips': []
+    }
+
+def _tool_usage(rng, context, user_id, session_id):
+    tool_name = rng.choice(list(TOOL_ACTIONS))
+    return {
+        'id': _uuid(rng), 'tool_name': tool_name, 'user_id': user_id, 'session_id': session_id,
+        'action': rng.choice(TOOL_ACTIONS[tool_name]), 'created_at': _created_at(rng, context, days=180)
+    }
+
+def _session(rng, context, user_id, session_id):
+    sid = _sid(rng)
+    data = {'sid': sid, 'lang': 'en', 'is_anonymous': user_id is None}
+    if user_id is not None:
+        data.update({'_user_id': user_id, '_fresh': False})
+    # Same layout Flask-Session's MongoDB interface writes: prefixed id, pickled dict, expiry
+    return {'id': f"session:{sid}", 'val': pickle.dumps(data), 'expiration': context.now + timedelta(days=rng.randint(1, 30))}
+
+BUILDERS = {
+    'budgets': _budget,
+    'bills': _bill,
+    'financial_health_scores': _financial_health,
+    'net_worth_data': _net_worth,
+    'emergency_funds': _emergency_fund,
+    'learning_materials': _learning_progress,
+    'quiz_responses': _quiz_response,
+    'tool_usage': _tool_usage,
+    'sessions': _session
+}
+
+def build_documents(collection, start, count, context):
+    """Build documents start..start+count of a collection; the same arguments always give the same documents."""
+    rng = random.Random(f"{context.seed}:{collection}:{start}")
+    if collection == 'users':
+        return [_user(rng, context, start + offset) for offset in range(count)]
+    builder = BUILDERS[collection]
+    documents = []
+    for _ in range(count):
+        user_id, session_id = _owner(rng, context)
+        documents.append(builder(rng, context, user_id, session_id))
+    return documents
+
+_worker_clients = {}
+
+def _insert_chunk(uri, database, collection, start, count, context):
+    """Worker entry point: build one chunk and write it with a single unordered insert_many."""
+    client = _worker_clients.get(uri)
+    if client is None:
+        client = _worker_clients[uri] = MongoClient(uri)
+    documents = build_documents(collection, start, count, context)
+    if documents:
+        client[database][collection].insert_many(documents, ordered=False)
+    return collection, len(documents)
+
+def plan(total, mix=None):
+    """Split total documents over the collections by mix; returns {collection: count}."""
+    mix = mix or DEFAULT_MIX
+    weight = sum(mix.values())
+    return {collection: int(total * share / weight) for collection, share in mix.items()}
+
+def generate(uri, total, seed=42, workers=None, batch_size=5000, mix=None, drop=False, progress=None):
+    """
+    Write about total synthetic documents into the database named in uri.
+
+    Chunks of batch_size documents are built and inserted by a pool of worker processes,
+    each with its own client. Output depends only on seed, total and mix, not on workers.
+    Returns {'counts': {collection: inserted}, 'seconds': elapsed}.
+    """
+    database = uri_parser.parse_uri(uri)['database']
+    if not database:
+        raise ValueError("MongoDB URI must name a database")
+    counts = plan(total, mix)
+    context = GeneratorContext(seed, counts.get('users', 0))
+    if drop:
+        client = MongoClient(uri)
+        try:
+            for collection in counts:
+                client[database][collection].drop()
+        finally:
+            client.close()
+    chunks = [
+        (collection, start, min(batch_size, count - start))
+        for collection, count in counts.items()
+        for start in range(0, count, batch_size)
+    ]
+    inserted = {collection: 0 for collection in counts}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(_insert_chunk, uri, database, collection, start, count, context) for collection, start, count in chunks]
+        for future in as_completed(futures):
+            collection, written = future.result()
+            inserted[collection] += written
+            if progress is not None:
+                progress(collection, written, sum(inserted.values()), sum(counts.values()))
+    return {'counts': inserted, 'seconds': round(time.perf_counter() - started, 1)}
@@ -0,0 +1,187 @@
+import hashlib
+import json
+from datetime import datetime
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+# Bump when an index change must be re-applied even though the registry fingerprint is unchanged
+INDEX_SCHEMA_VERSION = 1
+SCHEMA_META_ID = 'indexes'
+
+# Collections whose anonymous (user_id null) records expire after ANONYMOUS_DATA_RETENTION_DAYS
+ANONYMOUS_TTL_COLLECTIONS = {
+    'budgets': 'created_at',
+    'bills': 'created_at',
+    'net_worth_data': 'created_at',
+    'emergency_funds': 'created_at',
+    'user_summaries': 'updated_at'
+}
+
+# Sent outbox messages are kept this long for auditing and idempotency, then removed by TTL
+EMAIL_OUTBOX_RETENTION_SECONDS = 30 * 24 * 3600
+
+def index_name(keys):
+    """Return MongoDB's default name for an index key list."""
+    return '_'.join(f"{field}_{direction}" for field, direction in keys)
+
+def _index(keys, **options):
+    if isinstance(keys, str):
+        keys = [(keys, 1)]
+    options.setdefault('name', index_name(keys))
+    return {'keys': list(keys), 'options': options}
+
+def _owner_indexes():
+    return [_index('session_id'), _index('user_id')]
+
+def build_index_registry(anonymous_retention_seconds):
+    """Return the declarative index definitions for every collection, keyed by collection name."""
+    anonymous_ttl = lambda field: _index(
+        field, name='anonymous_ttl', expireAfterSeconds=anonymous_retention_seconds,
+        partialFilterExpression={'user_id': {'$type': 'null'}}
+    )
+    registry = {
+        'users': [_index('email', unique=True), _index('referral_code', unique=True)],
+        'courses': [_index('id', unique=True)],
+        'content_metadata': [_index([('course_id', 1), ('lesson_id', 1)], unique=True)],
+        'financial_health': _owner_indexes(),
+        'budgets': _owner_indexes(),
+        'bills': _owner_indexes() + [
+            _index('user_email'), _index('status'), _index('due_date'), _index([('status', 1), ('due_date', 1)]),
+            # Only bills that send reminders are indexed, so the reminder job's range scan reads nothing else
+            _index('next_reminder_at', name='next_reminder_at_send_email', partialFilterExpression={'send_email': True})
+        ],
+        'net_worth': _owner_indexes(),
+        'emergency_funds': _owner_indexes(),
+        'learning_progress': [
+            _index([('user_id', 1), ('course_id', 1)], unique=True),
+            _index([('session_id', 1), ('course_id', 1)], unique=True)
+        ] + _owner_indexes(),
+        'quiz_results': _owner_indexes(),
+        'feedback': _owner_indexes(),
+        # Compound indexes match the admin tool usage browser filters and its (created_at, _id) keyset order
+        'tool_usage': _owner_indexes() + [
+            _index('tool_name'),
+            _index([('created_at', -1), ('_id', -1)]),
+            _index([('tool_name', 1), ('created_at', -1), ('_id', -1)]),
+            _index([('action', 1), ('created_at', -1), ('_id', -1)]),
+            _index([('tool_name', 1), ('action', 1), ('created_at', -1), ('_id', -1)])
+        ],
+        'tool_usage_rollups': [_index([('period', 1), ('hour', 1)])],
+        # TTL indexes: MongoDB's background monitor deletes expired documents continuously
+        'reset_tokens': [_index('token', unique=True), _index('expires_at', name='expires_at_ttl', expireAfterSeconds=0)],
+        'sessions': [_index('id'), _index('expiration', name='expiration_ttl', expireAfterSeconds=0)],
+        # Dispatcher claims match either branch of its $or; sent messages expire after EMAIL_OUTBOX_RETENTION_SECONDS
+        # and failed ones at the expires_at the dispatcher stamps when it gives up
+        'email_outbox': [
+            _index('idempotency_key', unique=True),
+            _index([('status', 1), ('next_attempt_at', 1)]),
+            _index([('status', 1), ('lease_expires_at', 1)]),
+            _index('sent_at', name='sent_at_ttl', expireAfterSeconds=EMAIL_OUTBOX_RETENTION_SECONDS),
+            _index('expires_at', name='expires_at_ttl', expireAfterSeconds=0)
+        ]
+    }
+    for collection, field in ANONYMOUS_TTL_COLLECTIONS.items():
+        registry.setdefault(collection, []).append(anonymous_ttl(field))
+    return registry
+
+def registry_fingerprint(registry):
+    """Hash the registry so any definition change invalidates the stored marker."""
+    payload = json.dumps({'version': INDEX_SCHEMA_VERSION, 'registry': registry}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def _normalize_keys(keys):
+    return [(field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in keys]
+
+def _option_drift(spec, existing):
+    """Return {option: (expected, actual)} for declared options that differ from the live index."""
+    drift = {}
+    declared = {'unique': False, 'sparse': False, 'expireAfterSeconds': None, 'partialFilterExpression': None}
+    declared.update(spec['options'])
+    for option, expected in declared.items():
+        if option == 'name':
+            continue
+        actual = existing.get(option)
+        if option in ('unique', 'sparse'):
+            actual = bool(actual)
+        if actual != expected:
+            drift[option] = (expected, actual)
+    return drift
+
+def diff_collection_indexes(db, collection, specs):
+    """Compare declared indexes with the live ones for one collection."""
+    try:
+        existing = db[collection].index_information()
+    except OperationFailure:
+        existing = {}
+    missing, ttl_updates, drift = [], [], []
+    for spec in specs:
+        name = spec['options']['name']
+        live = existing.get(name)
+        if live is None:
+            missing.append(spec)
+            continue
+        if _normalize_keys(live['key']) != _normalize_keys(spec['keys']):
+            drift.append({'collection': collection, 'index': name, 'keys': (spec['keys'], live['key'])})
+            continue
+        option_drift = _option_drift(spec, live)
+        # A changed TTL is a declared config change (e.g. retention days) and is applied with collMod
+        if set(option_drift) == {'expireAfterSeconds'} and live.get('expireAfterSeconds') is not None:
+            ttl_updates.append(spec)
+        elif option_drift:
+            drift.append({'collection': collection, 'index': name, 'options': option_drift})
+    declared = {spec['options']['name'] for spec in specs}
+    extra = [name for name in existing if name != '_id_' and name not in declared]
+    return {'missing': missing, 'ttl_updates': ttl_updates, 'drift': drift, 'extra': extra}
+
+def verify_indexes(db, registry):
+    """Report missing, drifted and undeclared indexes without changing anything."""
+    report = {'missing': [], 'ttl_updates': [], 'drift': [], 'extra': []}
+    for collection, specs in registry.items():
+        diff = diff_collection_indexes(db, collection, specs)
+        report['missing'].extend(f"{collection}.{spec['options']['name']}" for spec in diff['missing'])
+        report['ttl_updates'].extend(f"{collection}.{spec['options']['name']}" for spec in diff['ttl_updates'])
+        report['drift'].extend(diff['drift'])
+        report['extra'].extend(f"{collection}.{name}" for name in diff['extra'])
+    return report
+
+def apply_indexes(db, registry, logger):
+    """Create missing indexes in one createIndexes call per collection and update changed TTLs."""
+    result = {'created': 0, 'ttl_updated': 0, 'drift': []}
+    for collection, specs in registry.items():
+        diff = diff_collection_indexes(db, collection, specs)
+        if diff['missing']:
+            db[collection].create_indexes([IndexModel(spec['keys'], **spec['options']) for spec in diff['missing']])
+            result['created'] += len(diff['missing'])
+            logger.info(f"Created indexes on {collection}: {', '.join(spec['options']['name'] for spec in diff['missing'])}")
+        for spec in diff['ttl_updates']:
+            db.command('collMod', collection, index={'name': spec['options']['name'], 'expireAfterSeconds': spec['options']['expireAfterSeconds']})
+            result['ttl_updated'] += 1
+            logger.info(f"Updated TTL index {spec['options']['name']} on {collection} to expireAfterSeconds={spec['options']['expireAfterSeconds']}")
+        for item in diff['drift']:
+            logger.warning(f"Index drift on {item['collection']}.{item['index']} left unchanged: {item.get('options') or item.get('keys')}")
+        result['drift'].extend(diff['drift'])
+    return result
+
+def ensure_indexes(db, registry, logger, force=False):
+    """Apply the registry unless the stored schema marker already matches it."""
+    fingerprint = registry_fingerprint(registry)
+    marker = None if force else db.schema_meta.find_one({'_id': SCHEMA_META_ID}, {'fingerprint': 1})
+    if marker and marker.get('fingerprint') == fingerprint:
+        logger.info(f"MongoDB indexes current (schema {INDEX_SCHEMA_VERSION}, {fingerprint[:12]})")
+        return {'status': 'current', 'fingerprint': fingerprint}
+    result = apply_indexes(db, registry, logger)
+    # Drifted indexes keep the marker stale so every start reports them until they are fixed by hand
+    if not result['drift']:
+        db.schema_meta.update_one(
+            {'_id': SCHEMA_META_ID},
+            {'$set': {'fingerprint': fingerprint, 'version': INDEX_SCHEMA_VERSION, 'applied_at': datetime.utcnow()}},
+            upsert=True
+        )
+    result.update({'status': 'applied' if not result['drift'] else 'drift', 'fingerprint': fingerprint})
+    logger.info(f"MongoDB indexes applied: {result['created']} created, {result['ttl_updated']} TTL updated, {len(result['drift'])} drifted")
+    return result
+
+def index_registry_for_app(app):
+    """Build the registry using the app's retention settings."""
+    retention_seconds = int(app.config['ANONYMOUS_DATA_RETENTION_DAYS']) * 24 * 60 * 60
+    return build_index_registry(retention_seconds)
@@ -0,0 +1,197 @@
+import atexit
+import hashlib
+import json
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from mailersend_email import send_email
+
+def content_key(template_key, to_email, data):
+    """Idempotency key for callers without a record id: identical emails to one recipient collapse into one."""
+    payload = json.dumps({'template_key': template_key, 'to_email': to_email, 'data': data}, sort_keys=True, default=str)
+    return f"{template_key}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+def enqueue_email(mongo, to_email, subject, template_key, data=None, lang='en', idempotency_key=None):
+    """
+    Queue an email in email_outbox with a single insert; the dispatcher thread sends it.
+
+    Returns False when a message with the same idempotency_key was already queued, so retried
+    form submissions never send twice.
+    """
+    data = data or {}
+    now = datetime.utcnow()
+    message = {
+        'idempotency_key': idempotency_key or content_key(template_key, to_email, data),
+        'to_email': to_email,
+        'subject': subject,
+        'template_key': template_key,
+        'data': data,
+        'lang': lang,
+        'status': 'pending',
+        'attempts': 0,
+        'next_attempt_at': now,
+        'created_at': now,
+        'updated_at': now
+    }
+    try:
+        mongo.db.email_outbox.insert_one(message)
+    except DuplicateKeyError:
+        current_app.logger.info(f"Email {message['idempotency_key']} already queued, skipping")
+        return False
+    dispatcher = current_app.config.get('EMAIL_DISPATCHER')
+    if dispatcher is not None:
+        dispatcher.wake()
+    return True
+
+class EmailDispatcher:
+    """
+    Background thread that claims email_outbox messages one at a time and sends them.
+
+    A claim is a single find_one_and_update, so several workers can share the outbox. A claim
+    holds a lease; a message whose worker died mid-send is taken over once the lease expires.
+    Failed sends are retried after backoff_base * 2 ** (attempts - 1) seconds, capped at
+    backoff_max, until max_attempts is reached. A message that gives up is kept for
+    failed_retention_seconds, then removed by the expires_at TTL index, freeing its key.
+    """
+
+    def __init__(self, app, mongo, logger, poll_interval=5.0, max_attempts=5, backoff_base=30.0, backoff_max=3600.0, lease_seconds=300, failed_retention_seconds=7 * 24 * 3600):
+        self.app = app
+        self.mongo = mongo
+        self.logger = logger
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.failed_retention_seconds = failed_retention_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._counter_lock = threading.Lock()
+        self._thread = None
+        self.counters = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def start(self):
+        """Start the dispatcher thread."""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='email-dispatcher', daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Check the outbox now instead of at the next poll."""
+        self._wake_event.set()
+
+    def backoff(self, attempts):
+        return min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+
+    def claim(self):
+        """Atomically take the oldest due message, or return None when nothing is due."""
+        now = datetime.utcnow()
+        return self.mongo.db.email_outbox.find_one_and_update(
+            {'$or': [
+                {'status': {'$in': ['pending', 'retry']}, 'next_attempt_at': {'$lte': now}},
+                {'status': 'sending', 'lease_expires_at': {'$lte': now}}
+            ]},
+            {
+                '$set': {'status': 'sending', 'claimed_by': self.worker_id, 'lease_expires_at': now + timedelta(seconds=self.lease_seconds), 'updated_at': now},
+                '$inc': {'attempts': 1}
+            },
+            sort=[('next_attempt_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def dispatch(self, message):
+        """Send a claimed message and record the outcome; returns True when it was sent."""
+        outbox = self.mongo.db.email_outbox
+        # Only the current lease holder may record a result
+        owned = {'_id': message['_id'], 'claimed_by': self.worker_id, 'status': 'sending'}
+        try:
+            # Templates and their context processors read session and url_for, so render inside a request context
+            with self.app.test_request_context(base_url=self.app.config.get('BASE_URL')):
+                send_email(
+                    app=self.app,
+                    logger=self.logger,
+                    to_email=message['to_email'],
+                    subject=message['subject'],
+                    template_key=message['template_key'],
+                    data=dict(message.get('data') or {}),
+                    lang=message.get('lang', 'en'),
+                    job_id=f"outbox:{message['_id']}"
+                )
+        except Exception as e:
+            now = datetime.utcnow()
+            attempts = message['attempts']
+            if attempts >= self.max_attempts:
+                outbox.update_one(owned, {'$set': {'status': 'failed', 'last_error': str(e), 'failed_at': now, 'expires_at': now + timedelta(seconds=self.failed_retention_seconds), 'updated_at': now}, '$unset': {'lease_expires_at': ''}})
+                self._count('failed')
+                self.logger.error(f"Email {message['idempotency_key']} to {message['to_email']} failed after {attempts} attempts: {str(e)}")
+            else:
+                delay = self.backoff(attempts)
+                outbox.update_one(owned, {'$set': {'status': 'retry', 'last_error': str(e), 'next_attempt_at': now + timedelta(seconds=delay), 'updated_at': now}, '$unset': {'lease_expires_at': ''}})
+                self._count('retried')
+                self.logger.warning(f"Email {message['idempotency_key']} to {message['to_email']} failed (attempt {attempts}), retrying in {delay:.0f}s: {str(e)}")
+            return False
+        now = datetime.utcnow()
+        outbox.update_one(owned, {'$set': {'status': 'sent', 'sent_at': now, 'updated_at': now}, '$unset': {'lease_expires_at': '', 'last_error': ''}})
+        self._count('sent')
+        return True
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                message = self.claim()
+            except Exception as e:
+                self.logger.error(f"Failed to claim from email outbox: {str(e)}")
+                message = None
+            if message is not None:
+                self._count('claimed')
+                self.dispatch(message)
+                continue
+            self._wake_event.wait(self.poll_interval)
+            self._wake_event.clear()
+
+    def stop(self, timeout=15.0):
+        """Stop the dispatcher thread; a message being sent is finished first."""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.logger.info(f"Email dispatcher stopped: counters={self.stats()}")
+
+    def stats(self):
+        """Return a snapshot of the dispatcher counters."""
+        with self._counter_lock:
+            return dict(self.counters)
+
+def init_email_dispatcher(app, mongo):
+    """Start the email outbox dispatcher and register shutdown."""
+    dispatcher = EmailDispatcher(
+        app,
+        mongo,
+        app.logger,
+        poll_interval=float(app.config.get('EMAIL_OUTBOX_POLL_INTERVAL', 5.0)),
+        max_attempts=int(app.config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 5)),
+        backoff_base=float(app.config.get('EMAIL_OUTBOX_BACKOFF_BASE', 30.0)),
+        backoff_max=float(app.config.get('EMAIL_OUTBOX_BACKOFF_MAX', 3600.0)),
+        lease_seconds=int(app.config.get('EMAIL_OUTBOX_LEASE_SECONDS', 300)),
+        failed_retention_seconds=int(app.config.get('EMAIL_OUTBOX_FAILED_RETENTION_SECONDS', 7 * 24 * 3600))
+    )
+    dispatcher.start()
+    app.config['EMAIL_DISPATCHER'] = dispatcher
+    atexit.register(dispatcher.stop)
+    app.logger.info("Email dispatcher started")
+    return dispatcher
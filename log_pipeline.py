@@ -0,0 +1,123 @@
+import atexit
+import logging
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, session
+
+class RequestLogContext:
+    """Per-request logging state, created once and kept on flask.g."""
+
+    __slots__ = ('session_id', 'sampled', 'emitted', 'suppressed')
+
+    def __init__(self, sample_rate):
+        self.session_id = None
+        self.sampled = sample_rate >= 1.0 or random.random() < sample_rate
+        self.emitted = 0
+        self.suppressed = 0
+
+def request_log_context():
+    """Return the logging context for the current request, or None outside a request."""
+    if not has_request_context():
+        return None
+    context = g.get('_log_context')
+    if context is None:
+        context = g._log_context = RequestLogContext(_pipeline_settings['sample_rate'])
+    return context
+
+def current_session_id():
+    """Resolve the session id once per request; later lookups reuse the cached value."""
+    context = request_log_context()
+    if context is None:
+        return 'no-request-context'
+    if context.session_id is None:
+        try:
+            sid = session.get('sid')
+        except Exception:
+            return 'session-error'
+        if sid is None:
+            # Not cached yet: before_request may still assign the sid for this request
+            return 'no-session-id'
+        context.session_id = sid
+    return context.session_id
+
+_pipeline_settings = {'sample_rate': 1.0, 'request_budget': 0}
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the session id and apply per-request sampling and budget in the caller thread."""
+
+    def __init__(self, stats):
+        super().__init__()
+        self.stats = stats
+
+    def filter(self, record):
+        context = request_log_context()
+        if not hasattr(record, 'session_id'):
+            record.session_id = current_session_id() if context is not None else 'no-request-context'
+        if context is None or record.levelno > logging.INFO:
+            return True
+        budget = _pipeline_settings['request_budget']
+        if not context.sampled or (budget and context.emitted >= budget):
+            context.suppressed += 1
+            self.stats.count('suppressed')
+            return False
+        context.emitted += 1
+        return True
+
+class LogPipelineStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {'suppressed': 0, 'dropped': 0}
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that defers message formatting to the listener thread and drops when full."""
+
+    def __init__(self, log_queue, stats):
+        super().__init__(log_queue)
+        self.stats = stats
+
+    def prepare(self, record):
+        # The listener runs in-process, so the record can be queued as-is and %-formatted there
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.stats.count('dropped')
+
+def init_log_pipeline(loggers, handlers, sample_rate=1.0, request_budget=0, queue_size=10000):
+    """
+    Route the given loggers through a bounded queue drained by a background QueueListener.
+
+    INFO and lower records inside a request are kept for a sample_rate fraction of requests
+    and capped at request_budget records per request (0 disables the cap); warnings and
+    errors are always kept.
+    """
+    _pipeline_settings['sample_rate'] = sample_rate
+    _pipeline_settings['request_budget'] = request_budget
+    stats = LogPipelineStats()
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue, stats)
+    queue_handler.addFilter(RequestContextFilter(stats))
+    for target in loggers:
+        target.handlers = [queue_handler]
+        target.propagate = False
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_log_pipeline, listener)
+    return listener, stats
+
+def stop_log_pipeline(listener):
+    """Flush queued records and stop the listener thread; safe to call more than once."""
+    if listener._thread is not None:
+        listener.stop()
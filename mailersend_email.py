@@ -1,61 +1,72 @@
 import logging
 import os
 import smtplib
+import time
 import requests
 from email.mime.text import MIMEText
-from flask import Flask, render_template, current_app
+from flask import Flask, render_template
+from jinja2 import TemplateNotFound
 from typing import Dict, Optional
 from translations import trans
+from request_timing import timed
+from metrics import observe_email
 
 # Email configuration dictionary with provider-specific templates
 EMAIL_CONFIG = {
     "financial_health": {
         "subject_key": "financial_health_financial_health_report",
         "template": {
-            "mailersend": "health_score_email.html",
-            "gmail": "health_score_email_gmail.html"
+            "mailersend": "HEALTHSCORE/health_score_email.html",
+            "gmail": "HEALTHSCORE/health_score_email_gmail.html"
         }
     },
     "budget": {
         "subject_key": "budget_plan_summary",
         "template": {
-            "mailersend": "budget_email.html",
-            "gmail": "budget_email_gmail.html"
+            "mailersend": "BUDGET/budget_email.html",
+            "gmail": "BUDGET/budget_email_gmail.html"
         }
     },
     "quiz": {
         "subject_key": "quiz_results_summary",
         "template": {
-            "mailersend": "quiz_email.html",
-            "gmail": "quiz_email_gmail.html"
+            "mailersend": "QUIZ/quiz_email.html",
+            "gmail": "QUIZ/quiz_email_gmail.html"
         }
     },
     "bill_reminder": {
         "subject_key": "bill_payment_reminder",
         "template": {
-            "mailersend": "bill_reminder.html",
-            "gmail": "bill_reminder_gmail.html"
+            "mailersend": "BILL/bill_reminder.html",
+            "gmail": "BILL/bill_reminder_gmail.html"
         }
     },
     "net_worth": {
         "subject_key": "net_worth_net_worth_summary",
         "template": {
-            "mailersend": "net_worth_email.html",
-            "gmail": "net_worth_email.html"
+            "mailersend": "NETWORTH/net_worth_email.html",
+            "gmail": "NETWORTH/net_worth_email_gmail.html"
         }
     },
     "emergency_fund": {
         "subject_key": "emergency_fund_email_subject",
         "template": {
-            "mailersend": "emergency_fund.html",
-            "gmail": "emergency_fund.html"
+            "mailersend": "EMERGENCYFUND/emergency_fund_email.html",
+            "gmail": "EMERGENCYFUND/emergency_fund_email_gmail.html"
+        }
+    },
+    "password_reset": {
+        "subject_key": "core_reset_email_subject",
+        "template": {
+            "mailersend": "reset_password_email.html",
+            "gmail": "reset_password_email.html"
         }
     },
     "learning_hub_lesson_completed": {
         "subject_key": "learning_hub_lesson_completed_subject",
         "template": {
-            "mailersend": "learning_hub_lesson_completed.html",
-            "gmail": "learning_hub_lesson_completed.html"
+            "mailersend": "LEARNINGHUB/learning_hub_lesson_completed_gmail.html",
+            "gmail": "LEARNINGHUB/learning_hub_lesson_completed_gmail.html"
         }
     }
 }
@@ -69,6 +80,8 @@ def init_email_config(app: Flask, logger: logging.LoggerAdapter):
     else:
         logger.info(f"Email providers configured: MailerSend={mailersend_enabled}, Gmail={gmail_enabled}")
 
+@timed('email')
+@observe_email
 def send_email(
     app: Flask,
     logger: logging.LoggerAdapter,
@@ -145,29 +158,23 @@ def send_email(
             continue
 
         try:
-            # Select template based on provider
+            # Select template based on provider; names are relative to the app's templates folder
             template_name = config["template"].get(provider, config["template"].get('mailersend'))
-            if not template_name.endswith('.html'):
-                template_name += '.html'
-            # Assume template is in templates/ or templates/bill/ for bill_reminder
-            template_path = os.path.join(current_app.template_folder, template_name)
-            if template_key == 'bill_reminder':
-                # Check bill blueprint folder
-                bill_template_path = os.path.join(current_app.template_folder, 'bill', template_name)
-                if os.path.exists(bill_template_path):
-                    template_path = bill_template_path
-            if not os.path.exists(template_path):
-                raise ValueError(f"Template {template_name} for provider {provider} not found at {template_path}")
-
-            # Render email template
+            try:
+                template = app.jinja_env.get_or_select_template(template_name)
+            except TemplateNotFound:
+                raise ValueError(f"Template {template_name} for provider {provider} not found")
+
+            # Render email template; templates read their values from data and lang is always the send language
+            context = {**data, 'data': data, 'lang': lang}
             with app.app_context():
                 try:
-                    html_content = render_template(template_name, **data, lang=lang)
+                    html_content = render_template(template, **context)
                     logger.info(f"Template {template_name} rendered successfully, content length: {len(html_content)}", extra={'session_id': session_id})
                 except KeyError as e:
                     logger.warning(f"Missing key {e} in data for template {template_name}, using empty string", extra={'session_id': session_id})
                     data[str(e)] = ""
-                    html_content = render_template(template_name, **data, lang=lang)
+                    html_content = render_template(template, **{**data, 'data': data, 'lang': lang})
                 except Exception as e:
                     logger.error(f"Cannot render email template {template_name}: {str(e)}", extra={'session_id': session_id})
                     raise RuntimeError(f"Cannot render email template {template_name}: {str(e)}")
@@ -200,6 +207,7 @@ def send_email(
                         if attempt < max_retries:
                             delay = 2 ** attempt
                             logger.warning(f"Network error sending email to {to_email} via {provider}: {str(e)}. Retrying... (attempt {attempt})", extra={'session_id': session_id, 'provider': provider})
+                            time.sleep(delay)
                             continue
                         raise
 
@@ -223,6 +231,7 @@ def send_email(
                         if attempt < max_retries:
                             delay = 2 ** attempt
                             logger.warning(f"Gmail SMTP error sending email to {to_email}: {str(e)}. Retrying... (attempt {attempt})", extra={'session_id': session_id, 'provider': provider})
+                            time.sleep(delay)
                             continue
                         raise RuntimeError(f"Gmail SMTP error: {str(e)}")
 
@@ -0,0 +1,133 @@
+import gc
+import os
+import threading
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+import psutil
+
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+# Allocations made by the profiler itself and the import system are noise in every report
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+]
+
+def process_memory():
+    """Return RSS/VMS in MB, GC generation counts and tracemalloc totals for this worker."""
+    info = psutil.Process(os.getpid()).memory_info()
+    stats = {
+        'rss_mb': round(info.rss / 1024 / 1024, 2),
+        'vms_mb': round(info.vms / 1024 / 1024, 2),
+        'gc_counts': list(gc.get_count()),
+        'gc_thresholds': list(gc.get_threshold()),
+        'gc_collections': [generation['collections'] for generation in gc.get_stats()],
+        'tracing': tracemalloc.is_tracing()
+    }
+    if stats['tracing']:
+        current, peak = tracemalloc.get_traced_memory()
+        stats['traced_mb'] = round(current / 1024 / 1024, 2)
+        stats['traced_peak_mb'] = round(peak / 1024 / 1024, 2)
+        stats['tracemalloc_overhead_mb'] = round(tracemalloc.get_tracemalloc_memory() / 1024 / 1024, 2)
+    return stats
+
+def _format_stat(stat):
+    frame = stat.traceback[0]
+    return {
+        'site': f"{frame.filename}:{frame.lineno}" if frame.lineno else frame.filename,
+        'size_kb': round(stat.size / 1024, 1),
+        'count': stat.count,
+        'traceback': stat.traceback.format()[-6:] if len(stat.traceback) > 1 else None
+    }
+
+def _format_diff(stat):
+    entry = _format_stat(stat)
+    entry['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+    entry['count_diff'] = stat.count_diff
+    return entry
+
+class MemoryProfiler:
+    """
+    On-demand tracemalloc control for the admin routes.
+
+    Nothing is traced until start() is called, and stop() discards the stored snapshots, so an
+    idle worker pays no tracing cost. At most max_snapshots are kept; the oldest is evicted first.
+    """
+
+    def __init__(self, max_snapshots=5):
+        self.max_snapshots = max_snapshots
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()
+        self._next_id = 1
+
+    def start(self, frames=1):
+        with self._lock:
+            if tracemalloc.is_tracing():
+                return False
+            tracemalloc.start(frames)
+            return True
+
+    def stop(self):
+        with self._lock:
+            self._snapshots.clear()
+            if not tracemalloc.is_tracing():
+                return False
+            tracemalloc.stop()
+            return True
+
+    def take_snapshot(self, label=None):
+        """Store a filtered snapshot and return its summary; raises RuntimeError when not tracing."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = {
+                'snapshot': snapshot,
+                'label': label,
+                'taken_at': datetime.utcnow().isoformat(),
+                'memory': process_memory()
+            }
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return self.describe(snapshot_id)
+
+    def _get(self, snapshot_id):
+        with self._lock:
+            entry = self._snapshots.get(snapshot_id)
+        if entry is None:
+            raise KeyError(f"Snapshot {snapshot_id} not found")
+        return entry
+
+    def describe(self, snapshot_id):
+        entry = self._get(snapshot_id)
+        return {
+            'id': snapshot_id,
+            'label': entry['label'],
+            'taken_at': entry['taken_at'],
+            'traced_mb': round(sum(trace.size for trace in entry['snapshot'].traces) / 1024 / 1024, 2),
+            'memory': entry['memory']
+        }
+
+    def list_snapshots(self):
+        with self._lock:
+            snapshot_ids = list(self._snapshots)
+        return [self.describe(snapshot_id) for snapshot_id in snapshot_ids]
+
+    def top(self, snapshot_id, limit=25, group_by='lineno'):
+        """Return the largest allocation sites of a snapshot."""
+        stats = self._get(snapshot_id)['snapshot'].statistics(group_by)
+        return [_format_stat(stat) for stat in stats[:limit]]
+
+    def diff(self, old_id, new_id, limit=25, group_by='lineno'):
+        """Return the allocation sites that grew the most between two snapshots."""
+        old = self._get(old_id)['snapshot']
+        new = self._get(new_id)['snapshot']
+        stats = new.compare_to(old, group_by)
+        return [_format_diff(stat) for stat in stats[:limit]]
+
+memory_profiler = MemoryProfiler()
@@ -0,0 +1,224 @@
+import functools
+import inspect
+import os
+import threading
+import time
+import psutil
+from bisect import bisect_left
+from flask import g, request
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(_Metric):
+    """Gauge set directly, or read from callback at render time when one is given."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value, *labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        if self.callback is not None:
+            try:
+                values = self.callback()
+            except Exception:
+                # A broken source must not take the whole endpoint down
+                values = {}
+            items = sorted(values.items()) if isinstance(values, dict) else [((), values)]
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key if isinstance(key, tuple) else (key,))} {_format_value(value)}"
+            for key, value in items if value is not None
+        ]
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; observations are in seconds."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, {'counts': list(series['counts']), 'sum': series['sum'], 'count': series['count']}) for key, series in self._values.items())
+        lines = self.header()
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series['counts']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series['count']}")
+        return lines
+
+class MetricsRegistry:
+    """In-process registry rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        metric = self._register(Gauge, name, documentation, labelnames, callback=callback)
+        if callback is not None:
+            metric.callback = callback
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+request_latency = metrics.histogram('ficore_request_duration_seconds', 'HTTP request latency by endpoint.', ('method', 'endpoint', 'status'))
+mongo_latency = metrics.histogram('ficore_mongo_command_duration_seconds', 'MongoDB command latency by command.', ('command', 'outcome'))
+job_duration = metrics.histogram('ficore_job_duration_seconds', 'Scheduler job duration.', ('job', 'outcome'), buckets=JOB_BUCKETS)
+job_rss = metrics.gauge('ficore_job_rss_bytes', 'Process RSS at the end of the last run of each scheduler job.', ('job',))
+email_latency = metrics.histogram('ficore_email_send_duration_seconds', 'Email send latency by template.', ('template_key',))
+email_failures = metrics.counter('ficore_email_send_failures_total', 'Email sends that raised, by template.', ('template_key',))
+
+def observe_email(func):
+    """Record send latency and failures of an email function taking a template_key argument."""
+    signature = inspect.signature(func)
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        template_key = signature.bind_partial(*args, **kwargs).arguments.get('template_key')
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            email_failures.inc(template_key)
+            raise
+        finally:
+            email_latency.observe(time.perf_counter() - started, template_key)
+    return wrapper
+
+class MongoMetricsListener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_latency.observe(event.duration_micros / 1e6, event.command_name, 'ok')
+
+    def failed(self, event):
+        mongo_latency.observe(event.duration_micros / 1e6, event.command_name, 'error')
+
+def init_metrics(app):
+    """Register request latency hooks and gauges over existing app state; returns the Mongo listener."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return None
+
+    @app.before_request
+    def start_request_clock():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        started = g.get('_metrics_started')
+        if started is not None:
+            # Route rules keep label cardinality bounded; unmatched paths share one label
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            request_latency.observe(time.perf_counter() - started, request.method, endpoint, response.status_code)
+        return response
+
+    def tool_usage_queue():
+        buffer = app.config.get('TOOL_USAGE_BUFFER')
+        return buffer.stats() if buffer is not None else {}
+
+    def pool_stats():
+        manager = app.extensions.get('mongo_manager')
+        return manager.stats() if manager is not None else {}
+
+    def process_rss():
+        return psutil.Process(os.getpid()).memory_info().rss
+
+    metrics.gauge('ficore_tool_usage_queue_depth', 'Tool usage events waiting to be flushed.', callback=lambda: tool_usage_queue().get('queued'))
+    metrics.gauge('ficore_tool_usage_dropped_events', 'Tool usage events dropped since start because the buffer was full.', callback=lambda: tool_usage_queue().get('dropped'))
+    metrics.gauge('ficore_mongo_pool_checked_out', 'MongoDB connections currently checked out.', callback=lambda: pool_stats().get('checked_out'))
+    metrics.gauge('ficore_mongo_pool_open', 'MongoDB connections currently open.', callback=lambda: pool_stats().get('open'))
+    metrics.gauge('ficore_process_rss_bytes', 'Resident set size of this worker.', callback=process_rss)
+    app.extensions['metrics'] = metrics
+    return MongoMetricsListener()
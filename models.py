@@ -1,8 +1,12 @@
 import uuid
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app, session
 from flask_login import UserMixin
+from request_timing import bind_timer
+from query_monitor import bind_scope
 
 # User class for Flask-Login
 class User(UserMixin):
@@ -337,6 +341,98 @@ def to_dict_budget(budget):
     }
 
 # Bill helper functions
+def bill_due_datetime(value):
+    """Return the stored form of a bill due date: midnight as a naive UTC datetime, since BSON has no date type."""
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], '%Y-%m-%d')
+    return datetime(value.year, value.month, value.day)
+
+def parse_bill_due_date(value):
+    """Return a bill due date as a date, whether stored as a datetime or as a legacy 'YYYY-MM-DD' string."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def format_bill_due_date(value):
+    """Return a due date as 'YYYY-MM-DD' for display; invalid legacy values are returned unchanged."""
+    try:
+        return parse_bill_due_date(value).isoformat() if value else ''
+    except (ValueError, TypeError):
+        return value
+
+def migrate_bill_due_dates(mongo, batch_size=1000, logger=None):
+    """
+    Convert legacy string due_date values to datetimes in _id order, one bulk write per batch.
+
+    Unparseable values are left in place and counted, so the migration can be re-run safely.
+    """
+    from pymongo import UpdateOne
+    logger = logger or current_app.logger
+    converted, invalid, last_id = 0, 0, None
+    while True:
+        query = {'due_date': {'$type': 'string'}}
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+        batch = list(mongo.db.bills.find(query, {'due_date': 1}).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+        ops = []
+        for bill in batch:
+            try:
+                ops.append(UpdateOne({'_id': bill['_id'], 'due_date': bill['due_date']}, {'$set': {'due_date': bill_due_datetime(bill['due_date'])}}))
+            except ValueError:
+                invalid += 1
+        if ops:
+            converted += mongo.db.bills.bulk_write(ops, ordered=False).modified_count
+        last_id = batch[-1]['_id']
+        logger.info(f"Bill due_date migration: {converted} converted, {invalid} invalid so far")
+    return {'converted': converted, 'invalid': invalid}
+
+REMINDER_STATUSES = ('unpaid', 'pending', 'overdue')
+
+def compute_next_reminder_at(bill, last_sent_at=None):
+    """
+    Return when the bill's next reminder is due, or None when it gets no reminders.
+
+    Pending and overdue bills are reminded on every daily run; unpaid bills from reminder_days
+    before their due date. After a send, the next reminder is due no earlier than the next day.
+    """
+    if not bill.get('send_email') or not bill.get('user_email') or bill.get('status') not in REMINDER_STATUSES:
+        return None
+    try:
+        due_date = bill_due_datetime(bill['due_date'])
+    except (KeyError, ValueError, TypeError, AttributeError):
+        return None
+    earliest = datetime.combine((last_sent_at or datetime.utcnow()).date(), datetime.min.time())
+    if last_sent_at is not None:
+        earliest += timedelta(days=1)
+    if bill['status'] != 'unpaid':
+        return earliest
+    return max(earliest, due_date - timedelta(days=bill.get('reminder_days') or 7))
+
+def backfill_next_reminder_at(mongo, batch_size=1000, logger=None):
+    """Set next_reminder_at on send_email bills written before the field existed, in _id order."""
+    from pymongo import UpdateOne
+    logger = logger or current_app.logger
+    updated, last_id = 0, None
+    while True:
+        query = {'send_email': True, 'next_reminder_at': {'$exists': False}}
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+        batch = list(mongo.db.bills.find(query, {'user_email': 1, 'status': 1, 'due_date': 1, 'send_email': 1, 'reminder_days': 1}).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+        ops = [
+            UpdateOne({'_id': bill['_id'], 'next_reminder_at': {'$exists': False}}, {'$set': {'next_reminder_at': compute_next_reminder_at(bill)}})
+            for bill in batch
+        ]
+        updated += mongo.db.bills.bulk_write(ops, ordered=False).modified_count
+        last_id = batch[-1]['_id']
+        logger.info(f"Bill next_reminder_at backfill: {updated} updated so far")
+    return updated
+
 def create_bill(mongo, bill_data):
     """Create a bill record."""
     required_fields = ['session_id', 'bill_name', 'amount', 'due_date', 'frequency', 'category', 'status']
@@ -352,13 +448,14 @@ def create_bill(mongo, bill_data):
         'first_name': bill_data.get('first_name'),
         'bill_name': bill_data['bill_name'],
         'amount': bill_data['amount'],
-        'due_date': bill_data['due_date'].strftime('%Y-%m-%d') if isinstance(bill_data['due_date'], date) else bill_data['due_date'],
+        'due_date': bill_due_datetime(bill_data['due_date']),
         'frequency': bill_data['frequency'],
         'category': bill_data['category'],
         'status': bill_data['status'],
         'send_email': bill_data.get('send_email', False),
         'reminder_days': bill_data.get('reminder_days')
     }
+    bill['next_reminder_at'] = compute_next_reminder_at(bill)
     try:
         mongo.db.bills.insert_one(bill)
         return bill
@@ -386,7 +483,7 @@ def to_dict_bill(bill):
         'first_name': bill.get('first_name', None),
         'bill_name': bill.get('bill_name', ''),
         'amount': bill.get('amount', 0.0),
-        'due_date': bill.get('due_date', ''),
+        'due_date': format_bill_due_date(bill.get('due_date')),
         'frequency': bill.get('frequency', ''),
         'category': bill.get('category', ''),
         'status': bill.get('status', ''),
@@ -695,13 +792,13 @@ def to_dict_feedback(feedback):
     }
 
 # ToolUsage helper functions
-def create_tool_usage(mongo, tool_usage_data):
-    """Create a tool usage record."""
+def build_tool_usage(tool_usage_data):
+    """Validate tool usage data and build the document to store."""
     required_fields = ['tool_name', 'session_id']
     for field in required_fields:
         if field not in tool_usage_data or tool_usage_data[field] is None:
             raise ValueError(f"Missing required field: {field}")
-    tool_usage = {
+    return {
         'id': str(uuid.uuid4()),
         'tool_name': tool_usage_data['tool_name'],
         'user_id': tool_usage_data.get('user_id'),
@@ -709,12 +806,20 @@ def create_tool_usage(mongo, tool_usage_data):
         'action': tool_usage_data.get('action', 'unknown'),
         'created_at': tool_usage_data.get('created_at', datetime.utcnow())
     }
+
+def create_tool_usage(mongo, tool_usage_data):
+    """Create a tool usage record."""
+    tool_usage = build_tool_usage(tool_usage_data)
     try:
         mongo.db.tool_usage.insert_one(tool_usage)
-        return tool_usage
     except Exception as e:
         current_app.logger.error(f"Failed to create tool usage record: {str(e)}", extra={'tool_usage_data': tool_usage_data})
         raise
+    try:
+        record_tool_usage_rollups(mongo, [tool_usage])
+    except Exception as e:
+        current_app.logger.error(f"Failed to update tool usage rollups: {str(e)}")
+    return tool_usage
 
 def get_tool_usage(mongo, filters):
     """Retrieve tool usage records by filters."""
@@ -736,9 +841,124 @@ def to_dict_tool_usage(tu):
         'created_at': (tu['created_at'].isoformat() + "Z") if isinstance(tu.get('created_at'), datetime) else tu.get('created_at', '')
     }
 
+# ToolUsageRollup helper functions
+ROLLUP_HOUR_FORMAT = '%Y-%m-%dT%H'
+
+def _rollup_id(period, tool_name, action, hour=None):
+    """Build the tool_usage_rollups _id for an hourly or all-time bucket."""
+    if period == 'hour':
+        return f"hour|{hour.strftime(ROLLUP_HOUR_FORMAT)}|{tool_name}|{action}"
+    return f"total|{tool_name}|{action}"
+
+def tool_usage_rollup_ops(events):
+    """Build $inc upserts for the hourly and all-time rollups of a batch of events."""
+    from pymongo import UpdateOne
+    counts = {}
+    for event in events:
+        created_at = event.get('created_at') or datetime.utcnow()
+        hour = created_at.replace(minute=0, second=0, microsecond=0)
+        key = (hour, event.get('tool_name'), event.get('action', 'unknown'))
+        counts[key] = counts.get(key, 0) + 1
+    totals = {}
+    ops = []
+    for (hour, tool_name, action), count in counts.items():
+        ops.append(UpdateOne(
+            {'_id': _rollup_id('hour', tool_name, action, hour)},
+            {'$inc': {'count': count}, '$setOnInsert': {'period': 'hour', 'hour': hour, 'tool_name': tool_name, 'action': action}},
+            upsert=True
+        ))
+        totals[(tool_name, action)] = totals.get((tool_name, action), 0) + count
+    for (tool_name, action), count in totals.items():
+        ops.append(UpdateOne(
+            {'_id': _rollup_id('total', tool_name, action)},
+            {'$inc': {'count': count}, '$setOnInsert': {'period': 'total', 'hour': None, 'tool_name': tool_name, 'action': action}},
+            upsert=True
+        ))
+    return ops
+
+def record_tool_usage_rollups(mongo, events):
+    """Increment the rollups for events that were just written to tool_usage."""
+    ops = tool_usage_rollup_ops(events)
+    if ops:
+        mongo.db.tool_usage_rollups.bulk_write(ops, ordered=False)
+
+def backfill_tool_usage_rollups(mongo, since=None, until=None, batch_size=500):
+    """Recompute hourly rollups from raw tool_usage events, then rebuild the all-time totals."""
+    from pymongo import UpdateOne
+    until = until or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    created_at = {'$lt': until}
+    if since:
+        created_at['$gte'] = since
+    pipeline = [
+        {'$match': {'created_at': created_at}},
+        {'$group': {
+            '_id': {
+                'hour': {'$dateToString': {'format': ROLLUP_HOUR_FORMAT, 'date': '$created_at'}},
+                'tool_name': '$tool_name',
+                'action': {'$ifNull': ['$action', 'unknown']}
+            },
+            'count': {'$sum': 1}
+        }}
+    ]
+    written = 0
+    ops = []
+    for row in mongo.db.tool_usage.aggregate(pipeline, allowDiskUse=True):
+        hour = datetime.strptime(row['_id']['hour'], ROLLUP_HOUR_FORMAT)
+        tool_name, action = row['_id']['tool_name'], row['_id']['action']
+        ops.append(UpdateOne(
+            {'_id': _rollup_id('hour', tool_name, action, hour)},
+            {'$set': {'period': 'hour', 'hour': hour, 'tool_name': tool_name, 'action': action, 'count': row['count']}},
+            upsert=True
+        ))
+        if len(ops) >= batch_size:
+            mongo.db.tool_usage_rollups.bulk_write(ops, ordered=False)
+            written += len(ops)
+            ops = []
+    if ops:
+        mongo.db.tool_usage_rollups.bulk_write(ops, ordered=False)
+        written += len(ops)
+
+    totals = [
+        UpdateOne(
+            {'_id': _rollup_id('total', row['_id']['tool_name'], row['_id']['action'])},
+            {'$set': {'period': 'total', 'hour': None, 'tool_name': row['_id']['tool_name'], 'action': row['_id']['action'], 'count': row['count']}},
+            upsert=True
+        )
+        for row in mongo.db.tool_usage_rollups.aggregate([
+            {'$match': {'period': 'hour'}},
+            {'$group': {'_id': {'tool_name': '$tool_name', 'action': '$action'}, 'count': {'$sum': '$count'}}}
+        ])
+    ]
+    if totals:
+        mongo.db.tool_usage_rollups.bulk_write(totals, ordered=False)
+    current_app.logger.info(f"Backfilled {written} hourly tool usage rollups and {len(totals)} totals")
+    return {'hourly': written, 'totals': len(totals)}
+
+TOOL_USAGE_ACTIONS_TTL = 300
+_tool_usage_actions_cache = {}
+
+def get_tool_usage_actions(mongo, tool_name=None):
+    """Retrieve the distinct actions logged for a tool (or all tools), cached for a few minutes."""
+    cached = _tool_usage_actions_cache.get(tool_name)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    filters = {'period': 'total'}
+    if tool_name:
+        filters['tool_name'] = tool_name
+    actions = sorted(a for a in mongo.db.tool_usage_rollups.distinct('action', filters) if a)
+    _tool_usage_actions_cache[tool_name] = (time.monotonic() + TOOL_USAGE_ACTIONS_TTL, actions)
+    return actions
+
+def get_tool_usage_totals(mongo):
+    """Retrieve the all-time tool usage rollups."""
+    return list(mongo.db.tool_usage_rollups.find({'period': 'total'}, {'_id': 0, 'tool_name': 1, 'action': 1, 'count': 1}))
+
 def log_tool_usage(mongo, tool_name, user_id=None, session_id=None, action=None, details=None):
     """
     Log tool usage to the MongoDB tool_usage collection.
+
+    Events are queued on the app's ToolUsageBuffer and written in batches by its
+    flusher thread; when the buffer is not running they are inserted directly.
     
     Args:
         mongo: PyMongo instance
@@ -749,14 +969,365 @@ def log_tool_usage(mongo, tool_name, user_id=None, session_id=None, action=None,
         details (dict): Additional details for logging
     """
     session_id = session_id or session.get('sid', str(uuid.uuid4()))  # Generate new session_id if none exists
+    tool_usage_data = {
+        'tool_name': tool_name,
+        'user_id': user_id,
+        'session_id': session_id,
+        'action': action or 'unknown'
+    }
     try:
-        create_tool_usage(mongo, {
-            'tool_name': tool_name,
-            'user_id': user_id,
-            'session_id': session_id,
-            'action': action or 'unknown'
-        })
+        buffer = current_app.config.get('TOOL_USAGE_BUFFER')
+        if buffer is not None and buffer.running:
+            if not buffer.enqueue(build_tool_usage(tool_usage_data)):
+                current_app.logger.warning(f"Tool usage buffer full, dropped event: {tool_name} for session {session_id}")
+                return
+        else:
+            create_tool_usage(mongo, tool_usage_data)
         current_app.logger.info(f"Logged tool usage: {tool_name} for session {session_id}", extra={'details': details})
     except Exception as e:
         current_app.logger.error(f"Failed to log tool usage: {str(e)}", extra={'tool_name': tool_name, 'session_id': session_id, 'details': details})
         raise
+
+# Dashboard helper functions
+DASHBOARD_MAX_WORKERS = 4
+_dashboard_executor = ThreadPoolExecutor(max_workers=DASHBOARD_MAX_WORKERS, thread_name_prefix='dashboard')
+
+# Only the fields general_dashboard.html renders are fetched for each tool.
+DASHBOARD_PROJECTIONS = {
+    'financial_health': {'_id': 0, 'id': 1, 'score': 1, 'status': 1},
+    'budgets': {'_id': 0, 'id': 1, 'surplus_deficit': 1, 'savings_goal': 1},
+    'net_worth': {'_id': 0, 'id': 1, 'net_worth': 1, 'total_assets': 1},
+    'emergency_funds': {'_id': 0, 'id': 1, 'target_amount': 1, 'savings_gap': 1},
+    'quiz_results': {'_id': 0, 'id': 1, 'personality': 1, 'score': 1},
+    'bills': {'_id': 0, 'id': 1, 'amount': 1, 'status': 1},
+    'learning_progress': {'_id': 0, 'id': 1, 'course_id': 1, 'lessons_completed': 1}
+}
+
+DASHBOARD_DEFAULTS = {
+    'financial_health': {'score': None, 'status': None},
+    'budget': {'surplus_deficit': None, 'savings_goal': None},
+    'bills': {'bills': [], 'count': 0, 'total_amount': 0, 'unpaid_amount': 0},
+    'net_worth': {'net_worth': None, 'total_assets': None},
+    'emergency_fund': {'target_amount': None, 'savings_gap': None},
+    'learning_progress': {},
+    'quiz': {'personality': None, 'score': None}
+}
+
+def _find_latest(mongo, collection, filters):
+    """Fetch the most recent record with an 'id' from a collection."""
+    query = dict(filters, id={'$exists': True})
+    return mongo.db[collection].find_one(query, DASHBOARD_PROJECTIONS[collection], sort=[('created_at', -1)])
+
+def _find_all(mongo, collection, filters):
+    """Fetch all records with an 'id' from a collection."""
+    query = dict(filters, id={'$exists': True})
+    return list(mongo.db[collection].find(query, DASHBOARD_PROJECTIONS[collection]))
+
+def _bind_request(func):
+    """Charge queries run on the dashboard executor to the submitting request's timer and query scope."""
+    return bind_scope(bind_timer(func))
+
+def get_dashboard_data(mongo, filters):
+    """Load the general dashboard data with one concurrent query per tool."""
+    futures = {
+        'financial_health': _dashboard_executor.submit(_bind_request(_find_latest), mongo, 'financial_health', filters),
+        'budget': _dashboard_executor.submit(_bind_request(_find_latest), mongo, 'budgets', filters),
+        'net_worth': _dashboard_executor.submit(_bind_request(_find_latest), mongo, 'net_worth', filters),
+        'emergency_fund': _dashboard_executor.submit(_bind_request(_find_latest), mongo, 'emergency_funds', filters),
+        'quiz': _dashboard_executor.submit(_bind_request(_find_latest), mongo, 'quiz_results', filters),
+        'bills': _dashboard_executor.submit(_bind_request(_find_all), mongo, 'bills', filters),
+        'learning_progress': _dashboard_executor.submit(_bind_request(_find_all), mongo, 'learning_progress', filters)
+    }
+    results = {key: future.result() for key, future in futures.items()}
+    data = {}
+    data['financial_health'] = to_dict_financial_health(results['financial_health']) if results['financial_health'] else DASHBOARD_DEFAULTS['financial_health']
+    data['budget'] = to_dict_budget(results['budget']) if results['budget'] else DASHBOARD_DEFAULTS['budget']
+    data['net_worth'] = to_dict_net_worth(results['net_worth']) if results['net_worth'] else DASHBOARD_DEFAULTS['net_worth']
+    data['emergency_fund'] = to_dict_emergency_fund(results['emergency_fund']) if results['emergency_fund'] else DASHBOARD_DEFAULTS['emergency_fund']
+    data['quiz'] = to_dict_quiz_result(results['quiz']) if results['quiz'] else DASHBOARD_DEFAULTS['quiz']
+    bills = [to_dict_bill(b) for b in results['bills']]
+    total_amount = sum(bill['amount'] for bill in bills if bill['amount'] is not None)
+    unpaid_amount = sum(bill['amount'] for bill in bills if bill['amount'] is not None and (bill['status'] or '').lower() != 'paid')
+    data['bills'] = {'bills': bills, 'count': len(bills), 'total_amount': total_amount, 'unpaid_amount': unpaid_amount}
+    data['learning_progress'] = {lp['course_id']: to_dict_learning_progress(lp) for lp in results['learning_progress']}
+    return data
+
+# UserSummary helper functions
+BILL_STATUSES = ['paid', 'unpaid', 'overdue', 'pending']
+
+def summary_owner(record):
+    """Return the owner filter (user_id or session_id) for a record."""
+    if record.get('user_id'):
+        return {'user_id': record['user_id']}
+    return {'session_id': record.get('session_id')}
+
+def user_summary_key(filters):
+    """Build the user_summaries _id for a user_id or session_id filter."""
+    if filters.get('user_id'):
+        return f"user:{filters['user_id']}"
+    return f"session:{filters.get('session_id')}"
+
+def get_user_summary(mongo, filters):
+    """Retrieve the materialized dashboard summary for a user or session."""
+    return mongo.db.user_summaries.find_one({'_id': user_summary_key(filters)})
+
+def update_user_summary(mongo, filters, set_fields=None, inc_fields=None):
+    """Apply $set/$inc changes to a user summary, creating it if missing."""
+    update = {
+        '$set': {**(set_fields or {}), 'updated_at': datetime.utcnow()},
+        '$setOnInsert': {'user_id': filters.get('user_id'), 'session_id': filters.get('session_id')}
+    }
+    if inc_fields:
+        update['$inc'] = inc_fields
+    try:
+        mongo.db.user_summaries.update_one({'_id': user_summary_key(filters)}, update, upsert=True)
+    except Exception as e:
+        current_app.logger.error(f"Failed to update user summary {user_summary_key(filters)}: {str(e)}")
+
+def bill_summary_delta(bill, sign=1):
+    """Return the $inc fields that add (sign=1) or remove (sign=-1) a bill from a summary."""
+    try:
+        amount = float(bill['amount'])
+    except (KeyError, ValueError, TypeError):
+        return {}
+    status = bill.get('status')
+    delta = {
+        'bills.count': sign,
+        'bills.total_amount': sign * amount,
+        f"bills.categories.{bill.get('category') or 'other'}": sign * amount
+    }
+    if status in BILL_STATUSES:
+        delta[f'bills.{status}_count'] = sign
+        delta[f'bills.total_{status}'] = sign * amount
+    return delta
+
+def bill_summary_change(old_bill=None, new_bill=None):
+    """Combine the removal of old_bill and addition of new_bill into one $inc."""
+    change = {}
+    for bill, sign in ((old_bill, -1), (new_bill, 1)):
+        if bill:
+            for field, value in bill_summary_delta(bill, sign).items():
+                change[field] = change.get(field, 0) + value
+    return {field: value for field, value in change.items() if value}
+
+def apply_user_summary_changes(mongo, changes):
+    """Apply {summary key: (owner filters, $inc fields)} to many summaries in one bulk write."""
+    from pymongo import UpdateOne
+    now = datetime.utcnow()
+    ops = [
+        UpdateOne(
+            {'_id': key},
+            {'$set': {'updated_at': now}, '$setOnInsert': {'user_id': owner.get('user_id'), 'session_id': owner.get('session_id')}, '$inc': inc_fields},
+            upsert=True
+        )
+        for key, (owner, inc_fields) in changes.items() if inc_fields
+    ]
+    if ops:
+        mongo.db.user_summaries.bulk_write(ops, ordered=False)
+    return len(ops)
+
+def _summary_snapshot(record, fields):
+    """Copy the dashboard fields of a record into a summary section."""
+    snapshot = {field: record.get(field) for field in fields}
+    snapshot['id'] = record.get('id', record.get('_id'))
+    return snapshot
+
+SUMMARY_SECTIONS = {
+    'budget': ('budgets', ['income', 'fixed_expenses', 'savings_goal', 'surplus_deficit', 'created_at'], {}),
+    'net_worth': ('net_worth_data', ['first_name', 'email', 'cash_savings', 'investments', 'property', 'loans', 'total_assets', 'total_liabilities', 'net_worth', 'badges', 'created_at'], {}),
+    'emergency_fund': ('emergency_funds', ['first_name', 'email', 'monthly_expenses', 'monthly_income', 'current_savings', 'risk_tolerance_level', 'dependents', 'timeline', 'recommended_months', 'target_amount', 'savings_gap', 'monthly_savings', 'percent_of_income', 'badges', 'created_at'], {}),
+    'financial_health': ('financial_health_scores', ['score', 'status', 'status_key', 'user_type', 'created_at'], {'step': 3}),
+    'quiz': ('quiz_responses', ['personality', 'score', 'created_at'], {})
+}
+
+def summary_section(section, record):
+    """Return the $set fields that store a record as the latest in a summary section."""
+    return {section: _summary_snapshot(record, SUMMARY_SECTIONS[section][1])}
+
+def dashboard_data_from_summary(summary):
+    """Shape a user summary into the general dashboard data dict."""
+    bills = summary.get('bills') or {}
+    total_amount = bills.get('total_amount', 0)
+    return {
+        'financial_health': summary.get('financial_health') or DASHBOARD_DEFAULTS['financial_health'],
+        'budget': summary.get('budget') or DASHBOARD_DEFAULTS['budget'],
+        'bills': {
+            'bills': [],
+            'count': bills.get('count', 0),
+            'total_amount': total_amount,
+            'unpaid_amount': total_amount - bills.get('total_paid', 0)
+        },
+        'net_worth': summary.get('net_worth') or DASHBOARD_DEFAULTS['net_worth'],
+        'emergency_fund': summary.get('emergency_fund') or DASHBOARD_DEFAULTS['emergency_fund'],
+        'learning_progress': summary.get('learning_progress') or {},
+        'quiz': summary.get('quiz') or DASHBOARD_DEFAULTS['quiz']
+    }
+
+def _flush_summary_ops(mongo, ops):
+    """Write a batch of summary upserts."""
+    if ops:
+        mongo.db.user_summaries.bulk_write(ops, ordered=False)
+    return len(ops)
+
+def rebuild_user_summaries(mongo, batch_size=500):
+    """Regenerate all user summaries from the raw collections in batches."""
+    from pymongo import UpdateOne
+    started_at = datetime.utcnow()
+    owner_key = {'$cond': [{'$ifNull': ['$user_id', False]}, {'$concat': ['user:', {'$toString': '$user_id'}]}, {'$concat': ['session:', {'$toString': '$session_id'}]}]}
+    written = 0
+
+    def upsert(key, owner, set_fields):
+        return UpdateOne(
+            {'_id': key},
+            {'$set': {**set_fields, 'rebuilt_at': started_at, 'updated_at': started_at}, '$setOnInsert': owner},
+            upsert=True
+        )
+
+    for section, (collection, fields, match) in SUMMARY_SECTIONS.items():
+        pipeline = [
+            {'$match': match},
+            {'$sort': {'created_at': -1}},
+            {'$group': {'_id': owner_key, 'latest': {'$first': '$$ROOT'}}}
+        ]
+        ops = []
+        for row in mongo.db[collection].aggregate(pipeline, allowDiskUse=True):
+            latest = row['latest']
+            ops.append(upsert(row['_id'], {'user_id': latest.get('user_id'), 'session_id': latest.get('session_id')}, summary_section(section, latest)))
+            if len(ops) >= batch_size:
+                written += _flush_summary_ops(mongo, ops)
+                ops = []
+        written += _flush_summary_ops(mongo, ops)
+
+    pipeline = [
+        {'$match': {'amount': {'$type': 'number'}}},
+        {'$group': {
+            '_id': {'owner': owner_key, 'category': {'$ifNull': ['$category', 'other']}, 'status': '$status'},
+            'user_id': {'$first': '$user_id'},
+            'session_id': {'$first': '$session_id'},
+            'count': {'$sum': 1},
+            'amount': {'$sum': '$amount'}
+        }},
+        {'$sort': {'_id.owner': 1}}
+    ]
+    ops = []
+    current_key, owner, bills = None, None, None
+    for row in mongo.db.bills.aggregate(pipeline, allowDiskUse=True):
+        if row['_id']['owner'] != current_key:
+            if current_key is not None:
+                ops.append(upsert(current_key, owner, {'bills': bills}))
+            current_key = row['_id']['owner']
+            owner = {'user_id': row.get('user_id'), 'session_id': row.get('session_id')}
+            bills = {'count': 0, 'total_amount': 0.0, 'categories': {}}
+            for status in BILL_STATUSES:
+                bills[f'{status}_count'] = 0
+                bills[f'total_{status}'] = 0.0
+        status = row['_id']['status']
+        category = row['_id']['category']
+        bills['count'] += row['count']
+        bills['total_amount'] += row['amount']
+        bills['categories'][category] = bills['categories'].get(category, 0.0) + row['amount']
+        if status in BILL_STATUSES:
+            bills[f'{status}_count'] += row['count']
+            bills[f'total_{status}'] += row['amount']
+        if len(ops) >= batch_size:
+            written += _flush_summary_ops(mongo, ops)
+            ops = []
+    if current_key is not None:
+        ops.append(upsert(current_key, owner, {'bills': bills}))
+    written += _flush_summary_ops(mongo, ops)
+
+    ops = []
+    for record in mongo.db.learning_materials.find({'course_id': {'$exists': True}}, {'_id': 0, 'user_id': 1, 'session_id': 1, 'course_id': 1, 'lessons_completed': 1}):
+        owner = summary_owner(record)
+        ops.append(upsert(user_summary_key(owner), {'user_id': record.get('user_id'), 'session_id': record.get('session_id')},
+                          {f"learning_progress.{record['course_id']}": {'lessons_completed': record.get('lessons_completed', [])}}))
+        if len(ops) >= batch_size:
+            written += _flush_summary_ops(mongo, ops)
+            ops = []
+    written += _flush_summary_ops(mongo, ops)
+
+    removed = mongo.db.user_summaries.delete_many({'$or': [
+        {'rebuilt_at': {'$lt': started_at}},
+        {'rebuilt_at': {'$exists': False}, 'updated_at': {'$lt': started_at}}
+    ]}).deleted_count
+    current_app.logger.info(f"Rebuilt user summaries: {written} upserts, {removed} stale summaries removed")
+    return {'upserts': written, 'removed': removed}
+
+# ScoreHistogram helper functions
+SCORE_MIN = 0
+SCORE_MAX = 100
+
+def score_histogram_segments(user_type=None):
+    """Return the histogram _ids a score counts towards: all users plus its user_type."""
+    segments = ['all']
+    if user_type:
+        segments.append(f'user_type:{user_type}')
+    return segments
+
+def _score_bucket(score):
+    """Clamp a score to an integer histogram bucket."""
+    return max(SCORE_MIN, min(SCORE_MAX, int(round(score))))
+
+def update_score_histogram(mongo, new_score=None, new_user_type=None, old_score=None, old_user_type=None):
+    """Move a user's score between histogram buckets with $inc (add, replace or remove)."""
+    from pymongo import UpdateOne
+    changes = {}
+    for score, user_type, sign in ((old_score, old_user_type, -1), (new_score, new_user_type, 1)):
+        if score is None:
+            continue
+        bucket = _score_bucket(score)
+        for segment in score_histogram_segments(user_type):
+            inc = changes.setdefault(segment, {})
+            inc[f'buckets.{bucket}'] = inc.get(f'buckets.{bucket}', 0) + sign
+            inc['total'] = inc.get('total', 0) + sign
+            inc['sum'] = inc.get('sum', 0) + sign * bucket
+    ops = []
+    for segment, inc in changes.items():
+        inc = {field: value for field, value in inc.items() if value}
+        if inc:
+            ops.append(UpdateOne({'_id': segment}, {'$inc': inc, '$set': {'updated_at': datetime.utcnow()}}, upsert=True))
+    if not ops:
+        return
+    try:
+        mongo.db.score_histograms.bulk_write(ops, ordered=False)
+    except Exception as e:
+        current_app.logger.error(f"Failed to update score histogram: {str(e)}")
+
+def get_score_ranking(mongo, score, user_type=None):
+    """Compute rank, percentile and average for a score from the histogram in O(101)."""
+    segment = score_histogram_segments(user_type)[-1]
+    histogram = mongo.db.score_histograms.find_one({'_id': segment}) or {}
+    buckets = histogram.get('buckets', {})
+    total = histogram.get('total', 0)
+    if total <= 0:
+        return {'rank': 0, 'total_users': 0, 'average_score': 0, 'percentile': 0}
+    bucket = _score_bucket(score or 0)
+    above = sum(buckets.get(str(s), 0) for s in range(bucket + 1, SCORE_MAX + 1))
+    below = sum(buckets.get(str(s), 0) for s in range(SCORE_MIN, bucket))
+    return {
+        'rank': above + 1,
+        'total_users': total,
+        'average_score': histogram.get('sum', 0) / total,
+        'percentile': below / total * 100
+    }
+
+def rebuild_score_histograms(mongo):
+    """Regenerate the score histograms from all completed financial health records."""
+    counts = {}
+    pipeline = [
+        {'$match': {'step': 3, 'score': {'$type': 'number'}}},
+        {'$group': {'_id': {'score': '$score', 'user_type': '$user_type'}, 'count': {'$sum': 1}}}
+    ]
+    for row in mongo.db.financial_health_scores.aggregate(pipeline, allowDiskUse=True):
+        bucket = _score_bucket(row['_id']['score'])
+        for segment in score_histogram_segments(row['_id'].get('user_type')):
+            histogram = counts.setdefault(segment, {'buckets': {}, 'total': 0, 'sum': 0})
+            histogram['buckets'][str(bucket)] = histogram['buckets'].get(str(bucket), 0) + row['count']
+            histogram['total'] += row['count']
+            histogram['sum'] += bucket * row['count']
+    now = datetime.utcnow()
+    for segment, histogram in counts.items():
+        mongo.db.score_histograms.replace_one({'_id': segment}, {**histogram, 'updated_at': now}, upsert=True)
+    mongo.db.score_histograms.delete_many({'_id': {'$nin': list(counts)}})
+    current_app.logger.info(f"Rebuilt {len(counts)} score histograms")
+    return len(counts)
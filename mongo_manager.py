@@ -0,0 +1,175 @@
+import threading
+import time
+import certifi
+from pymongo import MongoClient, monitoring, uri_parser
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Connection pool listener that keeps running counters for the shared client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters = {
+            'created': 0, 'closed': 0, 'checked_out': 0, 'checkouts': 0, 'checkout_failures': 0,
+            'pools_created': 0, 'pools_cleared': 0, 'wait_ms_total': 0.0, 'wait_ms_max': 0.0
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _record_wait(self):
+        started = getattr(self._local, 'checkout_started', None)
+        if started is None:
+            return
+        self._local.checkout_started = None
+        wait_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.counters['wait_ms_total'] += wait_ms
+            self.counters['wait_ms_max'] = max(self.counters['wait_ms_max'], wait_ms)
+
+    def pool_created(self, event):
+        self._count('pools_created')
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count('pools_cleared')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._count('created')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._count('closed')
+
+    # Checkout events fire on the requesting thread, so the wait is measured with a thread-local start time
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._record_wait()
+        self._count('checkout_failures')
+
+    def connection_checked_out(self, event):
+        self._record_wait()
+        with self._lock:
+            self.counters['checked_out'] += 1
+            self.counters['checkouts'] += 1
+
+    def connection_checked_in(self, event):
+        self._count('checked_out', -1)
+
+    def stats(self):
+        """Return a snapshot of the pool counters."""
+        with self._lock:
+            stats = dict(self.counters)
+        stats['open'] = stats['created'] - stats['closed']
+        stats['wait_ms_avg'] = round(stats['wait_ms_total'] / stats['checkouts'], 3) if stats['checkouts'] else 0.0
+        stats['wait_ms_total'] = round(stats['wait_ms_total'], 3)
+        stats['wait_ms_max'] = round(stats['wait_ms_max'], 3)
+        return stats
+
+class MongoManager:
+    """Owns the single MongoClient shared by Flask-PyMongo, Flask-Session and the scheduler."""
+
+    def __init__(self, mongo, logger, event_listeners=()):
+        self.mongo = mongo
+        self.logger = logger
+        self.event_listeners = [listener for listener in event_listeners if listener is not None]
+        self.app = None
+        self.pool_metrics = PoolMetricsListener()
+        self.reconnects = 0
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self.mongo.cx
+
+    def client_options(self, app):
+        return {
+            'connect': False,
+            'tlsCAFile': certifi.where(),
+            'maxPoolSize': int(app.config.get('MONGO_MAX_POOL_SIZE', 20)),
+            'minPoolSize': 0,
+            'maxIdleTimeMS': int(app.config.get('MONGO_MAX_IDLE_TIME_MS', 60000)),
+            'socketTimeoutMS': 60000,
+            'connectTimeoutMS': 30000,
+            'serverSelectionTimeoutMS': 30000,
+            'retryWrites': True,
+            'event_listeners': [self.pool_metrics] + self.event_listeners
+        }
+
+    def init_app(self, app):
+        """Create the shared client through Flask-PyMongo and publish it to the rest of the app."""
+        self.app = app
+        self.mongo.init_app(app, uri=app.config['MONGO_URI'], **self.client_options(app))
+        self._publish(app)
+        app.extensions['mongo'] = self.mongo
+        app.extensions['mongo_manager'] = self
+        self.logger.info(f"MongoDB client created (maxPoolSize={self.client_options(app)['maxPoolSize']})")
+        return self.client
+
+    def _publish(self, app):
+        app.config['MONGO_CLIENT'] = self.client
+        if app.config.get('SESSION_TYPE') == 'mongodb':
+            app.config['SESSION_MONGODB'] = self.client
+        session_interface = getattr(app, 'session_interface', None)
+        if session_interface is not None and hasattr(session_interface, 'store'):
+            collection = session_interface.store
+            session_interface.client = self.client
+            session_interface.store = self.client[collection.database.name][collection.name]
+
+    def ping(self):
+        self.client.admin.command('ping')
+        return True
+
+    def reconnect(self):
+        """Replace the shared client in place, closing the old pool first so pools never multiply."""
+        with self._lock:
+            app = self.app
+            old_client = self.client
+            try:
+                old_client.close()
+            except Exception as e:
+                self.logger.warning(f"Error closing MongoDB client before reconnect: {str(e)}")
+            new_client = MongoClient(app.config['MONGO_URI'], **self.client_options(app))
+            database_name = uri_parser.parse_uri(app.config['MONGO_URI'])['database']
+            self.mongo.cx = new_client
+            if database_name:
+                self.mongo.db = new_client[database_name]
+            self._publish(app)
+            self.reconnects += 1
+            self.logger.info(f"MongoDB client reconnected in place (reconnects={self.reconnects})")
+            return new_client
+
+    def close(self):
+        try:
+            if self.client is not None:
+                self.client.close()
+                self.logger.info("MongoDB client closed on app shutdown")
+        except Exception as e:
+            self.logger.error(f"Error closing MongoDB client on app shutdown: {str(e)}", exc_info=True)
+
+    def stats(self):
+        """Return pool counters plus the configured limits."""
+        stats = self.pool_metrics.stats()
+        options = self.client_options(self.app) if self.app is not None else {}
+        stats.update({
+            'max_pool_size': options.get('maxPoolSize'),
+            'max_idle_time_ms': options.get('maxIdleTimeMS'),
+            'reconnects': self.reconnects
+        })
+        return stats
+
+def init_mongo_manager(app, mongo, logger, event_listeners=()):
+    """Create the shared MongoDB client and register it on the app."""
+    manager = MongoManager(mongo, logger, event_listeners=event_listeners)
+    manager.init_app(app)
+    return manager
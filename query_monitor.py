@@ -0,0 +1,270 @@
+import functools
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from flask import request
+from pymongo import monitoring
+
+_state = threading.local()
+
+# Commands issued by the driver itself or carrying no query shape worth grouping
+IGNORED_COMMANDS = frozenset(['hello', 'ismaster', 'isMaster', 'ping', 'endSessions', 'killCursors', 'saslStart', 'saslContinue', 'buildInfo', 'explain'])
+
+# Where each command keeps its filter (or pipeline) in the command document
+FILTER_FIELDS = {
+    'find': 'filter', 'count': 'query', 'distinct': 'query', 'findAndModify': 'query',
+    'aggregate': 'pipeline', 'update': 'updates', 'delete': 'deletes'
+}
+
+def _shape(value):
+    """Replace literal values with their type names so identical queries with different values compare equal."""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and not any(isinstance(item, (dict, list, tuple)) for item in value):
+            # $in lists of any length share one shape
+            return [type(value[0]).__name__]
+        return [_shape(item) for item in value]
+    return type(value).__name__
+
+def command_filter(command_name, command):
+    """Return the filter (or pipeline) of a command document, or None when it has none."""
+    field = FILTER_FIELDS.get(command_name)
+    if field is None:
+        return None
+    value = command.get(field)
+    if command_name in ('update', 'delete') and value:
+        # Bulk writes carry one statement per document; the first statement's filter defines the shape
+        return value[0].get('q')
+    return value
+
+def command_shape(command_name, command):
+    collection = command.get(command_name)
+    return f"{command_name} {collection} {_shape(command_filter(command_name, command))}"
+
+def documents_returned(reply):
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        return len(cursor.get('firstBatch') or cursor.get('nextBatch') or [])
+    return reply.get('n', 0)
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() query plan tree."""
+    if not isinstance(plan, dict):
+        return
+    if 'stage' in plan:
+        yield plan['stage']
+    for key in ('inputStage', 'queryPlan'):
+        yield from _plan_stages(plan.get(key))
+    for child in plan.get('inputStages', []):
+        yield from _plan_stages(child)
+
+class QueryScope:
+    """Commands issued by one request or scheduler job."""
+
+    def __init__(self, name, sample_explain):
+        self.name = name
+        self.started_at = datetime.utcnow()
+        self.sample_explain = sample_explain
+        self.commands = 0
+        self.duration_ms = 0.0
+        self.shapes = {}
+        self.slow = []
+        self.pending = {}
+        self._lock = threading.Lock()
+
+    def start(self, event):
+        shape = command_shape(event.command_name, event.command)
+        sample = None
+        if self.sample_explain and event.command_name == 'find':
+            sample = {'database': event.database_name, 'collection': event.command.get('find'), 'filter': event.command.get('filter', {})}
+        with self._lock:
+            self.pending[event.request_id] = (shape, sample)
+
+    def finish(self, event, slow_ms, documents=0):
+        duration_ms = event.duration_micros / 1000
+        with self._lock:
+            shape, sample = self.pending.pop(event.request_id, (None, None))
+            if shape is None:
+                return
+            self.commands += 1
+            self.duration_ms += duration_ms
+            entry = self.shapes.get(shape)
+            if entry is None:
+                entry = self.shapes[shape] = {'count': 0, 'duration_ms': 0.0, 'documents': 0, 'sample': sample}
+            entry['count'] += 1
+            entry['duration_ms'] += duration_ms
+            entry['documents'] += documents
+            if duration_ms >= slow_ms:
+                self.slow.append({'shape': shape, 'duration_ms': round(duration_ms, 3), 'documents': documents})
+
+class QueryMonitor(monitoring.CommandListener):
+    """
+    Groups MongoDB commands by request or scheduler job and keeps a rotating report of scopes
+    that issued slow commands, repeated one command shape repeat_threshold times or more
+    (the N+1 pattern), or ran a sampled find() as a collection scan.
+    """
+
+    def __init__(self, logger, slow_ms=100.0, repeat_threshold=5, explain_sample_rate=0.0, max_reports=100):
+        self.logger = logger
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self.explain_sample_rate = explain_sample_rate
+        self.reports = deque(maxlen=max_reports)
+        self._lock = threading.Lock()
+        self.counters = {'scopes': 0, 'commands': 0, 'flagged': 0, 'slow': 0, 'repeated': 0, 'collscans': 0}
+
+    def started(self, event):
+        scope = current_scope()
+        if scope is not None and event.command_name not in IGNORED_COMMANDS:
+            scope.start(event)
+
+    def succeeded(self, event):
+        scope = current_scope()
+        if scope is not None:
+            scope.finish(event, self.slow_ms, documents_returned(event.reply))
+
+    def failed(self, event):
+        scope = current_scope()
+        if scope is not None:
+            scope.finish(event, self.slow_ms)
+
+    def begin(self, name):
+        """Open a scope on the calling thread; commands it issues are grouped under name."""
+        sample_explain = self.explain_sample_rate > 0 and random.random() < self.explain_sample_rate
+        _state.scope = QueryScope(name, sample_explain)
+        return _state.scope
+
+    def end(self, client=None):
+        """Close the calling thread's scope and record a report if anything was flagged."""
+        scope = current_scope()
+        _state.scope = None
+        if scope is None:
+            return None
+        repeated = [
+            {'shape': shape, 'count': entry['count'], 'duration_ms': round(entry['duration_ms'], 3), 'documents': entry['documents']}
+            for shape, entry in scope.shapes.items() if entry['count'] >= self.repeat_threshold
+        ]
+        collscans = self._explain(scope, client) if scope.sample_explain and client is not None else []
+        with self._lock:
+            self.counters['scopes'] += 1
+            self.counters['commands'] += scope.commands
+            self.counters['slow'] += len(scope.slow)
+            self.counters['repeated'] += len(repeated)
+            self.counters['collscans'] += len(collscans)
+        if not (scope.slow or repeated or collscans):
+            return None
+        report = {
+            'scope': scope.name,
+            'started_at': scope.started_at.isoformat(),
+            'commands': scope.commands,
+            'duration_ms': round(scope.duration_ms, 3),
+            'slow': scope.slow,
+            'repeated': repeated,
+            'collscans': collscans
+        }
+        with self._lock:
+            self.counters['flagged'] += 1
+            self.reports.append(report)
+        self.logger.warning(
+            "query monitor flagged %s: commands=%d slow=%d repeated=%s collscans=%s",
+            scope.name, scope.commands, len(scope.slow),
+            [(item['shape'], item['count']) for item in repeated], [item['shape'] for item in collscans]
+        )
+        return report
+
+    def _explain(self, scope, client):
+        """Run explain() once per sampled find() shape; called after the scope is closed so it is not monitored."""
+        collscans = []
+        for shape, entry in scope.shapes.items():
+            sample = entry['sample']
+            if sample is None:
+                continue
+            try:
+                explained = client[sample['database']].command(
+                    'explain', {'find': sample['collection'], 'filter': sample['filter']}, verbosity='queryPlanner'
+                )
+            except Exception as e:
+                self.logger.warning("explain failed for %s: %s", shape, e)
+                continue
+            if 'COLLSCAN' in _plan_stages(explained.get('queryPlanner', {}).get('winningPlan')):
+                collscans.append({'shape': shape, 'count': entry['count'], 'documents': entry['documents']})
+        return collscans
+
+    def snapshot(self):
+        """Return the counters and the flagged scope reports, newest first."""
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'settings': {
+                    'slow_ms': self.slow_ms, 'repeat_threshold': self.repeat_threshold,
+                    'explain_sample_rate': self.explain_sample_rate, 'max_reports': self.reports.maxlen
+                },
+                'reports': list(reversed(self.reports))
+            }
+
+    def reset(self):
+        with self._lock:
+            self.reports.clear()
+            for name in self.counters:
+                self.counters[name] = 0
+
+def current_scope():
+    return getattr(_state, 'scope', None)
+
+def bind_scope(func):
+    """Wrap func so commands issued on another thread are grouped with the submitting request."""
+    scope = current_scope()
+    if scope is None:
+        return func
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        previous = current_scope()
+        _state.scope = scope
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _state.scope = previous
+    return wrapper
+
+@contextmanager
+def monitored_job(app, name):
+    """Group the commands a scheduler job issues under job:<name>."""
+    monitor = app.extensions.get('query_monitor')
+    if monitor is None:
+        yield
+        return
+    monitor.begin(f"job:{name}")
+    try:
+        yield
+    finally:
+        monitor.end(app.config.get('MONGO_CLIENT'))
+
+def init_query_monitor(app, logger):
+    """Create the command monitor and its request hooks; returns the listener to pass to the shared client."""
+    if not app.config.get('QUERY_MONITOR_ENABLED', True):
+        return None
+    monitor = QueryMonitor(
+        logger,
+        slow_ms=float(app.config.get('QUERY_SLOW_MS', 100)),
+        repeat_threshold=int(app.config.get('QUERY_REPEAT_THRESHOLD', 5)),
+        explain_sample_rate=float(app.config.get('QUERY_EXPLAIN_SAMPLE_RATE', 0.0)),
+        max_reports=int(app.config.get('QUERY_MONITOR_REPORTS', 100))
+    )
+    app.extensions['query_monitor'] = monitor
+
+    @app.before_request
+    def begin_query_scope():
+        if not request.path.startswith('/static/'):
+            monitor.begin(f"{request.method} {request.path}")
+
+    @app.teardown_request
+    def end_query_scope(exc):
+        try:
+            monitor.end(app.config.get('MONGO_CLIENT'))
+        except Exception as e:
+            logger.error("query monitor failed to close scope: %s", e)
+
+    return monitor
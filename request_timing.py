@@ -0,0 +1,131 @@
+import functools
+import threading
+import time
+from flask import request, g, before_render_template, template_rendered
+from pymongo import monitoring
+
+_state = threading.local()
+
+class RequestTimer:
+    """Accumulated per-request durations in milliseconds."""
+
+    __slots__ = ('started', 'mongo_ms', 'mongo_commands', 'template_ms', 'email_ms', '_template_started', '_lock')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.mongo_ms = 0.0
+        self.mongo_commands = 0
+        self.template_ms = 0.0
+        self.email_ms = 0.0
+        self._template_started = None
+        # Mongo commands may complete on dashboard executor threads bound to this timer
+        self._lock = threading.Lock()
+
+    def add_mongo(self, duration_ms):
+        with self._lock:
+            self.mongo_ms += duration_ms
+            self.mongo_commands += 1
+
+def current_timer():
+    return getattr(_state, 'timer', None)
+
+def bind_timer(func):
+    """Wrap func so Mongo time spent on another thread is charged to the submitting request."""
+    timer = current_timer()
+    if timer is None:
+        return func
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        previous = current_timer()
+        _state.timer = timer
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _state.timer = previous
+    return wrapper
+
+def timed(category):
+    """Decorator adding the call duration to the current request's <category>_ms total."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timer = current_timer()
+            if timer is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                setattr(timer, f"{category}_ms", getattr(timer, f"{category}_ms") + (time.perf_counter() - started) * 1000)
+        return wrapper
+    return decorator
+
+class MongoTimingListener(monitoring.CommandListener):
+    """Charges each command's server round trip to the request running on the calling thread."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        timer = current_timer()
+        if timer is not None:
+            timer.add_mongo(event.duration_micros / 1000)
+
+    def failed(self, event):
+        timer = current_timer()
+        if timer is not None:
+            timer.add_mongo(event.duration_micros / 1000)
+
+def server_timing_header(timer, total_ms):
+    python_ms = max(total_ms - timer.mongo_ms - timer.template_ms - timer.email_ms, 0.0)
+    return ', '.join([
+        f'mongo;dur={timer.mongo_ms:.1f};desc="{timer.mongo_commands} cmds"',
+        f"tpl;dur={timer.template_ms:.1f}",
+        f"email;dur={timer.email_ms:.1f}",
+        f"app;dur={python_ms:.1f}",
+        f"total;dur={total_ms:.1f}"
+    ])
+
+def init_request_timing(app, logger):
+    """Register the timing hooks; returns the Mongo listener to pass to the shared client."""
+    if not app.config.get('REQUEST_TIMING_ENABLED', True):
+        return None
+    listener = MongoTimingListener()
+
+    @app.before_request
+    def start_request_timer():
+        _state.timer = g._request_timer = RequestTimer()
+
+    def template_started(sender, template, context, **extra):
+        timer = current_timer()
+        if timer is not None:
+            timer._template_started = time.perf_counter()
+
+    def template_finished(sender, template, context, **extra):
+        timer = current_timer()
+        if timer is not None and timer._template_started is not None:
+            timer.template_ms += (time.perf_counter() - timer._template_started) * 1000
+            timer._template_started = None
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
+
+    @app.after_request
+    def emit_server_timing(response):
+        timer = g.get('_request_timer')
+        if timer is None or request.path.startswith('/static/'):
+            return response
+        total_ms = (time.perf_counter() - timer.started) * 1000
+        response.headers['Server-Timing'] = server_timing_header(timer, total_ms)
+        logger.info(
+            "timing method=%s path=%s status=%s total=%.1f mongo=%.1f/%d tpl=%.1f email=%.1f",
+            request.method, request.path, response.status_code, total_ms,
+            timer.mongo_ms, timer.mongo_commands, timer.template_ms, timer.email_ms
+        )
+        return response
+
+    @app.teardown_request
+    def clear_request_timer(exc):
+        _state.timer = None
+
+    return listener
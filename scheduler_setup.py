@@ -1,8 +1,13 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.memory import MemoryJobStore
-from datetime import datetime, date, timedelta
-from flask import current_app, url_for
+from pymongo import UpdateOne
+from datetime import datetime, date
+from urllib.parse import urlsplit
+from flask import current_app
 from mailersend_email import send_email, trans, EMAIL_CONFIG
+from query_monitor import monitored_job
+from metrics import job_duration, job_rss
+from models import summary_owner, user_summary_key, bill_summary_change, apply_user_summary_changes, migrate_bill_due_dates, format_bill_due_date, compute_next_reminder_at, backfill_next_reminder_at
 import time
 import psutil
 import os
@@ -10,7 +15,11 @@ import os
 def log_job_metrics(job_name):
     """Log duration and memory usage for a job."""
     def decorator(func):
-        def wrapper(*args, **kwargs):
+        def wrapper(app, *args, **kwargs):
+            # APScheduler runs jobs on its own threads, so push the app context here for current_app
+            with app.app_context(), monitored_job(app, job_name):
+                return run(*args, **kwargs)
+        def run(*args, **kwargs):
             start_time = time.time()
             process = psutil.Process(os.getpid())
             start_memory = process.memory_info().rss / 1024 / 1024  # MB
@@ -18,6 +27,8 @@ def log_job_metrics(job_name):
                 result = func(*args, **kwargs)
                 duration = time.time() - start_time
                 end_memory = process.memory_info().rss / 1024 / 1024  # MB
+                job_duration.observe(duration, job_name, 'ok')
+                job_rss.set(process.memory_info().rss, job_name)
                 current_app.logger.info(
                     f"Job '{job_name}' completed: duration={duration:.2f}s, "
                     f"memory_start={start_memory:.2f}MB, memory_end={end_memory:.2f}MB"
@@ -26,6 +37,8 @@ def log_job_metrics(job_name):
             except Exception as e:
                 duration = time.time() - start_time
                 end_memory = process.memory_info().rss / 1024 / 1024
+                job_duration.observe(duration, job_name, 'error')
+                job_rss.set(process.memory_info().rss, job_name)
                 current_app.logger.error(
                     f"Job '{job_name}' failed: error={str(e)}, duration={duration:.2f}s, "
                     f"memory_start={start_memory:.2f}MB, memory_end={end_memory:.2f}MB",
@@ -35,124 +48,154 @@ def log_job_metrics(job_name):
         return wrapper
     return decorator
 
+OVERDUE_BATCH_SIZE = 1000
+
 @log_job_metrics('update_overdue_status')
 def update_overdue_status():
-    """Update status to overdue for past-due bills."""
+    """Mark pending and unpaid bills due before today as overdue with set-based updates."""
     with current_app.app_context():
         try:
             mongo = current_app.extensions['mongo']
-            db = mongo.db
-            bills_collection = db.bills
-            today = date.today()
-            bills = bills_collection.find({'status': {'$in': ['pending', 'unpaid']}})
+            bills_collection = mongo.db.bills
+            if bills_collection.find_one({'due_date': {'$type': 'string'}}, {'_id': 1}):
+                # String dates never compare $lt a datetime, so convert any left over before selecting
+                migrate_bill_due_dates(mongo)
+            today = datetime.combine(date.today(), datetime.min.time())
+            query = {'status': {'$in': ['pending', 'unpaid']}, 'due_date': {'$lt': today}}
+            projection = {'_id': 1, 'user_id': 1, 'session_id': 1, 'amount': 1, 'category': 1, 'status': 1}
             updated_count = 0
-            for bill in bills:
-                bill_due_date = bill['due_date']
-                if isinstance(bill_due_date, str):
-                    bill_due_date = datetime.strptime(bill_due_date, '%Y-%m-%d').date()
-                if bill_due_date < today:
-                    bills_collection.update_one(
-                        {'_id': bill['_id']},
-                        {'$set': {'status': 'overdue'}}
-                    )
-                    updated_count += 1
+            # Summaries need per-owner deltas, so transitions run in chunks: one read, one update_many
+            # and one summary bulk write per chunk, touching only bills that actually become overdue
+            while True:
+                bills = list(bills_collection.find(query, projection).limit(OVERDUE_BATCH_SIZE))
+                if not bills:
+                    break
+                ids = [bill['_id'] for bill in bills]
+                result = bills_collection.update_many({'_id': {'$in': ids}, **query}, {'$set': {'status': 'overdue'}})
+                if result.modified_count != len(ids):
+                    # Some bills changed between the read and the update; only count the ones this run moved
+                    moved = {bill['_id'] for bill in bills_collection.find({'_id': {'$in': ids}, 'status': 'overdue'}, {'_id': 1})}
+                    bills = [bill for bill in bills if bill['_id'] in moved]
+                changes = {}
+                for bill in bills:
+                    owner = summary_owner(bill)
+                    key = user_summary_key(owner)
+                    inc_fields = changes.setdefault(key, (owner, {}))[1]
+                    for field, value in bill_summary_change(bill, {**bill, 'status': 'overdue'}).items():
+                        inc_fields[field] = inc_fields.get(field, 0) + value
+                apply_user_summary_changes(mongo, changes)
+                updated_count += result.modified_count
+                current_app.logger.info(f"Overdue bills: {updated_count} updated so far")
+                if len(ids) < OVERDUE_BATCH_SIZE:
+                    break
             current_app.logger.info(f"Updated {updated_count} overdue bill statuses")
         except Exception as e:
             current_app.logger.exception(f"Error in update_overdue_status: {str(e)}")
             raise
 
+def external_url(endpoint, **values):
+    """Build an absolute URL against BASE_URL; scheduler jobs have no request to take the host from."""
+    base = urlsplit(current_app.config.get('BASE_URL', 'http://localhost:5000'))
+    adapter = current_app.url_map.bind(base.netloc, script_name=base.path or '/', url_scheme=base.scheme)
+    return adapter.build(endpoint, values, force_external=True)
+
+def reminder_recipient_page(bills_collection, now, batch_size):
+    """
+    Group the batch_size earliest-due bills by recipient on the server, joining each recipient's
+    language from users. The match is a range scan of the partial next_reminder_at index.
+    """
+    pipeline = [
+        {'$match': {'send_email': True, 'next_reminder_at': {'$lte': now}}},
+        {'$sort': {'next_reminder_at': 1}},
+        {'$limit': batch_size},
+        {'$group': {'_id': '$user_email', 'first_name': {'$first': '$first_name'}, 'bills': {'$sum': 1}}},
+        {'$lookup': {'from': 'users', 'localField': '_id', 'foreignField': 'email', 'as': 'user'}},
+        {'$project': {'first_name': 1, 'bills': 1, 'lang': {'$ifNull': [{'$arrayElemAt': ['$user.lang', 0]}, 'en']}}}
+    ]
+    recipients = list(bills_collection.aggregate(pipeline))
+    return recipients, sum(recipient['bills'] for recipient in recipients)
+
 @log_job_metrics('send_bill_reminders')
 def send_bill_reminders():
-    """Send reminders for upcoming and overdue bills in batches."""
+    """
+    Send one reminder per recipient covering all of their bills whose next_reminder_at has passed.
+
+    Every bill in an email, sent or failed, has next_reminder_at moved to the next day, so it leaves
+    the due range; bills beyond BILL_REMINDER_SEND_BUDGET stay due and are taken first next run.
+    """
     with current_app.app_context():
         try:
             mongo = current_app.extensions['mongo']
             db = mongo.db
             bills_collection = db.bills
             bill_reminders_collection = db.bill_reminders
-            users_collection = db.users
-            today = date.today()
-            user_bills = {}
-            max_emails_per_run = 10  # Limit to 10 emails per job execution
+            send_budget = current_app.config.get('BILL_REMINDER_SEND_BUDGET', 500)
+            batch_size = current_app.config.get('BILL_REMINDER_BATCH_SIZE', 1000)
+            if bills_collection.find_one({'send_email': True, 'next_reminder_at': {'$exists': False}}, {'_id': 1}):
+                # Bills written before next_reminder_at existed are invisible to the range scan
+                backfill_next_reminder_at(mongo)
+            now = datetime.utcnow()
+            config = EMAIL_CONFIG["bill_reminder"]
             email_count = 0
 
-            bills = bills_collection.find().limit(100)  # Process up to 100 bills per run
-            for bill in bills:
-                email = bill['user_email']
-                user = users_collection.find_one({'email': email}, {'lang': 1})
-                lang = user.get('lang', 'en') if user else 'en'
-                if bill.get('send_email') and email:
-                    reminder_window = today + timedelta(days=bill.get('reminder_days', 7))
-                    bill_due_date = bill['due_date']
-                    if isinstance(bill_due_date, str):
-                        bill_due_date = datetime.strptime(bill_due_date, '%Y-%m-%d').date()
-                    if (bill['status'] in ['pending', 'overdue'] or 
-                        (today <= bill_due_date <= reminder_window)):
-                        if email not in user_bills:
-                            user_bills[email] = {
-                                'first_name': bill.get('first_name', 'User'),
-                                'bills': [],
-                                'lang': lang
-                            }
-                        user_bills[email]['bills'].append({
-                            'bill_name': bill['bill_name'],
-                            'amount': bill['amount'],
-                            'due_date': bill_due_date.strftime('%Y-%m-%d'),
-                            'category': trans(f"bill_category_{bill['category']}", lang=lang),
-                            'status': trans(f"bill_status_{bill['status']}", lang=lang)
-                        })
-
-            for email, data in user_bills.items():
-                if email_count >= max_emails_per_run:
-                    current_app.logger.info(f"Reached max emails ({max_emails_per_run}), stopping")
+            while email_count < send_budget:
+                recipients, page_size = reminder_recipient_page(bills_collection, now, batch_size)
+                if not recipients:
                     break
-                try:
-                    config = EMAIL_CONFIG["bill_reminder"]
-                    subject = trans(config["subject_key"], lang=data['lang'])
-                    reminder_data = {
-                        'email': email,
-                        'first_name': data['first_name'],
-                        'bills': data['bills'],
-                        'lang': data['lang'],
-                        'sent_at': datetime.utcnow(),
-                        'cta_url': url_for('bill.dashboard', _external=True),
-                        'unsubscribe_url': url_for('bill.unsubscribe', email=email, _external=True)
-                    }
-                    send_email(
-                        app=current_app,
-                        logger=current_app.logger,
-                        to_email=email,
-                        subject=subject,
-                        template_name=config["template"],
-                        data=reminder_data,
-                        lang=data['lang']
-                    )
-                    bill_reminders_collection.insert_one(reminder_data)
-                    current_app.logger.info(f"Sent bill reminder email to {email} and saved to bill_reminders")
+                recipients = recipients[:send_budget - email_count]
+                # One read for every due bill of the page's recipients, including bills outside the page
+                user_bills = {}
+                for bill in bills_collection.find({'send_email': True, 'next_reminder_at': {'$lte': now}, 'user_email': {'$in': [recipient['_id'] for recipient in recipients]}}):
+                    user_bills.setdefault(bill['user_email'], []).append(bill)
+
+                for recipient in recipients:
+                    email = recipient['_id']
+                    bills = user_bills.get(email)
+                    if not bills:
+                        continue
+                    lang = recipient['lang']
                     email_count += 1
-                except Exception as e:
-                    current_app.logger.error(f"Failed to send reminder email to {email}: {str(e)}")
-            current_app.logger.info(f"Sent {email_count} bill reminder emails")
+                    try:
+                        reminder_data = {
+                            'email': email,
+                            'first_name': recipient.get('first_name') or 'User',
+                            'bills': [{
+                                'bill_name': bill['bill_name'],
+                                'amount': bill['amount'],
+                                'due_date': format_bill_due_date(bill['due_date']),
+                                'category': trans(f"bill_category_{bill['category']}", lang=lang),
+                                'status': trans(f"bill_status_{bill['status']}", lang=lang)
+                            } for bill in bills],
+                            'sent_at': datetime.utcnow(),
+                            'cta_url': external_url('bill.dashboard'),
+                            'unsubscribe_url': external_url('bill.unsubscribe', email=email)
+                        }
+                        send_email(
+                            app=current_app,
+                            logger=current_app.logger,
+                            to_email=email,
+                            subject=trans(config["subject_key"], lang=lang),
+                            template_key='bill_reminder',
+                            data=reminder_data,
+                            lang=lang,
+                            job_id='send_bill_reminders'
+                        )
+                        bill_reminders_collection.insert_one({**reminder_data, 'lang': lang})
+                        current_app.logger.info(f"Sent bill reminder email to {email} and saved to bill_reminders")
+                    except Exception as e:
+                        # A failed send is retried on the next daily run like any other reminder
+                        current_app.logger.error(f"Failed to send reminder email to {email}: {str(e)}")
+                    bills_collection.bulk_write([
+                        UpdateOne({'_id': bill['_id']}, {'$set': {'next_reminder_at': compute_next_reminder_at(bill, last_sent_at=now)}})
+                        for bill in bills
+                    ], ordered=False)
+                if page_size < batch_size:
+                    break
+            current_app.logger.info(f"Sent {email_count} bill reminder emails (budget {send_budget})")
         except Exception as e:
             current_app.logger.error(f"Error in send_bill_reminders: {str(e)}", exc_info=True)
             raise
 
-@log_job_metrics('cleanup_sessions')
-def cleanup_sessions():
-    """Remove expired sessions from the sessions collection."""
-    with current_app.app_context():
-        try:
-            mongo = current_app.extensions['mongo']
-            db = mongo.db
-            sessions_collection = db.sessions
-            result = sessions_collection.delete_many({
-                'expiration': {'$lt': datetime.utcnow()}
-            })
-            current_app.logger.info(f"Deleted {result.deleted_count} expired sessions")
-        except Exception as e:
-            current_app.logger.error(f"Error in cleanup_sessions: {str(e)}", exc_info=True)
-            raise
-
 def init_scheduler(app, mongo):
     """Initialize the background scheduler."""
     with app.app_context():
@@ -165,6 +208,7 @@ def init_scheduler(app, mongo):
                 func=update_overdue_status,
                 trigger='interval',
                 days=1,
+                args=[app],
                 id='overdue_status',
                 name='Update overdue bill statuses daily',
                 replace_existing=True
@@ -173,21 +217,14 @@ def init_scheduler(app, mongo):
                 func=send_bill_reminders,
                 trigger='interval',
                 days=1,
+                args=[app],
                 id='bill_reminders',
                 name='Send bill reminders daily',
                 replace_existing=True
             )
-            scheduler.add_job(
-                func=cleanup_sessions,
-                trigger='interval',
-                days=1,
-                id='cleanup_sessions',
-                name='Clean up expired sessions daily',
-                replace_existing=True
-            )
             scheduler.start()
             app.config['SCHEDULER'] = scheduler
-            app.logger.info("Bill reminder, overdue status, and session cleanup scheduler started successfully")
+            app.logger.info("Bill reminder and overdue status scheduler started successfully")
             return scheduler
         except Exception as e:
             app.logger.error(f"Failed to initialize scheduler: {str(e)}", exc_info=True)
@@ -1,4 +1,6 @@
-from flask import session
+from flask import session, request, redirect, url_for
+from flask_login import current_user
+from functools import wraps
 import logging
 import uuid
 from datetime import datetime
@@ -16,3 +18,12 @@ def create_anonymous_session():
     session['is_anonymous'] = True
     session['created_at'] = datetime.utcnow().isoformat()
     logger.info(f"Created anonymous session: {session['sid']}")
+
+# Custom login_required decorator to allow anonymous access
+def custom_login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_user.is_authenticated or session.get('is_anonymous', False):
+            return f(*args, **kwargs)
+        return redirect(url_for('auth.signin', next=request.url))
+    return decorated_function
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+def init_template_filters(app, logger):
+    """Register the Jinja filters shared by pages and email templates."""
+    @app.template_filter('safe_nav')
+    def safe_nav(value):
+        try:
+            return value
+        except Exception as e:
+            logger.error(f"Navigation rendering error: {str(e)}", exc_info=True)
+            return ''
+    @app.template_filter('format_number')
+    def format_number(value):
+        try:
+            if isinstance(value, (int, float)):
+                return f"{float(value):,.2f}"
+            return str(value)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Error converting number {value}: {str(e)}")
+            return str(value)
+    @app.template_filter('format_datetime')
+    def format_datetime(value):
+        if isinstance(value, datetime):
+            return value.strftime('%B %d, %Y, %I:%M %p')
+        return str(value)
+    @app.template_filter('format_currency')
+    def format_currency(value):
+        try:
+            value = float(value)
+            if value.is_integer():
+                return f"₦{int(value):,}"
+            return f"₦{value:,.2f}"
+        except (TypeError, ValueError):
+            return str(value)
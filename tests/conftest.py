@@ -0,0 +1,77 @@
+import logging
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from template_filters import init_template_filters
+from translations import trans
+
+@pytest.fixture
+def email_app():
+    """A bare app with the real templates folder and template filters; create_app needs a live MongoDB."""
+    app = Flask('ficore_test', root_path=ROOT, template_folder='templates')
+    app.config['BASE_URL'] = 'http://localhost:5000'
+    init_template_filters(app, logging.getLogger('ficore_test'))
+    app.jinja_env.globals['trans'] = trans
+    return app
+
+class SentMail:
+    """Records what a stubbed provider was asked to send."""
+
+    def __init__(self):
+        self.messages = []
+
+@pytest.fixture
+def mailersend(monkeypatch):
+    """Enable only MailerSend and capture its API requests instead of sending them."""
+    import mailersend_email
+    sent = SentMail()
+
+    class Response:
+        status_code = 202
+        text = ''
+
+    def post(url, json=None, headers=None, timeout=None):
+        sent.messages.append(json)
+        return Response()
+
+    monkeypatch.setenv('MAILERSEND_API_TOKEN', 'test-token')
+    monkeypatch.setenv('MAILERSEND_FROM_EMAIL', 'noreply@ficore.test')
+    monkeypatch.delenv('GMAIL_EMAIL', raising=False)
+    monkeypatch.delenv('GMAIL_PASSWORD', raising=False)
+    monkeypatch.setattr(mailersend_email.requests, 'post', post)
+    return sent
+
+@pytest.fixture
+def gmail(monkeypatch):
+    """Enable only Gmail and capture SMTP messages instead of sending them."""
+    import mailersend_email
+    sent = SentMail()
+
+    class SMTP:
+        def __init__(self, host, port):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def login(self, user, password):
+            pass
+
+        def send_message(self, msg):
+            sent.messages.append(msg)
+
+    monkeypatch.delenv('MAILERSEND_API_TOKEN', raising=False)
+    monkeypatch.delenv('MAILERSEND_FROM_EMAIL', raising=False)
+    monkeypatch.setenv('GMAIL_EMAIL', 'ficore@gmail.test')
+    monkeypatch.setenv('GMAIL_PASSWORD', 'app-password')
+    monkeypatch.setattr(mailersend_email.smtplib, 'SMTP_SSL', SMTP)
+    return sent
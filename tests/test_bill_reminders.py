@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import mongomock
+import pytest
+from flask import Blueprint
+
+from scheduler_setup import send_bill_reminders
+
+@pytest.fixture
+def reminder_app(email_app):
+    """The email app with a mock MongoDB and the bill routes the reminder links point at."""
+    bill_bp = Blueprint('bill', __name__, url_prefix='/BILL')
+    bill_bp.add_url_rule('/dashboard', 'dashboard', lambda: '')
+    bill_bp.add_url_rule('/unsubscribe/<email>', 'unsubscribe', lambda email: '')
+    email_app.register_blueprint(bill_bp)
+    email_app.extensions['mongo'] = SimpleNamespace(db=mongomock.MongoClient().ficore_test)
+    return email_app
+
+def test_due_bill_is_reminded_end_to_end(reminder_app, mailersend):
+    db = reminder_app.extensions['mongo'].db
+    now = datetime.utcnow()
+    db.users.insert_one({'email': 'amina@example.com', 'lang': 'ha'})
+    db.bills.insert_one({
+        'user_email': 'amina@example.com', 'first_name': 'Amina', 'bill_name': 'Rent', 'amount': 80000.0,
+        'due_date': datetime.combine(now.date(), datetime.min.time()) + timedelta(days=2), 'category': 'housing',
+        'status': 'unpaid', 'send_email': True, 'reminder_days': 7, 'next_reminder_at': now - timedelta(hours=1)
+    })
+
+    send_bill_reminders(reminder_app)
+
+    assert len(mailersend.messages) == 1
+    message = mailersend.messages[0]
+    assert message['to'] == [{'email': 'amina@example.com'}]
+    assert 'Rent' in message['html']
+    assert 'http://localhost:5000/BILL/unsubscribe/amina@example.com' in message['html']
+    reminder = db.bill_reminders.find_one({'email': 'amina@example.com'})
+    assert reminder is not None and reminder['lang'] == 'ha'
+    assert db.bills.find_one()['next_reminder_at'] > now
@@ -0,0 +1,82 @@
+import logging
+from datetime import datetime
+
+import pytest
+
+from mailersend_email import EMAIL_CONFIG, send_email
+
+# Payloads shaped like the ones each call site enqueues
+SAMPLE_DATA = {
+    'financial_health': {
+        'first_name': 'Amina', 'score': 72, 'status': 'Stable', 'income': 250000.0, 'expenses': 150000.0,
+        'debt': 100000.0, 'interest_rate': 12.0, 'debt_to_income': 40.0, 'savings_rate': 40.0,
+        'interest_burden': 4.8, 'badges': ['First Health Score Completed!'], 'created_at': '2026-10-18 09:00:00',
+        'cta_url': 'http://localhost:5000/HEALTHSCORE/dashboard'
+    },
+    'budget': {
+        'first_name': 'Amina', 'income': 250000.0, 'expenses': 170000.0, 'housing': 80000.0, 'food': 50000.0,
+        'transport': 20000.0, 'dependents': 10000.0, 'miscellaneous': 5000.0, 'others': 5000.0,
+        'savings_goal': 30000.0, 'surplus_deficit': 80000.0, 'created_at': '2026-10-18 09:00:00',
+        'cta_url': 'http://localhost:5000/BUDGET/dashboard'
+    },
+    'quiz': {
+        'first_name': 'Amina', 'score': 21, 'max_score': 30, 'personality': 'Planner',
+        'badges': [{'name': 'Financial Guru', 'color_class': 'bg-primary', 'description': 'Top score'}],
+        'insights': ['You track your spending.'], 'tips': ['Automate your savings.'], 'created_at': datetime(2026, 10, 18, 9, 0),
+        'cta_url': 'http://localhost:5000/QUIZ/results'
+    },
+    'bill_reminder': {
+        'first_name': 'Amina',
+        'bills': [{'bill_name': 'Rent', 'amount': 80000.0, 'due_date': '2026-10-20', 'category': 'Housing', 'status': 'Unpaid'}],
+        'cta_url': 'http://localhost:5000/BILL/dashboard', 'unsubscribe_url': 'http://localhost:5000/BILL/unsubscribe/amina@example.com'
+    },
+    'net_worth': {
+        'first_name': 'Amina', 'cash_savings': 100000.0, 'investments': 50000.0, 'property': 0.0, 'loans': 20000.0,
+        'total_assets': 150000.0, 'total_liabilities': 20000.0, 'net_worth': 130000.0, 'badges': ['net_worth_badge_wealth_builder'],
+        'created_at': '2026-10-18 09:00:00', 'cta_url': 'http://localhost:5000/NETWORTH/dashboard',
+        'unsubscribe_url': 'http://localhost:5000/NETWORTH/unsubscribe/amina@example.com'
+    },
+    'emergency_fund': {
+        'first_name': 'Amina', 'monthly_expenses': 150000.0, 'monthly_income': 250000.0, 'current_savings': 50000.0,
+        'risk_tolerance_level': 'medium', 'dependents': 2, 'timeline': 12, 'recommended_months': 6,
+        'target_amount': 900000.0, 'savings_gap': 850000.0, 'monthly_savings': 70833.33, 'percent_of_income': 28.3,
+        'badges': ['Planner'], 'created_at': '2026-10-18 09:00:00', 'cta_url': 'http://localhost:5000/EMERGENCYFUND/dashboard',
+        'unsubscribe_url': 'http://localhost:5000/EMERGENCYFUND/unsubscribe/amina@example.com'
+    },
+    'learning_hub_lesson_completed': {
+        'first_name': 'Amina', 'course_title': 'Budgeting Basics', 'lesson_title': 'Tracking Expenses',
+        'completed_at': '2026-10-18 09:00:00', 'cta_url': 'http://localhost:5000/LEARNINGHUB/courses/budgeting',
+        'unsubscribe_url': 'http://localhost:5000/LEARNINGHUB/unsubscribe/amina@example.com'
+    },
+    'password_reset': {'reset_url': 'http://localhost:5000/auth/reset-password/token'}
+}
+
+def test_every_template_key_has_sample_data():
+    assert set(SAMPLE_DATA) == set(EMAIL_CONFIG)
+
+@pytest.mark.parametrize('template_key', sorted(EMAIL_CONFIG))
+@pytest.mark.parametrize('lang', ['en', 'ha'])
+def test_mailersend_renders_every_template(email_app, mailersend, template_key, lang):
+    send_email(
+        app=email_app, logger=logging.getLogger('ficore_test'), to_email='amina@example.com',
+        subject='Subject', template_key=template_key, data=dict(SAMPLE_DATA[template_key]), lang=lang
+    )
+    assert len(mailersend.messages) == 1
+    html = mailersend.messages[0]['html']
+    assert 'Amina' in html or 'reset-password' in html
+
+@pytest.mark.parametrize('template_key', sorted(EMAIL_CONFIG))
+def test_gmail_renders_every_template(email_app, gmail, template_key):
+    send_email(
+        app=email_app, logger=logging.getLogger('ficore_test'), to_email='amina@example.com',
+        subject='Subject', template_key=template_key, data=dict(SAMPLE_DATA[template_key]), lang='en'
+    )
+    assert len(gmail.messages) == 1
+
+def test_lang_in_data_does_not_break_rendering(email_app, mailersend):
+    data = dict(SAMPLE_DATA['password_reset'], lang='en')
+    send_email(
+        app=email_app, logger=logging.getLogger('ficore_test'), to_email='amina@example.com',
+        subject='Subject', template_key='password_reset', data=data, lang='ha'
+    )
+    assert 'lang="ha"' in mailersend.messages[0]['html']
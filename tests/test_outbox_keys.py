@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta
+
+import mongomock
+import pytest
+from flask_login import LoginManager
+
+import extensions
+from email_outbox import EmailDispatcher, enqueue_email
+
+@pytest.fixture
+def db(monkeypatch):
+    """A mock MongoDB behind the shared PyMongo instance, with the outbox's unique key index."""
+    database = mongomock.MongoClient().ficore_test
+    database.email_outbox.create_index('idempotency_key', unique=True)
+    monkeypatch.setattr(extensions.mongo, 'db', database)
+    return database
+
+@pytest.fixture
+def wizard_app(email_app, db):
+    """The email app with the wizard blueprints, anonymous logins and CSRF off for form posts."""
+    from blueprints.bill import bill_bp
+    from blueprints.financial_health import financial_health_bp
+    email_app.config.update(SECRET_KEY='test', WTF_CSRF_ENABLED=False)
+    login_manager = LoginManager()
+    login_manager.init_app(email_app)
+    login_manager.user_loader(lambda user_id: None)
+    email_app.add_url_rule('/', 'index', lambda: '')
+    email_app.register_blueprint(financial_health_bp)
+    email_app.register_blueprint(bill_bp)
+    return email_app
+
+def test_financial_health_retake_queues_an_email_each_time(wizard_app, db):
+    client = wizard_app.test_client()
+    for debt in ('1000', '2000'):
+        with client.session_transaction() as session:
+            session.update({
+                'sid': 'sid-1', 'is_anonymous': True,
+                'health_step1': {'first_name': 'Amina', 'email': 'amina@example.com', 'user_type': 'individual', 'send_email': True},
+                'health_step2': {'income': 250000.0, 'expenses': 150000.0}
+            })
+        response = client.post('/HEALTHSCORE/step3', data={'debt': debt, 'interest_rate': '10'})
+        assert response.status_code == 302
+
+    assert db.financial_health_scores.count_documents({}) == 1
+    assert db.email_outbox.count_documents({'template_key': 'financial_health'}) == 2
+
+def test_resaving_identical_bill_queues_an_email_each_time(wizard_app, db):
+    client = wizard_app.test_client()
+    due_date = (date.today() + timedelta(days=10)).isoformat()
+    for _ in range(2):
+        with client.session_transaction() as session:
+            session.update({
+                'sid': 'sid-1', 'is_anonymous': True,
+                'bill_step1': {'first_name': 'Amina', 'email': 'amina@example.com', 'bill_name': 'Rent', 'amount': 80000.0, 'due_date': due_date}
+            })
+        response = client.post('/BILL/form/step2', data={
+            'frequency': 'monthly', 'category': 'rent', 'status': 'unpaid', 'send_email': 'y', 'reminder_days': '7'
+        })
+        assert response.status_code == 302
+
+    assert db.bills.count_documents({}) == 2
+    assert db.email_outbox.count_documents({'template_key': 'bill_reminder'}) == 2
+
+def test_message_that_gives_up_expires(email_app, db, monkeypatch):
+    with email_app.app_context():
+        enqueue_email(extensions.mongo, 'amina@example.com', 'Subject', 'budget', data={'first_name': 'Amina'}, idempotency_key='budget:1')
+    dispatcher = EmailDispatcher(email_app, extensions.mongo, email_app.logger, max_attempts=1, failed_retention_seconds=3600)
+    monkeypatch.setattr('email_outbox.send_email', lambda **kwargs: (_ for _ in ()).throw(RuntimeError('provider down')))
+
+    assert dispatcher.dispatch(dispatcher.claim()) is False
+
+    message = db.email_outbox.find_one({'idempotency_key': 'budget:1'})
+    assert message['status'] == 'failed'
+    assert datetime.utcnow() < message['expires_at'] <= datetime.utcnow() + timedelta(seconds=3600)
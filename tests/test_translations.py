@@ -0,0 +1,40 @@
+import sys
+
+import pytest
+
+import translations
+from translations import SUPPORTED_LANGUAGES, bundle, legacy_lookup, load_translation_modules, release_translation_modules, trans
+
+@pytest.fixture
+def source_modules():
+    modules = load_translation_modules()
+    yield modules
+    release_translation_modules()
+
+@pytest.fixture
+def fresh_bundles(tmp_path, monkeypatch):
+    """Point the bundles at an empty directory and forget the loaded tables, forcing a rebuild."""
+    monkeypatch.setattr(bundle, 'BUNDLE_DIR', str(tmp_path))
+    monkeypatch.setattr(translations, '_LANGUAGES', {})
+    return tmp_path
+
+@pytest.mark.parametrize('lang', SUPPORTED_LANGUAGES)
+def test_trans_matches_legacy_lookup(lang, source_modules):
+    keys = {key for module in source_modules.values() for entries in module.values() for key in entries}
+    differing = [key for key in sorted(keys) if trans(key, lang=lang) != legacy_lookup(source_modules, key, lang)]
+    assert differing == []
+
+def test_rebuild_releases_source_modules(fresh_bundles):
+    assert trans('core_submit', lang='ha')
+    assert translations._translation_modules is None
+    assert not [name for name in sys.modules if name.startswith('translations.translations_')]
+    assert sorted(path.name for path in fresh_bundles.iterdir()) == ['en.marshal', 'ha.marshal']
+
+def test_verify_reports_bundle_that_differs_from_sources(fresh_bundles, source_modules):
+    bundle.build_bundles()
+    assert bundle.verify_bundles() == []
+    compiled = bundle.load_bundle('ha')
+    compiled['table']['core_submit'] = 'stale'
+    bundle.write_bundle('ha', compiled)
+    problems = bundle.verify_bundles()
+    assert len(problems) == 1 and "core_submit" in problems[0]
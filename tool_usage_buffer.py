@@ -0,0 +1,142 @@
+import atexit
+import queue
+import signal
+import threading
+import time
+from models import record_tool_usage_rollups
+
+class ToolUsageBuffer:
+    """Bounded in-process queue that writes tool usage events to MongoDB in batches."""
+
+    def __init__(self, mongo, logger, max_size=10000, batch_size=200, flush_interval=5.0):
+        self.mongo = mongo
+        self.logger = logger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_size)
+        self._stop_event = threading.Event()
+        self._write_lock = threading.RLock()
+        self._counter_lock = threading.Lock()
+        self._thread = None
+        self.counters = {'enqueued': 0, 'flushed': 0, 'dropped': 0, 'failed': 0, 'rollup_failed': 0, 'batches': 0}
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _count(self, name, amount=1):
+        with self._counter_lock:
+            self.counters[name] += amount
+
+    def start(self):
+        """Start the background flusher thread."""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='tool-usage-flusher', daemon=True)
+        self._thread.start()
+
+    def enqueue(self, event):
+        """Queue an event without blocking; returns False if it was dropped."""
+        try:
+            self._queue.put_nowait(event)
+            self._count('enqueued')
+            return True
+        except queue.Full:
+            self._count('dropped')
+            return False
+
+    def _drain(self, limit):
+        """Pull up to limit events off the queue without blocking."""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        """Insert a batch of events, counting failures instead of raising."""
+        if not batch:
+            return 0
+        with self._write_lock:
+            try:
+                self.mongo.db.tool_usage.insert_many(batch, ordered=False)
+                self._count('flushed', len(batch))
+                self._count('batches')
+            except Exception as e:
+                self._count('failed', len(batch))
+                self.logger.error(f"Failed to flush {len(batch)} tool usage events: {str(e)}")
+                return 0
+            try:
+                record_tool_usage_rollups(self.mongo, batch)
+            except Exception as e:
+                self._count('rollup_failed', len(batch))
+                self.logger.error(f"Failed to update tool usage rollups for {len(batch)} events: {str(e)}")
+            return len(batch)
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while not self._stop_event.is_set():
+            timeout = deadline - time.monotonic()
+            if timeout > 0:
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                    batch.extend(self._drain(self.batch_size - len(batch)))
+                except queue.Empty:
+                    pass
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+        self._write(batch)
+
+    def flush(self):
+        """Write everything currently queued."""
+        written = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def stop(self, timeout=5.0):
+        """Stop the flusher thread and write any remaining events."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        written = self.flush()
+        self.logger.info(f"Tool usage buffer stopped: flushed {written} remaining events, counters={self.stats()}")
+
+    def stats(self):
+        """Return a snapshot of the buffer counters."""
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+def init_tool_usage_buffer(app, mongo):
+    """Start the tool usage buffer and register shutdown flushing."""
+    buffer = ToolUsageBuffer(
+        mongo,
+        app.logger,
+        max_size=int(app.config.get('TOOL_USAGE_BUFFER_SIZE', 10000)),
+        batch_size=int(app.config.get('TOOL_USAGE_BATCH_SIZE', 200)),
+        flush_interval=float(app.config.get('TOOL_USAGE_FLUSH_INTERVAL', 5.0))
+    )
+    buffer.start()
+    app.config['TOOL_USAGE_BUFFER'] = buffer
+    atexit.register(buffer.stop)
+    if threading.current_thread() is threading.main_thread():
+        previous_handler = signal.getsignal(signal.SIGTERM)
+        def handle_sigterm(signum, frame):
+            buffer.stop()
+            if callable(previous_handler):
+                previous_handler(signum, frame)
+            elif previous_handler == signal.SIG_DFL:
+                raise SystemExit(0)
+        signal.signal(signal.SIGTERM, handle_sigterm)
+    app.logger.info("Tool usage buffer started")
+    return buffer
@@ -0,0 +1,39 @@
+from flask_wtf import FlaskForm
+
+# Resolved field settings keyed by (form class, language); translations are static at runtime
+_FIELD_SETTINGS_CACHE = {}
+
+class TranslatedForm(FlaskForm):
+    """FlaskForm whose labels, choices and validators are translated once per (form class, language)."""
+
+    @classmethod
+    def translated_fields(cls, lang):
+        """Return {field_name: {'label', 'description', 'choices', 'validators'}} for lang; override in subclasses."""
+        return {}
+
+    @classmethod
+    def field_settings(cls, lang):
+        key = (cls, lang)
+        settings = _FIELD_SETTINGS_CACHE.get(key)
+        if settings is None:
+            settings = cls.translated_fields(lang)
+            _FIELD_SETTINGS_CACHE[key] = settings
+        return settings
+
+    def apply_translations(self, lang):
+        """Apply the cached field settings for lang to this form's bound fields."""
+        for name, settings in self.field_settings(lang).items():
+            field = self._fields[name]
+            if 'label' in settings:
+                field.label.text = settings['label']
+            if 'description' in settings:
+                field.description = settings['description']
+            if 'choices' in settings:
+                field.choices = list(settings['choices'])
+            # Validator instances are shared across forms, as WTForms does for class-level validators
+            if 'validators' in settings:
+                field.validators = settings['validators']
+
+def clear_form_translation_cache():
+    """Drop all cached field settings, e.g. after translations are reloaded."""
+    _FIELD_SETTINGS_CACHE.clear()
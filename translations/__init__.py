@@ -1,6 +1,10 @@
+import importlib
 import logging
+import sys
 from flask import session, has_request_context, g, request  
 from typing import Dict, Optional, Union
+from . import bundle
+from .missing import missing_translations
 
 # Set up logger to match app.py
 root_logger = logging.getLogger('ficore_app')
@@ -24,36 +28,59 @@ class SessionAdapter(logging.LoggerAdapter):
 
 logger = SessionAdapter(root_logger, {})
 
-# Import translation modules
-try:
-    from .translations_core import CORE_TRANSLATIONS as translations_core
-    from .translations_quiz import QUIZ_TRANSLATIONS as translations_quiz
-    from .translations_mailersend import MAILERSEND_TRANSLATIONS as translations_mailersend
-    from .translations_bill import BILL_TRANSLATIONS as translations_bill
-    from .translations_budget import BUDGET_TRANSLATIONS as translations_budget
-    from .translations_dashboard import DASHBOARD_TRANSLATIONS as translations_dashboard
-    from .translations_emergency_fund import EMERGENCY_FUND_TRANSLATIONS as translations_emergency_fund
-    from .translations_financial_health import FINANCIAL_HEALTH_TRANSLATIONS as translations_financial_health
-    from .translations_net_worth import NET_WORTH_TRANSLATIONS as translations_net_worth
-    from .translations_learning_hub import LEARNING_HUB_TRANSLATIONS as translations_learning_hub
-except ImportError as e:
-    logger.error(f"Failed to import translation module: {str(e)}", exc_info=True)
-    raise
-
-# Map module names to translation dictionaries
-translation_modules = {
-    'core': translations_core,
-    'quiz': translations_quiz,
-    'mailersend': translations_mailersend,
-    'bill': translations_bill,
-    'budget': translations_budget,
-    'dashboard': translations_dashboard,
-    'emergency_fund': translations_emergency_fund,
-    'financial_health': translations_financial_health,
-    'net_worth': translations_net_worth,
-    'learning_hub': translations_learning_hub
+# Translation source modules, imported only when the compiled bundle is missing or stale
+TRANSLATION_SOURCES = {
+    'core': ('translations_core', 'CORE_TRANSLATIONS'),
+    'quiz': ('translations_quiz', 'QUIZ_TRANSLATIONS'),
+    'mailersend': ('translations_mailersend', 'MAILERSEND_TRANSLATIONS'),
+    'bill': ('translations_bill', 'BILL_TRANSLATIONS'),
+    'budget': ('translations_budget', 'BUDGET_TRANSLATIONS'),
+    'dashboard': ('translations_dashboard', 'DASHBOARD_TRANSLATIONS'),
+    'emergency_fund': ('translations_emergency_fund', 'EMERGENCY_FUND_TRANSLATIONS'),
+    'financial_health': ('translations_financial_health', 'FINANCIAL_HEALTH_TRANSLATIONS'),
+    'net_worth': ('translations_net_worth', 'NET_WORTH_TRANSLATIONS'),
+    'learning_hub': ('translations_learning_hub', 'LEARNING_HUB_TRANSLATIONS')
 }
 
+_translation_modules = None
+
+def load_translation_modules() -> Dict[str, dict]:
+    """Import the source translation dictionaries, keyed by module name."""
+    global _translation_modules
+    if _translation_modules is None:
+        try:
+            _translation_modules = {
+                module_name: getattr(importlib.import_module(f".{source}", __name__), attr)
+                for module_name, (source, attr) in TRANSLATION_SOURCES.items()
+            }
+        except ImportError as e:
+            logger.error(f"Failed to import translation module: {str(e)}", exc_info=True)
+            raise
+    return _translation_modules
+
+def release_translation_modules() -> None:
+    """Drop the source dictionaries once they are compiled so they do not stay resident in every worker."""
+    global _translation_modules
+    _translation_modules = None
+    for source, _ in TRANSLATION_SOURCES.values():
+        sys.modules.pop(f"{__name__}.{source}", None)
+        globals().pop(source, None)
+
+def legacy_lookup(modules: Dict[str, dict], key: str, lang: str, quiz_page: bool = False) -> str:
+    """Resolve a key straight from the source dictionaries, the way trans did before bundles."""
+    module_name = 'quiz' if quiz_page and key in QUIZ_SPECIFIC_KEYS else module_for_key(key)
+    module = modules.get(module_name, modules['core'])
+    translation = module.get(lang, {}).get(key)
+    if translation is None:
+        translation = module.get('en', {}).get(key, key)
+    return translation
+
+def __getattr__(name):
+    # Keeps `from translations import translation_modules` working without importing the sources eagerly
+    if name == 'translation_modules':
+        return load_translation_modules()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # Map key prefixes to module names
 KEY_PREFIX_TO_MODULE = {
     'core_': 'core',
@@ -72,15 +99,90 @@ KEY_PREFIX_TO_MODULE = {
 # Quiz-specific keys without prefixes
 QUIZ_SPECIFIC_KEYS = {'Yes', 'No', 'See Results'}
 
-# Log loaded translations
-for module_name, translations in translation_modules.items():
-    for lang in ['en', 'ha']:
-        lang_dict = translations.get(lang, {})
-        logger.info(f"Loaded {len(lang_dict)} translations for module '{module_name}', lang='{lang}'")
+SUPPORTED_LANGUAGES = ('en', 'ha')
+
+def module_for_key(key: str) -> str:
+    """Return the module a key is routed to by its prefix, defaulting to core."""
+    for prefix, mod in KEY_PREFIX_TO_MODULE.items():
+        if key.startswith(prefix):
+            return mod
+    return 'core'
+
+def _is_template(value: str) -> bool:
+    return '{' in value or '}' in value
+
+def compile_translations(modules: Dict[str, dict], languages=SUPPORTED_LANGUAGES) -> Dict[str, Dict[str, str]]:
+    """
+    Flatten the translation modules into one dictionary per language.
+
+    Each key is taken only from the module its prefix routes to, and English values are
+    merged in wherever a language lacks its own, so a lookup is a single dict access.
+    """
+    compiled = {lang: {} for lang in languages}
+    for lang in languages:
+        for module_name, module in modules.items():
+            for key in module.get('en', {}):
+                if module_for_key(key) == module_name:
+                    compiled[lang][key] = module['en'][key]
+            for key, value in module.get(lang, {}).items():
+                if module_for_key(key) == module_name:
+                    compiled[lang][key] = value
+    return compiled
+
+def compile_language(modules: Dict[str, dict], lang: str) -> Dict[str, object]:
+    """Build the flat table, template key set and quiz overrides for one language."""
+    table = compile_translations(modules, languages=(lang,))[lang]
+    quiz = modules['quiz']
+    return {
+        'table': table,
+        'templates': frozenset(key for key, value in table.items() if isinstance(value, str) and _is_template(value)),
+        # Quiz pages resolve the unprefixed keys in QUIZ_SPECIFIC_KEYS from QUIZ_TRANSLATIONS
+        'quiz': {key: quiz.get(lang, {}).get(key, quiz.get('en', {}).get(key, key)) for key in QUIZ_SPECIFIC_KEYS}
+    }
+
+_LANGUAGES = {}
+
+def load_language(lang: str) -> Dict[str, object]:
+    """Return the compiled tables for one language, loading its bundle on first use."""
+    compiled = _LANGUAGES.get(lang)
+    if compiled is not None:
+        return compiled
+    compiled = bundle.load_bundle(lang)
+    if compiled is None:
+        # Normally prebuilt by `python -m translations` at deploy; compile every missing language
+        # in one pass so the source modules are imported once and then released
+        modules = load_translation_modules()
+        for missing_lang in SUPPORTED_LANGUAGES:
+            if missing_lang in _LANGUAGES or (missing_lang != lang and bundle.load_bundle(missing_lang) is not None):
+                continue
+            rebuilt = compile_language(modules, missing_lang)
+            try:
+                bundle.write_bundle(missing_lang, rebuilt)
+                logger.info(f"Rebuilt translation bundle for lang='{missing_lang}'")
+            except OSError as e:
+                logger.warning(f"Could not write translation bundle for lang='{missing_lang}': {str(e)}")
+            if missing_lang != lang:
+                _LANGUAGES[missing_lang] = rebuilt
+            else:
+                compiled = rebuilt
+        del modules
+        release_translation_modules()
+    _LANGUAGES[lang] = compiled
+    logger.info(f"Loaded {len(compiled['table'])} translations for lang='{lang}'")
+    return compiled
+
+def get_translation_table(lang: str) -> Dict[str, str]:
+    """Return the flat key -> string table for a language."""
+    return load_language(lang)['table']
+
+def _request_logger():
+    current_logger = g.get('logger', logger) if has_request_context() else logger
+    session_id = session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id'
+    return current_logger, session_id
 
 def trans(key: str, lang: Optional[str] = None, **kwargs: str) -> str:
     """
-    Translate a key using the appropriate module's translation dictionary.
+    Translate a key using the precompiled translation tables.
     
     Args:
         key: The translation key (e.g., 'core_submit', 'quiz_yes', 'Yes').
@@ -93,48 +195,43 @@ def trans(key: str, lang: Optional[str] = None, **kwargs: str) -> str:
     
     Notes:
         - Uses session['lang'] if lang is None and request context exists.
-        - Logs warnings for missing translations.
+        - With an explicit lang, found keys never touch the session or request.
+        - Counts missing translations and logs each key at most once per interval.
         - Uses g.logger if available, else the default logger.
     """
-    current_logger = g.get('logger', logger) if has_request_context() else logger
-    session_id = session.get('sid', 'no-session-id') if has_request_context() else 'no-session-id'
-
-    # Default to session language or 'en'
     if lang is None:
         lang = session.get('lang', 'en') if has_request_context() else 'en'
-    if lang not in ['en', 'ha']:
-        current_logger.warning(f"Invalid language '{lang}', falling back to 'en'", extra={'session_id': session_id})
-        lang = 'en'
+    compiled = _LANGUAGES.get(lang)
+    if compiled is None:
+        if lang not in SUPPORTED_LANGUAGES:
+            current_logger, session_id = _request_logger()
+            current_logger.warning(f"Invalid language '{lang}', falling back to 'en'", extra={'session_id': session_id})
+            lang = 'en'
+        compiled = load_language(lang)
 
-    # Determine module based on key prefix or specific keys
-    module_name = 'core'
-    for prefix, mod in KEY_PREFIX_TO_MODULE.items():
-        if key.startswith(prefix):
-            module_name = mod
-            break
     if key in QUIZ_SPECIFIC_KEYS and has_request_context() and '/quiz/' in request.path:
-        module_name = 'quiz'
+        translation = compiled['quiz'][key]
+    else:
+        translation = compiled['table'].get(key)
+        if translation is None:
+            module_name = module_for_key(key)
+            occurrences = missing_translations.record(key, lang, module_name)
+            if occurrences:
+                current_logger, session_id = _request_logger()
+                current_logger.warning(
+                    f"Missing translation for key='{key}' in module '{module_name}', lang='{lang}' ({occurrences} occurrences since last report)",
+                    extra={'session_id': session_id}
+                )
+            translation = key
 
-    module = translation_modules.get(module_name, translation_modules['core'])
-    lang_dict = module.get(lang, {})
-
-    # Get translation
-    translation = lang_dict.get(key)
-
-    # Fallback to English, then key
-    if translation is None:
-        en_dict = module.get('en', {})
-        translation = en_dict.get(key, key)
-        if translation == key:
-            current_logger.warning(
-                f"Missing translation for key='{key}' in module '{module_name}', lang='{lang}'",
-                extra={'session_id': session_id}
-            )
+    if not kwargs or (key not in compiled['templates'] and translation is not key):
+        return translation
 
     # Apply string formatting
     try:
-        return translation.format(**kwargs) if kwargs else translation
+        return translation.format(**kwargs)
     except (KeyError, ValueError) as e:
+        current_logger, session_id = _request_logger()
         current_logger.error(
             f"Formatting failed for key '{key}', lang='{lang}', kwargs={kwargs}, error={str(e)}",
             extra={'session_id': session_id}
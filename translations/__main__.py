@@ -0,0 +1,4 @@
+import sys
+from translations.bundle import main
+
+sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Compiled translation bundles.
+
+Each language is stored as a marshal file under translations/compiled/ holding its flat
+table, template keys and quiz overrides, stamped with a hash of the translation sources.
+The Procfile builds the bundles before gunicorn starts; a stale or missing bundle is
+ignored and rebuilt from the source modules at runtime.
+
+Build:  python -m translations
+Verify: python -m translations --verify
+"""
+import glob
+import hashlib
+import marshal
+import os
+import sys
+
+# Bump when the bundle layout changes so older files are rebuilt
+BUNDLE_FORMAT = 1
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLE_DIR = os.path.join(PACKAGE_DIR, 'compiled')
+
+_fingerprint = None
+
+def source_fingerprint():
+    """Hash the translation sources and routing rules that a bundle is compiled from."""
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha1(f"format={BUNDLE_FORMAT};python={sys.version_info[:2]}".encode('utf-8'))
+        paths = sorted(glob.glob(os.path.join(PACKAGE_DIR, 'translations_*.py'))) + [os.path.join(PACKAGE_DIR, '__init__.py')]
+        for path in paths:
+            with open(path, 'rb') as f:
+                digest.update(os.path.basename(path).encode('utf-8'))
+                digest.update(f.read())
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+def bundle_path(lang):
+    return os.path.join(BUNDLE_DIR, f"{lang}.marshal")
+
+def load_bundle(lang):
+    """Return the compiled tables for lang, or None if the bundle is missing, unreadable or stale."""
+    try:
+        with open(bundle_path(lang), 'rb') as f:
+            payload = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(payload, dict) or payload.get('fingerprint') != source_fingerprint():
+        return None
+    return payload['compiled']
+
+def write_bundle(lang, compiled):
+    """Atomically write the compiled tables for lang."""
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    path = bundle_path(lang)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        marshal.dump({'fingerprint': source_fingerprint(), 'lang': lang, 'compiled': compiled}, f)
+    os.replace(tmp_path, path)
+    return path
+
+def build_bundles():
+    """Compile every supported language from the source modules and write its bundle."""
+    from translations import SUPPORTED_LANGUAGES, compile_language, load_translation_modules, release_translation_modules
+    modules = load_translation_modules()
+    try:
+        return [write_bundle(lang, compile_language(modules, lang)) for lang in SUPPORTED_LANGUAGES]
+    finally:
+        release_translation_modules()
+
+def verify_bundles():
+    """
+    Check each bundle against a direct lookup in the source dictionaries; returns a list of problems.
+
+    The expected values come from legacy_lookup rather than compile_language, so a routing or
+    fallback bug in the compiler shows up here instead of being reproduced on both sides.
+    """
+    from translations import SUPPORTED_LANGUAGES, QUIZ_SPECIFIC_KEYS, legacy_lookup, load_translation_modules, release_translation_modules, _is_template
+    modules = load_translation_modules()
+    keys = {key for module in modules.values() for entries in module.values() for key in entries}
+    problems = []
+    try:
+        for lang in SUPPORTED_LANGUAGES:
+            compiled = load_bundle(lang)
+            if compiled is None:
+                problems.append(f"{lang}: bundle missing or stale")
+                continue
+            table = compiled['table']
+            differing = sorted(key for key in keys | set(table) if table.get(key, key) != legacy_lookup(modules, key, lang))
+            if differing:
+                problems.append(f"{lang}: table differs for {len(differing)} keys, e.g. {differing[:5]}")
+            templates = {key for key, value in table.items() if isinstance(value, str) and _is_template(value)}
+            if set(compiled['templates']) != templates:
+                problems.append(f"{lang}: templates differ for {len(templates ^ set(compiled['templates']))} keys")
+            quiz = sorted(key for key in QUIZ_SPECIFIC_KEYS if compiled['quiz'].get(key) != legacy_lookup(modules, key, lang, quiz_page=True))
+            if quiz:
+                problems.append(f"{lang}: quiz overrides differ for {quiz}")
+    finally:
+        release_translation_modules()
+    return problems
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Build or verify the compiled translation bundles.')
+    parser.add_argument('--verify', action='store_true', help='Check existing bundles against the source dictionaries.')
+    args = parser.parse_args(argv)
+    if args.verify:
+        problems = verify_bundles()
+        for problem in problems:
+            print(problem)
+        if problems:
+            return 1
+        print("Translation bundles match the source dictionaries")
+        return 0
+    for path in build_bundles():
+        print(f"Wrote {path} ({os.path.getsize(path)} bytes)")
+    return 0
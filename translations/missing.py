@@ -0,0 +1,55 @@
+import threading
+import time
+
+class MissingTranslationRegistry:
+    """Counts missing translation lookups per (key, lang, module) and rate-limits their log lines."""
+
+    def __init__(self, log_interval=300.0, max_keys=5000):
+        self.log_interval = log_interval
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.overflow = 0
+
+    def record(self, key, lang, module):
+        """
+        Count one missing lookup.
+
+        Returns the number of occurrences since the key was last logged when a log line is due,
+        otherwise 0. Each key is logged at most once per log_interval.
+        """
+        now = time.monotonic()
+        entry_key = (key, lang, module)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                if len(self._entries) >= self.max_keys:
+                    # Bound memory if keys are built from user input; overflow is still counted
+                    self.overflow += 1
+                    return 0
+                entry = self._entries[entry_key] = {'count': 0, 'unlogged': 0, 'first_seen': time.time(), 'last_logged': None}
+            entry['count'] += 1
+            entry['unlogged'] += 1
+            if entry['last_logged'] is not None and now - entry['last_logged'] < self.log_interval:
+                return 0
+            entry['last_logged'] = now
+            unlogged, entry['unlogged'] = entry['unlogged'], 0
+            return unlogged
+
+    def snapshot(self):
+        """Return the counters sorted by occurrence count, most frequent first."""
+        with self._lock:
+            rows = [
+                {'key': key, 'lang': lang, 'module': module, 'count': entry['count'], 'first_seen': entry['first_seen']}
+                for (key, lang, module), entry in self._entries.items()
+            ]
+            overflow = self.overflow
+        rows.sort(key=lambda row: row['count'], reverse=True)
+        return {'keys': rows, 'total': sum(row['count'] for row in rows), 'distinct': len(rows), 'overflow': overflow}
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self.overflow = 0
+
+missing_translations = MissingTranslationRegistry()
@@ -15,6 +15,8 @@ CORE_TRANSLATIONS = {
         'auth_change_password': 'Change Password',
         'Your Profile': 'Your Profile',
         'admin_no_logs': 'No logs found',
+        'admin_newer': 'Newer',
+        'admin_older': 'Older',
         'share_ficore': 'Share Ficore',
         'profile_link_copied': 'Profile link copied to clipboard!',
         'core_password_changed_success': 'Password changed successfully!',
@@ -186,6 +188,7 @@ CORE_TRANSLATIONS = {
         'core_google_login_success': 'Successfully logged in with Google.',
         'core_invalid_state': 'Invalid state parameter. Please try again.',
         'core_reset_email_subject': 'Password Reset Request',
+        'core_reset_email_body': 'Click the button below to reset your password. This link will expire in 1 hour.',
         'core_close': 'Close',
         'auth_no_account': 'No account? Sign Up',
         'core_forgot_password': 'Forgot Password',
@@ -864,6 +867,7 @@ CORE_TRANSLATIONS = {
         'core_google_login_success': 'An shiga cikin nasara tare da Google.',
         'core_invalid_state': 'Sigar yanayi ba ta da inganci. Da fatan za a sake gwadawa.',
         'core_reset_email_subject': 'Neman Sake Saita Kalmar sirri',
+        'core_reset_email_body': 'Danna maɓallin da ke ƙasa don sake saita kalmar sirrinka. Wannan hanyar za ta ƙare cikin awa 1.',
         'auth_no_account': 'Ba ku da asusu? Yi Rajista',
         'core_forgot_password': 'An manta da Kalmar sirri',
         'core_forgot_password_subtitle': 'Shigar da imel ɗinka don sake saita kalmar sirri',
@@ -1025,6 +1029,8 @@ CORE_TRANSLATIONS = {
         'core_not_available': 'Babu Lokaci',
         'tool_anonymous_access': 'Samun Dama Ba Tare da Suna Ba',
         'admin_no_logs': 'Ba a sami tarihin bayanai ba',
+        'admin_newer': 'Sababbi',
+        'admin_older': 'Tsofaffi',
         'tool_register': 'Aikin Rajista',
         'core_auth_new_password_placeholder': 'Shigar da sabuwar kalmar sirri mai tsaro',
         'core_auth_new_password_tooltip': 'Aƙalla haruffa 8',
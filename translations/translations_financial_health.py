@@ -171,6 +171,7 @@ FINANCIAL_HEALTH_TRANSLATIONS = {
         'financial_health_boost_income': 'Explore ways to boost your income.',
         'financial_health_how_you_compare': 'How You Compare to Others',
         'financial_health_your_rank': 'Your rank of',
+        'financial_health_your_rank_in_segment': 'Your rank among',
         'financial_health_places_you': 'places you',
         'financial_health_top_10_percent': 'in the top 10% of users, indicating exceptional financial health compared to peers.',
         'financial_health_top_30_percent': 'in the top 30%, showing above-average financial stability.',
@@ -407,6 +408,7 @@ FINANCIAL_HEALTH_TRANSLATIONS = {
         'financial_health_boost_income': 'Bincika hanyoyin ƙara kuɗin shigarka.',
         'financial_health_how_you_compare': 'Yadda Kake Kwatanta da Wasu',
         'financial_health_your_rank': 'Matsayin ka na',
+        'financial_health_your_rank_in_segment': 'Matsayin ka a cikin',
         'financial_health_places_you': 'yana sanya ka',
         'financial_health_top_10_percent': 'a cikin kashi 10% na masu amfani, yana nuna lafiyar kuɗi na musamman idan aka kwatanta da takwarorinka.',
         'financial_health_top_30_percent': 'a cikin kashi 30%, yana nuna kwanciyar hankali na kuɗi sama da matsakaita.',